@@ -0,0 +1,189 @@
+"""
+Admission control and load shedding for the search endpoints.
+
+When upstream latency spikes, requests pile up in the worker, each holding
+executor threads and open OpenAI calls, and everything slows down together
+until the proxy times requests out. An AdmissionController caps how many
+search pipelines a worker runs at once (max_concurrent). Requests beyond
+that wait in a bounded queue (max_queue) for at most queue_timeout
+seconds. Anything else is turned away at once with 429 and a Retry-After
+estimate, so admitted requests keep a steady latency under overload.
+
+An optional SessionRateLimiter also caps requests per session in a fixed
+window. Its counters live in shared state, so the limit holds across
+worker processes.
+
+    chat_admission = AdmissionController('search', max_concurrent=16, max_queue=32, queue_timeout=2.0)
+
+    @app.route('/chat', methods=['POST'])
+    @chat_admission.guard(session_id=lambda: request.get_json(silent=True).get('session_id'))
+    async def chat(): ...
+
+Async views run on their own event loop thread, so waiting for a slot
+blocks only the request that is waiting.
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import jsonify
+
+from logging_setup import annotate_request, stage_timer
+from shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 16
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_QUEUE_TIMEOUT = 2.0
+SERVICE_TIME_SMOOTHING = 0.2  # Weight of the newest request in the service time average
+MAX_RETRY_AFTER = 30
+
+
+def parse_rate_limit(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse '<requests>/<seconds>' (e.g. '20/60'); None or '0' disables the limit."""
+    if not value or value.strip() in ('0', 'off'):
+        return None
+    try:
+        requests, window = value.split('/')
+        limit = (int(requests), int(window))
+    except ValueError:
+        logger.warning(f"Ignoring invalid rate limit '{value}', expected '<requests>/<seconds>'")
+        return None
+    return limit if limit[0] > 0 and limit[1] > 0 else None
+
+
+class SessionRateLimiter:
+    """Fixed-window request limit per session, counted in shared state."""
+
+    def __init__(self, state: SharedState, limit: int, window: int, name: str = 'rate_limits'):
+        self.limit = limit
+        self.window = window
+        self._counts = state.namespace(name, ttl=window)
+
+    def check(self, session_id: str) -> Optional[float]:
+        """Count a request. Returns the seconds until the window resets if the session is over its limit."""
+        now = time.time()
+        window_start = int(now // self.window)
+        try:
+            count = self._counts.incr(f"{session_id}:{window_start}", ttl=self.window)
+        except Exception as e:
+            logger.error(f"Rate limit check failed for session {session_id}: {str(e)}")
+            return None  # Fail open
+        if count > self.limit:
+            return (window_start + 1) * self.window - now
+        return None
+
+
+class AdmissionController:
+    """Per-worker cap on concurrent requests, with a bounded, time-limited wait queue."""
+
+    def __init__(self, name: str, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 max_queue: int = DEFAULT_MAX_QUEUE, queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+                 rate_limiter: Optional[SessionRateLimiter] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_limiter = rate_limiter
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.service_time = 1.0  # Smoothed seconds per admitted request, for Retry-After
+        self.counters = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0, 'shed_timeout': 0, 'rate_limited': 0}
+
+    def acquire(self) -> Optional[str]:
+        """Take a slot, waiting in the queue if needed. Returns None if admitted, else why it was shed."""
+        with self._cond:
+            if self.in_flight < self.max_concurrent and not self.queued:
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                return None
+            if self.queued >= self.max_queue:
+                self.counters['shed_queue_full'] += 1
+                return 'queue_full'
+            self.queued += 1
+            self.counters['queued'] += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['shed_timeout'] += 1
+                        return 'timeout'
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                return None
+            finally:
+                self.queued -= 1
+
+    def release(self, duration: float):
+        with self._cond:
+            self.in_flight -= 1
+            self.service_time += SERVICE_TIME_SMOOTHING * (duration - self.service_time)
+            self._cond.notify()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the backlog divided over the slots, times the service time."""
+        with self._cond:
+            backlog = (self.queued + 1) / self.max_concurrent
+            return max(1, min(MAX_RETRY_AFTER, math.ceil(self.service_time * backlog)))
+
+    def _reject(self, message: str, retry_after: float, reason: str):
+        annotate_request(admission=reason)
+        response = jsonify({'error': message, 'retry_after': math.ceil(retry_after)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+    def admit(self):
+        """
+        Admit, queue or shed a request whose work outlives its view, such as a streamed response.
+
+        Returns a 429 response if the request was shed. Otherwise returns None,
+        and the caller must release() once the work is done.
+        """
+        with stage_timer('admission'):
+            shed_reason = self.acquire()
+        if shed_reason:
+            logger.warning(f"[Admission] Shedding {self.name} request ({shed_reason}, "
+                           f"{self.in_flight} in flight, {self.queued} queued)")
+            return self._reject('Server is busy, please retry shortly', self.retry_after(), shed_reason)
+        return None
+
+    def guard(self, session_id: Optional[Callable[[], Optional[str]]] = None):
+        """Decorator for async views: rate-limit by session, then admit, queue or shed the request."""
+        def decorator(view):
+            @functools.wraps(view)
+            async def wrapper(*args, **kwargs):
+                if self.rate_limiter is not None and session_id is not None:
+                    session = session_id()
+                    reset_in = self.rate_limiter.check(session) if session else None
+                    if reset_in is not None:
+                        with self._cond:
+                            self.counters['rate_limited'] += 1
+                        return self._reject('Too many requests for this session, please slow down',
+                                            reset_in, 'rate_limited')
+
+                rejection = self.admit()
+                if rejection is not None:
+                    return rejection
+
+                start = time.perf_counter()
+                try:
+                    return await view(*args, **kwargs)
+                finally:
+                    self.release(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {'in_flight': self.in_flight, 'queued_now': self.queued, 'max_concurrent': self.max_concurrent,
+                    'max_queue': self.max_queue, 'queue_timeout': self.queue_timeout,
+                    'service_time_ms': round(self.service_time * 1000, 1), **self.counters}
@@ -1,22 +1,62 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
+from werkzeug.exceptions import HTTPException
 import os
 import openai
 import googlemaps
 from dotenv import load_dotenv
 from pathlib import Path
-from data_sources import DataSourceManager
+from data_sources import DataSourceManager, match_candidate_names
 import asyncio
+import atexit
 import logging
-from conversation_manager import ConversationManager
+import queue
+import time
+from conversation_manager import MAX_SESSION_BYTES, ConversationManager
+from spatial_index import GRID_CELL_DEGREES, PlaceSpatialIndex
+from ranking import DEFAULT_RANKING_WEIGHTS, rank_places
+from nearby_pager import NearbyPager, is_quality_candidate
+from assets import AssetPipeline
+from clients import LazyClientRegistry
+from shared_state import create_shared_state
+from snapshots import DEFAULT_SNAPSHOT_INTERVAL, CacheSnapshotter
+from background import background_loop
+from enrichment import EnrichmentPipeline
+from prefetch import ProfilePrefetcher
+from tracing import (annotate_span, current_request_id, finish_trace, new_request_id, record_llm_usage, span,
+                     start_trace, trace_store, waterfall_rows)
+from profiling import RequestProfiler
+from admission import (DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_QUEUE, DEFAULT_QUEUE_TIMEOUT, AdmissionController,
+                       SessionRateLimiter, parse_rate_limit)
+from logging_setup import annotate_request, configure_logging, finish_request, stage_timer, start_request, timed_stage
+from slot_extractor import SLOT_CONFIDENCE_THRESHOLD, extract_slots
+from similarity_cache import DEFAULT_TTL as SIMILARITY_CACHE_TTL, SIMILARITY_THRESHOLD, SimilarityCache
+from review_signals import ReviewSignalIndex
+from upstream import UpstreamPool
+from cassettes import create_cassette
+from response_shaping import json_response, ndjson_line, parse_fields, shape_search_payload
 from datetime import datetime
 import re
 import json
+import hashlib
+import math
 from typing import List, Dict, Optional, Set
 
 # Constants
 MAX_PLACES_TO_ANALYZE = 7  # Number of top places to analyze in depth
+REVIEW_EVIDENCE_CUTOFF = -0.6  # Candidates whose reviews contradict the requirements this strongly are dropped
 DEFAULT_LOCATION_COORDS = {'lat': -33.8688, 'lng': 151.2093}  # Sydney CBD
 
+# Phrases that mark a "tell me more about X" follow-up
+MORE_INFO_PATTERNS = [
+    r'tell me more about',
+    r'more details on',
+    r'more information about',
+    r'more about',
+    r'details for',
+    r'what can you tell me about',
+    r'what do you know about'
+]
+
 # Load environment variables using an absolute path
 # Replace 'YourUsername' with your actual PythonAnywhere username
 project_home = Path('/home/CityPulse/citypulse')
@@ -27,51 +67,247 @@ maps_api_key = os.getenv('MAPS_API_KEY')
 if not maps_api_key:
     print("WARNING: No Maps API key found!")
 
-app = Flask(__name__)
+# Candidate ranking weights, optionally overridden with a JSON object such as
+# RANKING_WEIGHTS='{"distance": 0.4}'
+RANKING_WEIGHTS = dict(DEFAULT_RANKING_WEIGHTS)
+try:
+    RANKING_WEIGHTS.update(json.loads(os.getenv('RANKING_WEIGHTS', '{}')))
+except (ValueError, TypeError) as e:
+    print(f"WARNING: Ignoring invalid RANKING_WEIGHTS: {str(e)}")
+
+# Static files are served by custom_static through the asset pipeline below
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24).hex())
 
-# Set up enhanced logging
-logging.basicConfig(
-    level=logging.INFO,  # Changed back to INFO for production
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Log records are written by a background listener thread (LOG_LEVEL, LOG_FILE)
+configure_logging()
 logger = logging.getLogger(__name__)
 werkzeug_logger = logging.getLogger('werkzeug')
 werkzeug_logger.setLevel(logging.INFO)
 
-# Initialize API clients
+# Initialize API clients lazily so importing the app makes no network calls
 openai_api_key = os.getenv('OPENAI_API_KEY')
 openai.api_key = openai_api_key
-try:
-    gmaps = googlemaps.Client(key=maps_api_key)
-    test_result = gmaps.geocode('Sydney, Australia')
-    if not test_result:
-        print("Google Maps API key validation failed - no results returned")
-except Exception as e:
-    print(f"Error initializing Google Maps client: {str(e)}")
-    gmaps = None
 
-# Initialize data source manager
-data_manager = DataSourceManager()
+# Optionally record upstream traffic, replay it offline, or fall back to it when an
+# upstream is down (CASSETTE_MODE=record|replay|fallback, CASSETTE_PATH)
+cassette = create_cassette()
 
-# Initialize conversation manager
-conversation_manager = ConversationManager()
+# Each upstream gets its own thread pool and keep-alive connections, so a burst of
+# calls to one can't starve the others (MAPS_POOL_SIZE, GEOCODING_POOL_SIZE, OPENAI_POOL_SIZE)
+maps_upstream = UpstreamPool('maps', max_workers=int(os.getenv('MAPS_POOL_SIZE', 16)), cassette=cassette)
+geocoding_upstream = UpstreamPool('geocoding', max_workers=int(os.getenv('GEOCODING_POOL_SIZE', 4)),
+                                  cassette=cassette)
+openai_upstream = UpstreamPool('openai', max_workers=int(os.getenv('OPENAI_POOL_SIZE', 8)), cassette=cassette)
+openai.requestssession = openai_upstream.new_session  # openai keeps one per thread and closes it every few minutes
+
+clients = LazyClientRegistry()
+clients.register('gmaps', lambda: googlemaps.Client(key=maps_api_key, requests_session=maps_upstream.session))
+clients.register('geocoder',
+                 lambda: googlemaps.Client(key=maps_api_key, requests_session=geocoding_upstream.session))
+
+def get_gmaps():
+    """Return the Google Maps client, building it on first use (None if unavailable)."""
+    return clients.get('gmaps')
+
+def get_geocoder():
+    """Return the Google Maps client used for geocoding, on its own connection pool."""
+    return clients.get('geocoder')
+
+# Optionally validate the Maps key in the background instead of blocking startup
+if os.getenv('VALIDATE_API_KEYS', '').lower() in ('1', 'true', 'yes'):
+    clients.start_health_check({'gmaps': lambda client: client.geocode('Sydney, Australia')})
+
+# Caches and cross-worker coordination (set SHARED_STATE_BACKEND=sqlite when
+# running several worker processes so they share one cache)
+shared_state = create_shared_state()
 
-# Create a simple memory cache for search context
-search_context_cache = {}
+# Initialize data source manager (its Custom Search client is also built lazily)
+data_manager = DataSourceManager(clients=clients, state=shared_state)
+
+# Enrich returned places with web mentions in the background
+enrichment_pipeline = EnrichmentPipeline(data_manager)
+
+# Initialize conversation manager
+# CONVERSATION_COMPRESSION=0 stores plain JSON; CONVERSATION_MAX_BYTES caps each stored session
+conversation_manager = ConversationManager(
+    compress=os.getenv('CONVERSATION_COMPRESSION', '1').lower() not in ('0', 'false', 'no'),
+    max_session_bytes=int(os.getenv('CONVERSATION_MAX_BYTES', MAX_SESSION_BYTES)) or None)
+
+# Prepare "tell me more" answers for top search results once the response is sent
+profile_prefetcher = ProfilePrefetcher(lambda place: _generate_place_profile(place), state=shared_state)
+
+# Fingerprint and precompress static assets once at startup
+asset_pipeline = AssetPipeline(os.path.join(app.root_path, 'static'),
+                               auto_reload=os.getenv('FLASK_DEBUG') == '1' or __name__ == '__main__').build()
+
+# Recent search context per session, for follow-up questions
+SEARCH_CONTEXT_TTL = 60 * 30
+search_contexts = shared_state.namespace('search_context', ttl=SEARCH_CONTEXT_TTL, persist=True)
+
+# Geocodes and Place Details are shared by searches, batch jobs and workers
+GEOCODE_CACHE_TTL = 60 * 60 * 24 * 30  # Suburbs don't move
+DETAILS_CACHE_TTL = 60 * 60 * 6
+geocode_cache = shared_state.namespace('geocodes', ttl=GEOCODE_CACHE_TTL, persist=True)
+details_cache = shared_state.namespace('place_details', ttl=DETAILS_CACHE_TTL, persist=True)
+
+# Per-place analysis fragments, keyed by place_id, normalized requirement and details version
+PLACE_ANALYSIS_TTL = 60 * 60 * 24 * 7
+place_analysis_cache = shared_state.namespace('place_analysis', ttl=PLACE_ANALYSIS_TTL, persist=True)
+
+# Full search responses, reused for near-duplicate queries in the same location cell and radius
+response_cache = SimilarityCache(shared_state,
+                                 ttl=float(os.getenv('SIMILARITY_CACHE_TTL', SIMILARITY_CACHE_TTL)),
+                                 threshold=float(os.getenv('SIMILARITY_CACHE_THRESHOLD', SIMILARITY_THRESHOLD)))
+
+# Per-place requirement evidence from fetched reviews, for prefiltering and ranking candidates
+review_signals = ReviewSignalIndex(shared_state)
+
+def _response_scope(location: Optional[tuple], radius: int, search_terms: str = '', requirements: str = '') -> str:
+    """
+    Area and resolved search slots a cached response is valid for.
+
+    Follow-ups like "any others?" are resolved against session context, so the
+    same message means different searches in different sessions; the slots
+    keep those apart without being part of the similarity vector.
+    """
+    area = (f"default:{radius}" if not location else
+            f"{math.floor(location[0] / GRID_CELL_DEGREES)}:{math.floor(location[1] / GRID_CELL_DEGREES)}:{radius}")
+    slots = f"{' '.join((search_terms or '').lower().split())}|{_normalize_requirement(requirements)}"
+    return f"{area}:{hashlib.sha1(slots.encode('utf-8')).hexdigest()[:12]}"
+
+# Local spatial index over every place fetched from Google
+place_index = PlaceSpatialIndex()
+
+# Carry memory caches and the spatial index over restarts (CACHE_SNAPSHOT_PATH)
+CACHE_SNAPSHOT_INTERVAL = int(os.getenv('CACHE_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL))
+cache_snapshotter = CacheSnapshotter(shared_state, place_index)
+cache_snapshotter.restore()
+if CACHE_SNAPSHOT_INTERVAL > 0:
+    background_loop.run_periodically(CACHE_SNAPSHOT_INTERVAL, cache_snapshotter.write)
 
 # Cleaning up old sessions every day
 CLEANUP_INTERVAL = 60 * 60 * 24  # Once per day
-last_cleanup_time = 0
+maintenance = shared_state.namespace('maintenance')
 
 def maybe_cleanup():
-    """Occasionally clean up old sessions."""
-    global last_cleanup_time
-    current_time = int(datetime.now().timestamp())
-    if current_time - last_cleanup_time > CLEANUP_INTERVAL:
+    """Occasionally clean up old sessions (once per interval across all workers)."""
+    if maintenance.try_lock('session_cleanup', ttl=CLEANUP_INTERVAL):
         deleted = conversation_manager.cleanup_old_sessions(days=7)
-        logger.info(f"Cleaned up {deleted} old conversation sessions")
-        last_cleanup_time = current_time
+        purged = shared_state.purge_expired()
+        logger.info(f"Cleaned up {deleted} old conversation sessions and {purged} expired cache entries")
+
+# Return space freed by deleted and capped sessions to the filesystem, one worker at a time
+CONVERSATION_COMPACT_INTERVAL = int(os.getenv('CONVERSATION_COMPACT_INTERVAL', 60 * 60))
+
+def compact_conversations():
+    """Run an incremental vacuum of the conversation store (once per interval across all workers)."""
+    if maintenance.try_lock('conversation_compaction', ttl=CONVERSATION_COMPACT_INTERVAL):
+        freed = conversation_manager.compact()
+        logger.info(f"Compacted conversation store, freeing {freed} pages")
+
+if CONVERSATION_COMPACT_INTERVAL > 0:
+    background_loop.run_periodically(CONVERSATION_COMPACT_INTERVAL, compact_conversations)
+
+@atexit.register
+def shutdown():
+    """Release process-wide resources when the worker exits."""
+    try:
+        asyncio.run(data_manager.close())
+    except Exception as e:
+        logger.error(f"Error closing data manager: {str(e)}")
+    cache_snapshotter.write()
+    shared_state.close()
+    for upstream in (maps_upstream, geocoding_upstream, openai_upstream):
+        upstream.shutdown()
+    if cassette:
+        cassette.store.close()
+
+# CPU profiles of requests sent with a signed X-Profile header (PROFILE_SECRET) or sampled
+request_profiler = RequestProfiler()
+
+# Per-worker cap on concurrent search pipelines; overflow waits briefly, then gets 429.
+# CHAT_RATE_LIMIT ('<requests>/<seconds>') optionally limits each chat session.
+CHAT_RATE_LIMIT = parse_rate_limit(os.getenv('CHAT_RATE_LIMIT'))
+search_admission = AdmissionController(
+    'search',
+    max_concurrent=int(os.getenv('ADMISSION_MAX_CONCURRENT', DEFAULT_MAX_CONCURRENT)),
+    max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', DEFAULT_MAX_QUEUE)),
+    queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)),
+    rate_limiter=SessionRateLimiter(shared_state, *CHAT_RATE_LIMIT) if CHAT_RATE_LIMIT else None,
+)
+
+def _chat_session_id():
+    return (request.get_json(silent=True) or {}).get('session_id')
+
+# /debug/* endpoints expose request paths, timings and cache internals; only serve them when asked to
+DEBUG_ENDPOINTS = os.getenv('DEBUG_ENDPOINTS', '').lower() in ('1', 'true', 'yes')
+
+def debug_route(rule: str, **options):
+    """app.route() for a /debug/* endpoint, which is only registered with DEBUG_ENDPOINTS set."""
+    if DEBUG_ENDPOINTS:
+        return app.route(rule, **options)
+    return lambda view: view
+
+# Endpoints left out of request summaries and traces
+UNTRACED_ENDPOINTS = {'static', 'trace_list', 'trace_view'}
+
+@app.before_request
+def begin_request_summary():
+    if request.endpoint not in UNTRACED_ENDPOINTS:
+        request_id = new_request_id(request.headers.get('X-Request-ID'))
+        start_trace(request_id, f"{request.method} {request.path}")
+        start_request(request_id=request_id, method=request.method, path=request.path)
+
+@app.after_request
+def log_request_summary(response):
+    """Close the request's trace and emit its one-line structured summary (status, duration, stages)."""
+    request_id = current_request_id()
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    finish_trace(status=response.status_code)
+    finish_request(status=response.status_code)
+    return response
+
+def _chat_completion(**kwargs):
+    """openai.ChatCompletion.create in its own trace span, recording the model and token usage."""
+    with span('llm'):
+        response = openai.ChatCompletion.create(**kwargs)
+        record_llm_usage(kwargs.get('model'), response.get('usage'))
+        return response
+
+def _classify_search_intent(intent_query: str):
+    """Ask the LLM whether a chat message is a place search ('yes' or 'no')."""
+    return _chat_completion(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a system that determines if a message is asking about places or locations. Only respond with 'yes' or 'no'."},
+            {"role": "user", "content": intent_query}
+        ],
+        max_tokens=5,  # Very short response needed
+        temperature=0.1  # Low temperature for consistency
+    )
+
+def _classify_follow_up(classification_prompt: str):
+    """Ask the LLM whether a follow-up is a new search (A) or about a place already mentioned (B)."""
+    return _chat_completion(
+        model="gpt-4o-mini",  # Using the same model as other calls
+        messages=[
+            {"role": "system", "content": "Classify user intent: A=New Search, B=More Info."},
+            {"role": "user", "content": classification_prompt}
+        ],
+        max_tokens=2,
+        temperature=0.1  # Low temperature for consistency
+    )
+
+def _chat_reply(conversation: List[Dict]):
+    """The assistant's next message in a general conversation."""
+    return _chat_completion(
+        model="gpt-4o-mini",  # Upgraded to GPT-4o mini for better conversation
+        messages=conversation,
+        max_tokens=1000,
+        temperature=0.7
+    )
 
 @app.route('/')
 def home():
@@ -85,6 +321,37 @@ def api_docs():
 def how_it_works():
     return render_template('how_it_works.html')
 
+@app.route('/health')
+def health():
+    """Report API client initialization, key health checks and shared cache stats."""
+    return jsonify({'clients': clients.health(), 'shared_state': shared_state.stats(),
+                    'snapshot': cache_snapshotter.stats(), 'admission': search_admission.stats(),
+                    'response_cache': response_cache.stats(), 'review_signals': review_signals.stats(),
+                    'upstreams': {upstream.name: upstream.stats()
+                                  for upstream in (maps_upstream, geocoding_upstream, openai_upstream)},
+                    'cassette': cassette.stats() if cassette else None,
+                    'conversations': conversation_manager.stats()})
+
+@debug_route('/debug/prefetch')
+def prefetch_stats():
+    """Report speculative prefetch hit rate and wasted work."""
+    return jsonify(profile_prefetcher.stats())
+
+@debug_route('/debug/traces')
+def trace_list():
+    """List the traces kept in this worker's ring buffer, newest first."""
+    return jsonify({'stats': trace_store.stats(), 'traces': trace_store.recent()})
+
+@debug_route('/debug/traces/<request_id>')
+def trace_view(request_id):
+    """Render one request's span waterfall (or the raw trace with ?format=json)."""
+    trace = trace_store.get(request_id)
+    if trace is None:
+        return jsonify({'error': f"No trace kept for request {request_id}"}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(trace)
+    return render_template('trace.html', trace=trace, rows=waterfall_rows(trace))
+
 @app.route('/generate_session_id', methods=['POST'])
 def generate_session_id():
     """Generate a new session ID for the client."""
@@ -94,25 +361,39 @@ def generate_session_id():
     session_id = conversation_manager.generate_session_id(user_ip, user_agent)
     return jsonify({'session_id': session_id})
 
-@app.route('/static/<path:filename>')
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Make url_for('static', filename=...) point at the content-hashed asset."""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = asset_pipeline.url_name(values['filename'])
+
+@app.route('/static/<path:filename>', endpoint='static')
 def custom_static(filename):
-    """Explicit route for serving static files with additional error handling."""
+    """Serve fingerprinted, precompressed static files with long-lived caching."""
     try:
-        logger.debug(f"Serving static file: {filename}")
-        return send_from_directory('static', filename)
+        response = asset_pipeline.serve(filename, request)
+        if response is not None:
+            return response
+        return send_from_directory(os.path.join(app.root_path, 'static'), filename)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error serving static file {filename}: {str(e)}")
         return f"Error serving file: {str(e)}", 500
 
 @app.route('/chat', methods=['POST'])
+@search_admission.guard(session_id=_chat_session_id)
+@request_profiler.profile_view
 async def chat():
     """Handle incoming chat messages."""
     try:
         data = request.json
         user_message = data.get('message', '').strip()
         session_id = data.get('session_id')
+        # Optional projection of search results, e.g. "places.review,analysis"
+        fields = parse_fields(data.get('fields', request.args.get('fields')))
         
-        logger.info(f"Received chat request - Message: '{user_message}', Session ID: {session_id}")
+        logger.debug("Received chat request - Message: '%s', Session ID: %s", user_message, session_id)
         
         if not user_message:
             logger.warning("Empty message received")
@@ -122,6 +403,19 @@ async def chat():
             logger.warning("No session ID provided")
             return jsonify({'error': 'No session ID provided'}), 400
 
+        # Answer "tell me more about X" from the speculatively prefetched profile,
+        # skipping both intent classifiers and the general chat call
+        if any(re.search(pattern, user_message.lower()) for pattern in MORE_INFO_PATTERNS):
+            with span('cache.prefetch') as lookup_span:
+                prefetched = profile_prefetcher.lookup(session_id, user_message)
+                lookup_span.set(hit=prefetched is not None)
+            if prefetched:
+                logger.debug("Answering 'more info' request from prefetched profile of %s", prefetched['place_name'])
+                annotate_request(prefetch='hit')
+                conversation_manager.add_message(session_id, 'user', user_message)
+                conversation_manager.add_message(session_id, 'assistant', prefetched['profile'])
+                return json_response({'response': prefetched['profile']})
+
         # Check if this might be a search query
         is_search_query = any(keyword in user_message.lower() for keyword in 
                              ['find', 'where', 'location', 'place', 'nearby', 'restaurant', 'cafe', 'bar'])
@@ -140,7 +434,7 @@ async def chat():
             for pattern in follow_up_location_patterns:
                 if re.search(pattern, user_message.lower()):
                     is_search_query = True
-                    logger.info(f"Detected location follow-up query pattern: '{user_message}'")
+                    logger.debug("Detected location follow-up query pattern: '%s'", user_message)
                     break
         
         # Use NLP to detect search intent instead of keyword matching
@@ -159,7 +453,7 @@ async def chat():
             for indicator_type, pattern in search_indicators.items():
                 if re.search(pattern, user_message.lower()):
                     matches.append(indicator_type)
-                    logger.info(f"Detected search indicator: {indicator_type} in '{user_message}'")
+                    logger.debug("Detected search indicator: %s in '%s'", indicator_type, user_message)
 
             # If we have multiple indicators or specific combinations, treat as search query
             is_search_query = (len(matches) >= 2 or  # Multiple indicators suggest search intent
@@ -169,7 +463,7 @@ async def chat():
 
             # For more complex cases, use OpenAI to analyze search intent
             if not is_search_query and len(user_message.split()) > 3:  # Only for non-trivial messages
-                logger.info(f"Using OpenAI to classify search intent for: '{user_message}'")
+                logger.debug("Using OpenAI to classify search intent for: '%s'", user_message)
 
                 intent_query = f"""Determine if this is a location/place search query: "{user_message}"
 
@@ -182,61 +476,43 @@ async def chat():
                 Is this a query looking for places, venues, or locations? Respond with ONLY 'yes' or 'no'."""
 
                 try:
-                    intent_response = openai.ChatCompletion.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "You are a system that determines if a message is asking about places or locations. Only respond with 'yes' or 'no'."},
-                            {"role": "user", "content": intent_query}
-                        ],
-                        max_tokens=5,  # Very short response needed
-                        temperature=0.1  # Low temperature for consistency
-                    )
+                    with stage_timer('classify_intent'):
+                        intent_response = await openai_upstream.run(_classify_search_intent, intent_query)
 
                     intent_result = intent_response['choices'][0]['message']['content'].strip().lower()
                     is_search_query = 'yes' in intent_result
-                    logger.info(f"OpenAI classified as search query: {is_search_query}")
+                    logger.debug("OpenAI classified as search query: %s", is_search_query)
 
                 except Exception as e:
                     logger.error(f"Error using OpenAI for intent classification: {str(e)}")
                     # Fall back to simple heuristic - longer queries about places are likely searches
                     if any(term in user_message.lower() for term in ['in', 'at', 'near', 'around']):
                         is_search_query = True
-                        logger.info("Fallback location heuristic detected search query")
+                        logger.debug("Fallback location heuristic detected search query")
 
-            logger.info(f"Final search intent classification: {is_search_query}")
+            logger.debug("Final search intent classification: %s", is_search_query)
 
         except Exception as e:
             logger.error(f"Error in search intent detection: {str(e)}")
             # If error in detection, fall back to original method
             is_search_query = any(keyword in user_message.lower() for keyword in
                             ['find', 'where', 'location', 'place', 'nearby', 'restaurant', 'cafe', 'bar'])
-            logger.info(f"Fallback search detection: {is_search_query}")
+            logger.debug("Fallback search detection: %s", is_search_query)
 
-        logger.info(f"Message identified as search query: {is_search_query}")
+        logger.debug("Message identified as search query: %s", is_search_query)
 
         # Flag to determine whether to call search function
         call_search_function = False
         
         # If initially classified as a search query, do additional classification
         if is_search_query:
-            logger.info(f"Initial classification as search query. Now checking if this is a 'more info' follow-up")
-            
-            # Check if this is a 'tell me more about X' type of follow-up
-            more_info_patterns = [
-                r'tell me more about',
-                r'more details on',
-                r'more information about',
-                r'more about',
-                r'details for',
-                r'what can you tell me about',
-                r'what do you know about'
-            ]
+            logger.debug("Initial classification as search query. Now checking if this is a 'more info' follow-up")
             
             # Initial check for common "more info" patterns
-            potentially_more_info = any(re.search(pattern, user_message.lower()) for pattern in more_info_patterns)
+            potentially_more_info = any(re.search(pattern, user_message.lower()) for pattern in MORE_INFO_PATTERNS)
             
             if potentially_more_info:
-                logger.info(f"Detected potential 'more info' follow-up: '{user_message}'")
+                logger.debug("Detected potential 'more info' follow-up: '%s'", user_message)
                 
                 try:
                     # Get recent conversation to provide context
@@ -266,26 +542,19 @@ B) Requesting MORE INFORMATION about a SPECIFIC place already mentioned.
 Respond with ONLY the letter A or B."""
 
                     # Call OpenAI for classification
-                    logger.info("Calling OpenAI to classify follow-up intent")
-                    classification_response = openai.ChatCompletion.create(
-                        model="gpt-4o-mini",  # Using the same model as other calls
-                        messages=[
-                            {"role": "system", "content": "Classify user intent: A=New Search, B=More Info."},
-                            {"role": "user", "content": classification_prompt}
-                        ],
-                        max_tokens=2,
-                        temperature=0.1  # Low temperature for consistency
-                    )
+                    logger.debug("Calling OpenAI to classify follow-up intent")
+                    with stage_timer('classify_followup'):
+                        classification_response = await openai_upstream.run(_classify_follow_up, classification_prompt)
                     
                     follow_up_type = classification_response['choices'][0]['message']['content'].strip().upper()
-                    logger.info(f"Follow-up classification result: {follow_up_type}")
+                    logger.debug("Follow-up classification result: %s", follow_up_type)
                     
                     if follow_up_type == 'A':
                         call_search_function = True
-                        logger.info("Classified as a NEW SEARCH request")
+                        logger.debug("Classified as a NEW SEARCH request")
                     elif follow_up_type == 'B':
                         call_search_function = False
-                        logger.info("Classified as a MORE INFO request about a specific place")
+                        logger.debug("Classified as a MORE INFO request about a specific place")
                     else:
                         # Unexpected response, default to safer option (general chat)
                         call_search_function = False
@@ -298,45 +567,37 @@ Respond with ONLY the letter A or B."""
             else:
                 # Not a "more info" query but still a search query
                 call_search_function = True
-                logger.info("No 'more info' patterns detected. Proceeding with search.")
+                logger.debug("No 'more info' patterns detected. Proceeding with search.")
         else:
             # Not initially classified as a search query
             call_search_function = False
-            logger.info("Not classified as a search query. Handling as general chat.")
+            logger.debug("Not classified as a search query. Handling as general chat.")
         
         # Add user message to conversation history
         conversation_manager.add_message(session_id, 'user', user_message)
-        logger.info(f"Added user message to conversation history for session {session_id}")
+        logger.debug("Added user message to conversation history for session %s", session_id)
         
         # If this looks like a search query, redirect it to the search endpoint
         if call_search_function:
-            logger.info(f"Handling as NEW SEARCH query: '{user_message}'")
+            logger.debug("Handling as NEW SEARCH query: '%s'", user_message)
             # Create a new request to the search endpoint
-            search_result = await search(user_message, session_id)
-            logger.info(f"Search complete, returning result type: {type(search_result)}")
+            search_result = await search(user_message, session_id, fields=fields)
+            logger.debug("Search complete, returning result type: %s", type(search_result))
             return search_result
         
         # Get conversation history (trimmed to avoid token limits)
         conversation = conversation_manager.trim_conversation(session_id)
-        logger.info(f"Got trimmed conversation with {len(conversation)} messages")
+        logger.debug("Got trimmed conversation with %s messages", len(conversation))
         
         try:
-            logger.info("Calling OpenAI API for general chat")
+            logger.debug("Calling OpenAI API for general chat")
             
             # Check if this is a "more info" request to enhance the system message
-            is_more_info_request = any(re.search(pattern, user_message.lower()) for pattern in [
-                r'tell me more about',
-                r'more details on',
-                r'more information about',
-                r'more about',
-                r'details for',
-                r'what can you tell me about',
-                r'what do you know about'
-            ])
+            is_more_info_request = any(re.search(pattern, user_message.lower()) for pattern in MORE_INFO_PATTERNS)
             
             # Customize system message if it exists
             if is_more_info_request and conversation and conversation[0]['role'] == 'system':
-                logger.info("Enhanced system message for 'more info' request about a specific place")
+                logger.debug("Enhanced system message for 'more info' request about a specific place")
                 conversation[0]['content'] = """You are CityPulse, a helpful assistant for finding local information about places in Sydney.
 When users ask for more information about a specific place you've previously mentioned:
 1. Provide rich, detailed information about that specific place
@@ -348,16 +609,12 @@ If the user is asking about a place you haven't mentioned before or don't have i
 politely explain that you don't have specific details about that place."""
             
             # Use the older openai API style
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",  # Upgraded to GPT-4o mini for better conversation
-                messages=conversation,
-                max_tokens=1000,
-                temperature=0.7
-            )
+            with stage_timer('chat_completion'):
+                response = await openai_upstream.run(_chat_reply, conversation)
             
             # Extract the assistant's response
             assistant_message = response['choices'][0]['message']['content'].strip()
-            logger.info(f"Received response from OpenAI: '{assistant_message[:50]}...'")
+            logger.debug("Received response from OpenAI: '%s...'", assistant_message[:50])
             
             # Add assistant's response to conversation history
             conversation_manager.add_message(session_id, 'assistant', assistant_message)
@@ -365,8 +622,8 @@ politely explain that you don't have specific details about that place."""
             # Maybe cleanup old sessions
             maybe_cleanup()
             
-            logger.info("Returning successful response to client")
-            return jsonify({'response': assistant_message})
+            logger.debug("Returning successful response to client")
+            return json_response({'response': assistant_message})
             
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}", exc_info=True)
@@ -377,17 +634,22 @@ politely explain that you don't have specific details about that place."""
         return jsonify({'response': "I'm sorry, something went wrong with the chat service. Please try again."})
 
 # Simplify the search function to use only Google Maps Places API
-async def search(query=None, session_id=None):
-    """Search for places based on user query using Google Maps API only."""
-    request_start_time = datetime.now()
-    logger.info(f"=== Search Start === Received Query Parameter: '{query}', Session: {session_id}")
+async def search(query=None, session_id=None, fields=None):
+    """
+    Search for places based on user query using Google Maps API only.
+
+    `fields` optionally selects which parts of the result to return (see
+    response_shaping.shape_search_payload); by default a compact projection
+    of each place is returned.
+    """
+    logger.debug("=== Search Start === Received Query Parameter: '%s', Session: %s", query, session_id)
 
     if query:
         user_query = query
-        logger.info(f"[Search] Using passed query parameter: '{user_query}'")
+        logger.debug("[Search] Using passed query parameter: '%s'", user_query)
     elif request.method == 'POST' and request.json:
         user_query = request.json.get('query')
-        logger.info(f"[Search] Using POST request JSON query: '{user_query}'")
+        logger.debug("[Search] Using POST request JSON query: '%s'", user_query)
     else:
         user_query = ""
         logger.warning("[Search] No valid query source found.")
@@ -396,7 +658,7 @@ async def search(query=None, session_id=None):
         logger.error("[Search] CRITICAL: user_query is empty after assignment attempt.")
         return jsonify({'error': 'Internal error processing search query'}), 500
 
-    logger.info(f"[Search] Assigned User Query for processing: {user_query}")
+    logger.debug("[Search] Assigned User Query for processing: %s", user_query)
 
     try:
         # --- Extraction using OpenAI First ---
@@ -405,57 +667,18 @@ async def search(query=None, session_id=None):
         initial_requirements = None
 
         # Always try OpenAI first for structured extraction
-        prompt = f"""Extract search information from this query: "{user_query}"
-
-        This is part of a conversation about places in Sydney. The user may be asking about specific types of venues or establishments.
-
-        Pay special attention to the EXACT type of place being requested. For example:
-        - "beer garden" should be extracted as the exact amenity, not just "restaurant" or "bar"
-        - "dog friendly cafe" should extract "cafe" as the amenity and "dog-friendly" as the requirement
-        - "family restaurant in Newtown" should extract "restaurant" as the amenity and "family-friendly" as the requirement
-
-        Format your response EXACTLY like this:
-        amenity: [the EXACT type of place being sought. Examples: "beer garden", "cafe", "restaurant", "pub", etc. Be as specific as possible and match the user's words exactly. If not clearly specified, write 'not specified']
-        requirements: [specific requirements or criteria mentioned, e.g., 'dog-friendly', 'outdoor seating', 'wifi'. If not mentioned, write 'not specified']
-        location: [the specific suburb, area, or 'Sydney' if general. Use 'default' ONLY if absolutely no location mentioned.]
-        follow_up: [yes/no - indicate if this is a follow-up question that references a previous query]
-        """
-
-        logger.info(f"[Search] Using OpenAI FIRST to extract search terms from query: '{user_query}'")
-
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",  # Upgraded to GPT-4o mini for better context understanding
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that extracts search criteria (amenity, requirements, location) from user queries about finding places. You're especially good at recognizing follow-up questions that reference previous search contexts."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            response_text = response['choices'][0]['message']['content'].strip()
-            logger.info(f"[Search] OpenAI extraction response: {response_text}")
-            response_lines = response_text.split('\n')
-
-            extracted = {}
-            for line in response_lines:
-                if ': ' in line:
-                    key, value = line.split(': ', 1)
-                    # Convert string 'None' or empty brackets to empty string
-                    value_cleaned = value.strip().lower()
-                    if value_cleaned == 'none' or value_cleaned == '[none]' or value_cleaned == '[]' or value_cleaned == 'not specified':
-                        value = ''
-                    else:
-                        value = value.strip().strip('[]') # Keep original case unless empty
-                    extracted[key.strip()] = value
+            extracted = await openai_upstream.run(_extract_search_slots, user_query)
 
             initial_search_terms = extracted.get('amenity', '')
             initial_requirements = extracted.get('requirements', '')
             initial_location_query = extracted.get('location', 'default') # Default if not found
             is_follow_up = extracted.get('follow_up', '').lower() == 'yes'
 
-            logger.info(f"[Search] OpenAI Extracted Amenity: '{initial_search_terms}'")
-            logger.info(f"[Search] OpenAI Extracted Requirements: '{initial_requirements}'")
-            logger.info(f"[Search] OpenAI Extracted Location: '{initial_location_query}'")
-            logger.info(f"[Search] OpenAI Detected Follow-up: {is_follow_up}")
+            logger.debug("[Search] OpenAI Extracted Amenity: '%s'", initial_search_terms)
+            logger.debug("[Search] OpenAI Extracted Requirements: '%s'", initial_requirements)
+            logger.debug("[Search] OpenAI Extracted Location: '%s'", initial_location_query)
+            logger.debug("[Search] OpenAI Detected Follow-up: %s", is_follow_up)
 
             # Direct follow-up pattern detection
             if not is_follow_up and not initial_search_terms:
@@ -471,12 +694,12 @@ async def search(query=None, session_id=None):
                 for pattern in follow_up_patterns:
                     if re.search(pattern, user_query.lower()):
                         is_follow_up = True
-                        logger.info(f"[Search] Manual pattern detection identified follow-up: '{pattern}' in '{user_query}'")
+                        logger.debug("[Search] Manual pattern detection identified follow-up: '%s' in '%s'", pattern, user_query)
                         break
 
             # If this appears to be a follow-up question or is missing search terms but has location
             if (is_follow_up or (not initial_search_terms or initial_search_terms == 'not specified')) and session_id:
-                logger.info(f"[Search] Detected likely follow-up question. Looking for context in conversation history.")
+                logger.debug("[Search] Detected likely follow-up question. Looking for context in conversation history.")
 
                 # Initialize variables for context tracking
                 previous_search_terms = None
@@ -484,23 +707,25 @@ async def search(query=None, session_id=None):
                 use_conversation_history = True
 
                 # First check the search context cache for this session
-                if session_id in search_context_cache:
-                    cached_context = search_context_cache[session_id]
+                with span('cache.search_context') as lookup_span:
+                    cached_context = search_contexts.get(session_id)
+                    lookup_span.set(hit=cached_context is not None)
+                if cached_context:
                     # Only use cache if it's relatively recent (within last 30 minutes)
-                    if datetime.now().timestamp() - cached_context['timestamp'] < 1800:
-                        logger.info(f"[Search] Found recent search context in cache for session {session_id}")
+                    if datetime.now().timestamp() - cached_context['timestamp'] < SEARCH_CONTEXT_TTL:
+                        logger.debug("[Search] Found recent search context in cache for session %s", session_id)
                         if not initial_search_terms or initial_search_terms == 'not specified':
                             initial_search_terms = cached_context['search_terms']
-                            logger.info(f"[Search] Using cached search terms: '{initial_search_terms}'")
+                            logger.debug("[Search] Using cached search terms: '%s'", initial_search_terms)
 
                         if not initial_requirements or initial_requirements == 'not specified':
                             initial_requirements = cached_context['requirements']
-                            logger.info(f"[Search] Using cached requirements: '{initial_requirements}'")
+                            logger.debug("[Search] Using cached requirements: '%s'", initial_requirements)
 
                         # No need to continue with conversation history search
                         use_conversation_history = False
                     else:
-                        logger.info(f"[Search] Found cached context but it's too old, searching conversation history instead")
+                        logger.debug("[Search] Found cached context but it's too old, searching conversation history instead")
 
                 # If we don't have cached context or it's too old, check conversation history
                 if use_conversation_history:
@@ -516,14 +741,14 @@ async def search(query=None, session_id=None):
 
                             if msg['role'] == 'assistant' and 'I found some places matching your search' in msg['content']:
                                 # Found an assistant response with search results
-                                logger.info(f"[Search] Found previous assistant response with search results")
+                                logger.debug("[Search] Found previous assistant response with search results")
 
                                 # Look for the previous user query to get the context
                                 prev_user_query = None
                                 for prev_msg in reversed(conversation):
                                     if prev_msg['role'] == 'user' and prev_msg['content'] != user_query:
                                         prev_user_query = prev_msg['content'].lower()
-                                        logger.info(f"[Search] Found previous user query: '{prev_user_query}'")
+                                        logger.debug("[Search] Found previous user query: '%s'", prev_user_query)
                                         break
 
                                 # Extract search terms from previous user query
@@ -539,7 +764,7 @@ async def search(query=None, session_id=None):
                                             try:
                                                 last_query_amenity = re.search(r"OpenAI Extracted Amenity: '([^']+)'", prev_log).group(1)
                                                 last_query_requirements = re.search(r"OpenAI Extracted Requirements: '([^']+)'", prev_log).group(1)
-                                                logger.info(f"[Search] Found previous query context from logs: amenity='{last_query_amenity}', requirements='{last_query_requirements}'")
+                                                logger.debug("[Search] Found previous query context from logs: amenity='%s', requirements='%s'", last_query_amenity, last_query_requirements)
                                                 break
                                             except:
                                                 pass
@@ -547,7 +772,7 @@ async def search(query=None, session_id=None):
                                     # Use the found terms or fallback to pattern matching if needed
                                     if last_query_amenity and last_query_amenity != 'not specified':
                                         previous_search_terms = last_query_amenity
-                                        logger.info(f"[Search] Using previous search term from logs: '{previous_search_terms}'")
+                                        logger.debug("[Search] Using previous search term from logs: '%s'", previous_search_terms)
                                     else:
                                         # Fallback to pattern detection
                                         if 'burger' in prev_user_query:
@@ -585,7 +810,7 @@ async def search(query=None, session_id=None):
                                     # Do the same for requirements
                                     if last_query_requirements and last_query_requirements != 'not specified':
                                         previous_requirements = last_query_requirements
-                                        logger.info(f"[Search] Using previous requirements from logs: '{previous_requirements}'")
+                                        logger.debug("[Search] Using previous requirements from logs: '%s'", previous_requirements)
                                     else:
                                         # Check for specific requirements
                                         if 'dog' in prev_user_query or 'pet' in prev_user_query:
@@ -599,18 +824,18 @@ async def search(query=None, session_id=None):
                                 if not previous_search_terms:
                                     previous_search_terms = 'places'
 
-                                logger.info(f"[Search] Extracted search context from previous conversation: '{previous_search_terms}'")
+                                logger.debug("[Search] Extracted search context from previous conversation: '%s'", previous_search_terms)
                                 break
 
                         # Apply previous context if found
                         if previous_search_terms:
                             if not initial_search_terms or initial_search_terms == 'not specified':
                                 initial_search_terms = previous_search_terms
-                                logger.info(f"[Search] Using previous search term from conversation: '{initial_search_terms}'")
+                                logger.debug("[Search] Using previous search term from conversation: '%s'", initial_search_terms)
 
                             if (not initial_requirements or initial_requirements == 'not specified') and previous_requirements:
                                 initial_requirements = previous_requirements
-                                logger.info(f"[Search] Using previous requirements from conversation: '{initial_requirements}'")
+                                logger.debug("[Search] Using previous requirements from conversation: '%s'", initial_requirements)
 
                     except Exception as e:
                         logger.error(f"[Search] Error retrieving conversation context: {str(e)}")
@@ -627,21 +852,8 @@ async def search(query=None, session_id=None):
         requirements = initial_requirements
         location_query = initial_location_query.lower().strip() # Use lowercase for matching
 
-        # Simple Keyword check for requirements if OpenAI missed them
         user_query_lower = user_query.lower()
-        if not requirements:
-            if 'dog friendly' in user_query_lower or 'dog-friendly' in user_query_lower:
-                requirements = "dog-friendly"
-                logger.info("[Search] Found 'dog-friendly' requirement via keyword.")
-            elif 'family' in user_query_lower or 'family-friendly' in user_query_lower or 'kid' in user_query_lower:
-                requirements = "family-friendly"
-                logger.info("[Search] Found 'family-friendly' requirement via keyword.")
-
-        # Ensure requirements are added to search terms for Google
-        if requirements == "dog-friendly" and 'dog' not in search_terms.lower():
-            search_terms = f"{search_terms} dog friendly" if search_terms else "dog friendly"
-        elif requirements == "family-friendly" and 'family' not in search_terms.lower():
-             search_terms = f"{search_terms} family friendly" if search_terms else "family friendly"
+        search_terms, requirements = _apply_requirement_keywords(user_query, search_terms, requirements)
 
         # Final fallback for search terms
         if not search_terms or search_terms == '-':
@@ -657,14 +869,14 @@ async def search(query=None, session_id=None):
                 # Strong indicator of a follow-up question - look for the most recent search in history
                 if session_id:
                     try:
-                        logger.info("[Search] Detected follow-up based on phrasing. Checking history for context.")
+                        logger.debug("[Search] Detected follow-up based on phrasing. Checking history for context.")
                         conversation = conversation_manager.get_conversation(session_id)
 
                         # Find the most recent search query
                         for msg in reversed(conversation):
                             if msg['role'] == 'user' and msg['content'] != user_query:
                                 last_query = msg['content'].lower()
-                                logger.info(f"[Search] Found previous user query: '{last_query}'")
+                                logger.debug("[Search] Found previous user query: '%s'", last_query)
 
                                 # Extract context from the last question
                                 if 'beer garden' in last_query or 'pub' in last_query:
@@ -715,91 +927,45 @@ async def search(query=None, session_id=None):
             if not search_terms or search_terms == '-':
                 search_terms = "places"
 
-            logger.info(f"[Search] Using final fallback search term: '{search_terms}'")
+            logger.debug("[Search] Using final fallback search term: '%s'", search_terms)
 
-        logger.info(f"[Search] Final Search Terms for Google: '{search_terms}'")
-        logger.info(f"[Search] Final Requirements: '{requirements}'")
-        logger.info(f"[Search] Final Location Query: '{location_query}'")
+        logger.debug("[Search] Final Search Terms for Google: '%s'", search_terms)
+        logger.debug("[Search] Final Requirements: '%s'", requirements)
+        logger.debug("[Search] Final Location Query: '%s'", location_query)
 
         # --- Location Resolution & Dynamic Radius (Geocoding Only) ---
+        gmaps = get_gmaps()
         if not gmaps:
             return jsonify({
                 'error': 'Google Maps API is not properly configured.'
             }), 503
 
-        location = None
-        search_radius = 5000  # Default large radius
-        location_specificity = "default"
+        location, search_radius, location_specificity, location_query = await _resolve_location(location_query)
 
-        # Attempt Geocoding if a specific location query was extracted
-        if location_query and location_query != 'default':
-            try:
-                logger.info(f"[Search] Geocoding location query: '{location_query} sydney australia'")
-                geocode_result = gmaps.geocode(f"{location_query} sydney australia")
-                if geocode_result:
-                    location_data = geocode_result[0]['geometry']['location']
-                    location = (location_data['lat'], location_data['lng'])
-
-                    # Determine specificity and radius based on result type
-                    types = geocode_result[0].get('types', [])
-                    if any(t in types for t in ['locality', 'sublocality', 'neighborhood']):  # Suburb level
-                        # More focused radius for specific suburbs
-                        if location_query.lower() in ['newtown', 'surry hills', 'marrickville', 'enmore', 'erskineville']:
-                            search_radius = 800  # Smaller radius for dense inner-city suburbs
-                            logger.info(f"[Search] Using smaller radius for dense inner-city suburb: {location_query}")
-                        else:
-                            search_radius = 1500
-                        location_specificity = "geocoded_suburb"
-                    elif any(t in types for t in ['administrative_area_level_1', 'country']):  # Very broad
-                        search_radius = 10000  # Use a larger radius for broad areas like 'Sydney'
-                        location_specificity = "geocoded_broad_area"
-                    else:  # Could be a street, PoI, etc.
-                        search_radius = 2000
-                        location_specificity = "geocoded_specific"
-                    logger.info(f"[Search] Using GEOCODED location: {location_query} -> {location}. Radius: {search_radius}m")
-                else:
-                    logger.warning(f"[Search] Geocoding failed for '{location_query}'. Falling back to default Sydney CBD.")
-                    location_query = 'default'  # Mark as default if geocoding failed
-            except Exception as e:
-                logger.error(f"[Search] Geocoding error for '{location_query}': {str(e)}", exc_info=True)
-                location_query = 'default'  # Mark as default on error
-        else:
-            logger.info(f"[Search] No specific location query ('{location_query}'), using default Sydney CBD.")
-            location_query = 'default'  # Ensure it is marked default
-
-        # Fallback to Default Sydney CBD if geocoding wasn't attempted or failed
-        if not location:
-            location = (DEFAULT_LOCATION_COORDS['lat'], DEFAULT_LOCATION_COORDS['lng'])
-            search_radius = 5000  # Ensure default radius
-            location_specificity = "default_cbd"
-            logger.info(f"[Search] Using DEFAULT location (Sydney CBD) -> {location}. Radius: {search_radius}m")
+        # Near-duplicate searches for the same slots in the same area share a recent response. The slots go
+        # in the scope, not the similarity text, where repeating them drowned out the words that differ.
+        response_scope = _response_scope(location, search_radius, search_terms, requirements)
+        with span('cache.similar_response') as lookup_span:
+            cached_response, similarity = response_cache.get(response_scope, user_query)
+            lookup_span.set(hit=cached_response is not None, similarity=round(similarity, 3))
+        if cached_response is not None:
+            logger.debug("[Search] Reusing cached response for a similar search (similarity %.3f)", similarity)
+            annotate_request(response_cache='hit')
+            return _search_response(user_query, session_id, cached_response['places'], cached_response['analysis'],
+                                    search_terms, requirements, location_query, fields)
 
         # --- Search using Google Places API only ---
         try:
             # Construct better search terms by ensuring we include the requirements
-            search_query = search_terms
-
-            # Special handling for specific venue types
-            if search_terms.lower() == 'beer garden':
-                # Beer gardens are often in pubs, so include both terms
-                search_query = "pub beer garden"
-                logger.info(f"[Search] Enhanced search query for beer garden: '{search_query}'")
-            elif search_terms.lower() == 'pub':
-                # When looking for pubs, prioritize those with beer gardens
-                if 'beer garden' in user_query_lower or 'outdoor' in user_query_lower:
-                    search_query = "pub beer garden"
-                    logger.info(f"[Search] Enhanced pub search to focus on beer gardens: '{search_query}'")
-
-            # Make sure dog-friendly requirement is included in search terms
-            if requirements == 'dog-friendly' and 'dog' not in search_query.lower():
-                search_query = f"{search_query} dog friendly"
-                logger.info(f"[Search] Added dog-friendly requirement to search query: '{search_query}'")
-
-            # Fetch places from Google Places API
-            logger.info(f"[Search] Fetching places from Google Maps API: {search_query}")
-            google_places = await _fetch_google_nearby(location, search_radius, search_query)
-
-            if not google_places:
+            search_query = _build_search_query(user_query, search_terms, requirements)
+
+            # Fetch and rank candidates from Google Places API, with external
+            # candidate discovery running concurrently under its own time budget
+            logger.debug("[Search] Fetching places from Google Maps API: %s", search_query)
+            ranked_places = await _rank_candidates(location, search_radius, search_query,
+                                                   search_terms, requirements, location_query)
+
+            if not ranked_places:
                 logger.warning(f"[Search] No places found from Google Maps API.")
                 return jsonify({
                     'error': 'No places found matching your query.',
@@ -811,11 +977,11 @@ async def search(query=None, session_id=None):
                     }
                 }), 404
 
-            logger.info(f"[Search] Found {len(google_places)} places from Google Maps API")
+            logger.debug("[Search] Found %s places from Google Maps API", len(ranked_places))
 
             # Get place details for top results
-            top_places = google_places[:MAX_PLACES_TO_ANALYZE]
-            logger.info(f"[Search] Getting details for top {len(top_places)} places")
+            top_places = ranked_places[:MAX_PLACES_TO_ANALYZE]
+            logger.debug("[Search] Getting details for top %s places", len(top_places))
 
             # Get details for each place
             places_with_details = []
@@ -823,45 +989,13 @@ async def search(query=None, session_id=None):
                 place_id = place.get('place_id')
                 if place_id:
                     try:
-                        logger.info(f"[Search] Getting details for place: {place.get('name')}")
+                        logger.debug("[Search] Getting details for place: %s", place.get('name'))
 
                         # Get place details from Google Maps API
                         place_details = await _fetch_place_details(place_id)
                         if place_details:
                             # Generate AI description for this place
-                            place_name = place_details.get('name', 'This place')
-                            place_types = place_details.get('type', [])
-                            place_address = place_details.get('formatted_address', '')
-
-                            # Construct a prompt for OpenAI
-                            description_prompt = f"""
-                            Generate a very concise, friendly, one-sentence description (max 20 words)
-                            for the amenity '{place_name}' located at '{place_address}'.
-                            It is known for being types: {', '.join(place_types) if isinstance(place_types, list) else str(place_types)}.
-                            Focus on its main purpose or vibe, and link it to the user's requirement '{requirements}'.
-                            """
-
-                            try:
-                                # Use OpenAI to generate a short description
-                                description_response = openai.ChatCompletion.create(
-                                    model="gpt-4o-mini",  # Or your preferred model
-                                    messages=[
-                                        {"role": "system", "content": "You provide concise, appealing one-sentence descriptions for amenities."},
-                                        {"role": "user", "content": description_prompt}
-                                    ],
-                                    max_tokens=40,  # Limit response length
-                                    temperature=0.6  # Slightly creative but concise
-                                )
-                                short_description = description_response['choices'][0]['message']['content'].strip()
-                                logger.info(f"[Search] Generated description for {place_name}: {short_description}")
-
-                                # Add the description to the place_details dictionary
-                                place_details['ai_description'] = short_description
-
-                            except Exception as desc_error:
-                                logger.error(f"[Search] Failed to generate description for {place_name}: {str(desc_error)}")
-                                # Add a fallback description
-                                place_details['ai_description'] = f"A notable place in the area."  # Fallback
+                            await openai_upstream.run(_describe_place, place_details, requirements)
 
                             places_with_details.append(place_details)
                         else:
@@ -869,172 +1003,22 @@ async def search(query=None, session_id=None):
                     except Exception as e:
                         logger.error(f"[Search] Error getting details for place {place.get('name')}: {str(e)}")
 
-            # Analyze places using OpenAI
-            analysis_prompt = f"""Analyze these places in Sydney based on the user's query: "{user_query}"
-
-Places:
-"""
-            for i, place in enumerate(places_with_details):
-                name = place.get('name', 'Unknown')
-                address = place.get('formatted_address', 'Address unknown')
-                rating = place.get('rating', 'No rating')
-                type_list = place.get('type', [])
-                types = ', '.join(type_list if isinstance(type_list, list) else [str(type_list)])
-
-                # Add details to prompt
-                analysis_prompt += f"""
-{i+1}. {name}
-   Address: {address}
-   Rating: {rating}/5
-   Types: {types}
-   """
-
-                # Add reviews if available
-                review_list = place.get('review', [])
-                if review_list:
-                    analysis_prompt += "   Recent reviews:\n"
-                    for j, review in enumerate(review_list[:3]):  # Only include up to 3 reviews
-                        review_text = review.get('text', '').replace('\n', ' ')[:100]  # Truncate long reviews
-                        review_rating = review.get('rating', 0)
-                        analysis_prompt += f"   - {review_text}... (Rating: {review_rating}/5)\n"
-
-            # Add instructions for analysis - more conversational approach
-            analysis_prompt += f"""
-Based on the user's query: "{user_query}", provide:
-1. A friendly, conversational summary of the best options - imagine you're telling a friend about these places
-2. Specific highlights of each place that make it special, particularly focusing on {requirements if requirements else 'what makes them great'}
-3. Casual comparisons between options to help the user decide
-4. Information about the various amenities available at each place (where applicable), such as:
-   - Outdoor seating/beer gardens
-   - Pet-friendly policies and accommodations
-   - Family-friendly features
-   - Accessibility options
-   - Special events or promotions
-   - Unique features that distinguish this place
-5. Practical information like best times to visit, what to expect for crowds or wait times
-
-The user is looking for: "{search_terms}"{' that are ' + requirements if requirements else ''}.
-Only include places that actually match what they're looking for.
-
-Format your response as JSON with these fields:
-{{
-  "summary": "A friendly, conversational summary of the best places - write as if chatting with a friend",
-  "highlights": [
-    {{"place_name": "Name of Place 1", "key_features": ["A specific standout feature described conversationally", "Another great thing about this place"]}},
-    {{"place_name": "Name of Place 2", "key_features": ["What makes this place special", "Another noteworthy aspect"]}}
-  ],
-  "comparisons": ["A casual comparison between places, like 'If you prefer a relaxed vibe, X is better than Y'", "Another helpful comparison"],
-  "amenities": [
-    {{"place_name": "Name of Place 1", "amenities": ["Notable amenity 1", "Notable amenity 2"]}},
-    {{"place_name": "Name of Place 2", "amenities": ["Notable amenity 1", "Notable amenity 2"]}}
-  ],
-  "practical_info": [
-    {{"place_name": "Name of Place 1", "info": ["Best time to visit", "What to expect"]}},
-    {{"place_name": "Name of Place 2", "info": ["Best time to visit", "What to expect"]}}
-  ]
-}}
-"""
+            # Attach precomputed insights, and queue places without them for background enrichment
+            _attach_insights(places_with_details, location_query, f"{search_terms} {requirements}")
 
             # Get analysis from OpenAI
             try:
-                logger.info("[Search] Calling OpenAI for place analysis")
-
-                # Enhanced system message with the specific search context
-                system_message = "You are a friendly, conversational assistant that analyzes places for users in a helpful and personable way. Write as if you're talking to a friend rather than presenting a formal analysis."
-                if requirements:
-                    system_message += f" Pay special attention to the '{requirements}' requirement and highlight venues that truly excel at this."
-                if search_terms != "places":
-                    system_message += f" Focus specifically on whether these places are excellent {search_terms}s, sharing what makes them special."
-                system_message += " While your response will be structured as JSON, the content should be warm, helpful and engaging."
-
-                analysis_response = openai.ChatCompletion.create(
-                    model="gpt-4o-mini",  # Upgraded to GPT-4o mini for better analysis
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": analysis_prompt}
-                    ],
-                    temperature=0.7
-                )
-
-                # Extract the assistant's response
-                analysis_text = analysis_response['choices'][0]['message']['content'].strip()
-                logger.info(f"[Search] Received analysis from OpenAI")
-
-                # Try to parse JSON
-                analysis_data = {}
-                try:
-                    # Extract JSON from response
-                    json_match = re.search(r'```json\s*(.*?)\s*```', analysis_text, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group(1)
-                    else:
-                        json_str = analysis_text
-
-                    # Clean up the string and parse JSON
-                    json_str = re.sub(r'```.*?```', '', json_str, flags=re.DOTALL)
-                    analysis_data = json.loads(json_str)
-                    logger.info("[Search] Successfully parsed analysis JSON")
-                except Exception as json_error:
-                    logger.error(f"[Search] Error parsing analysis JSON: {str(json_error)}")
-                    # Fallback to text response
-                    analysis_data = {
-                        "summary": analysis_text[:500] + "...",
-                        "highlights": [],
-                        "comparisons": [],
-                        "amenities": [],
-                        "practical_info": []
-                    }
-
-                # Save the search context to the cache for future reference
-                if session_id:
-                    search_context_cache[session_id] = {
-                        'timestamp': datetime.now().timestamp(),
-                        'search_terms': search_terms,
-                        'requirements': requirements,
-                        'original_query': user_query
-                    }
-                    logger.info(f"[Search] Saved search context to cache for session {session_id}")
-
-                # Add analysis to conversation history if session provided
-                if session_id:
-                    # Create a more conversational response style
-                    conversational_response = _create_conversational_response(analysis_data, places_with_details, search_terms, requirements, location_query)
+                analysis_data = await openai_upstream.run(_analyze_places, user_query, places_with_details,
+                                                          search_terms, requirements)
 
-                    # Add the conversational response to conversation history
-                    conversation_manager.add_message(session_id, 'assistant', conversational_response)
-                    
-                    # Log the number of places being returned and query details
-                    logger.info(f"[Search] Returning {len(places_with_details)} places for follow-up query: '{user_query}' (search_terms: '{search_terms}', location: '{location_query}')")
-                    logger.info(f"[Search] First place in results: {places_with_details[0].get('name') if places_with_details else 'None'}")
-                    
-                    # Return the conversational response to match the chat style
-                    request_duration = (datetime.now() - request_start_time).total_seconds()
-                    logger.info(f"=== Search End === Total Duration: {request_duration:.2f}s")
-                    
-                    # For the response, return the conversational format
-                    return jsonify({'response': conversational_response, 
-                                  'places': places_with_details,
-                                  'analysis': analysis_data})
-
-                # Prepare final response (non-conversational, for direct API use)
-                final_data = {
-                    'places': places_with_details,
-                    'analysis': analysis_data,
-                    'query': {
-                        'original': user_query,
-                        'amenity': search_terms,
-                        'requirements': requirements,
-                        'location': location_query
-                    }
-                }
-
-                request_duration = (datetime.now() - request_start_time).total_seconds()
-                logger.info(f"=== Search End === Total Duration: {request_duration:.2f}s")
-                return jsonify(final_data)
+                response_cache.put(response_scope, user_query,
+                                   {'places': places_with_details, 'analysis': analysis_data})
+                return _search_response(user_query, session_id, places_with_details, analysis_data,
+                                        search_terms, requirements, location_query, fields)
 
             except Exception as analysis_error:
                 logger.error(f"[Search] OpenAI analysis error: {str(analysis_error)}")
-                return jsonify({
+                return json_response(shape_search_payload({
                     'places': places_with_details,
                     'error': 'Error analyzing places',
                     'query': {
@@ -1043,7 +1027,7 @@ Format your response as JSON with these fields:
                         'requirements': requirements,
                         'location': location_query
                     }
-                })
+                }, fields))
 
         except Exception as search_error:
             logger.error(f"[Search] Error during Google Places search: {str(search_error)}")
@@ -1053,65 +1037,870 @@ Format your response as JSON with these fields:
         logger.error(f"[Search] Top-level Error in search function: {str(e)}", exc_info=True)
         return jsonify({'error': 'Error processing your request.'}), 500
 
-async def _fetch_google_nearby(location, radius, keyword) -> List[Dict]:
-    """Fetches Google Nearby results asynchronously."""
-    if not gmaps:
-        logger.error("[Search] Google Maps client not available for Nearby Search.")
-        return []
+def _search_response(user_query, session_id, places_with_details, analysis_data, search_terms, requirements,
+                     location_query, fields):
+    """Record the search for follow-ups and build the response: conversational with a session, structured without."""
+    # Save the search context to the cache for future reference
+    if session_id:
+        search_contexts.set(session_id, {
+            'timestamp': datetime.now().timestamp(),
+            'search_terms': search_terms,
+            'requirements': requirements,
+            'original_query': user_query
+        })
+        logger.debug("[Search] Saved search context to cache for session %s", session_id)
+
+    # Add analysis to conversation history if session provided
+    if session_id:
+        # Create a more conversational response style
+        conversational_response = _create_conversational_response(analysis_data, places_with_details, search_terms, requirements, location_query)
+
+        # Add the conversational response to conversation history
+        conversation_manager.add_message(session_id, 'assistant', conversational_response)
+        
+        # Log the number of places being returned and query details
+        logger.debug("[Search] Returning %s places for follow-up query: '%s' (search_terms: '%s', location: '%s')", len(places_with_details), user_query, search_terms, location_query)
+        logger.debug("[Search] First place in results: %s", places_with_details[0].get('name') if places_with_details else 'None')
+        
+        # For the response, return the conversational format
+        response = json_response(shape_search_payload({'response': conversational_response,
+                                                       'places': places_with_details,
+                                                       'analysis': analysis_data}, fields))
+        # Once the response is sent, prepare answers to "tell me more" about the top places
+        response.call_on_close(lambda: profile_prefetcher.schedule(session_id, places_with_details))
+        return response
+
+    # Prepare final response (non-conversational, for direct API use)
+    final_data = {
+        'places': places_with_details,
+        'analysis': analysis_data,
+        'query': {
+            'original': user_query,
+            'amenity': search_terms,
+            'requirements': requirements,
+            'location': location_query
+        }
+    }
+
+    return json_response(shape_search_payload(final_data, fields))
+
+# Queries the local slot extractor reads with at least this confidence skip the
+# extraction LLM call (set above 1 to always ask OpenAI)
+SLOT_CONFIDENCE = float(os.getenv('SLOT_CONFIDENCE_THRESHOLD', SLOT_CONFIDENCE_THRESHOLD))
+
+@timed_stage('extract')
+def _extract_search_slots(user_query: str) -> Dict[str, str]:
+    """
+    Find the amenity, requirements, location and follow_up slots of a query.
+
+    Formulaic queries are read by the local slot extractor; the rest go to
+    OpenAI. Values that are missing or 'not specified' come back as ''.
+    Raises if the OpenAI call fails.
+    """
+    local = extract_slots(user_query)
+    annotate_span(slot_confidence=local.confidence)
+    if local.confidence >= SLOT_CONFIDENCE:
+        annotate_request(extract='local')
+        logger.debug("[Search] Local slot extraction (confidence %s): %s", local.confidence, local.to_dict())
+        return local.to_dict()
+    annotate_request(extract='llm')
+
+    prompt = f"""Extract search information from this query: "{user_query}"
+
+    This is part of a conversation about places in Sydney. The user may be asking about specific types of venues or establishments.
+
+    Pay special attention to the EXACT type of place being requested. For example:
+    - "beer garden" should be extracted as the exact amenity, not just "restaurant" or "bar"
+    - "dog friendly cafe" should extract "cafe" as the amenity and "dog-friendly" as the requirement
+    - "family restaurant in Newtown" should extract "restaurant" as the amenity and "family-friendly" as the requirement
+
+    Format your response EXACTLY like this:
+    amenity: [the EXACT type of place being sought. Examples: "beer garden", "cafe", "restaurant", "pub", etc. Be as specific as possible and match the user's words exactly. If not clearly specified, write 'not specified']
+    requirements: [specific requirements or criteria mentioned, e.g., 'dog-friendly', 'outdoor seating', 'wifi'. If not mentioned, write 'not specified']
+    location: [the specific suburb, area, or 'Sydney' if general. Use 'default' ONLY if absolutely no location mentioned.]
+    follow_up: [yes/no - indicate if this is a follow-up question that references a previous query]
+    """
+
+    logger.debug("[Search] Using OpenAI FIRST to extract search terms from query: '%s'", user_query)
+
+    response = _chat_completion(
+        model="gpt-4o-mini",  # Upgraded to GPT-4o mini for better context understanding
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that extracts search criteria (amenity, requirements, location) from user queries about finding places. You're especially good at recognizing follow-up questions that reference previous search contexts."},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    response_text = response['choices'][0]['message']['content'].strip()
+    logger.debug("[Search] OpenAI extraction response: %s", response_text)
+    response_lines = response_text.split('\n')
+
+    extracted = {}
+    for line in response_lines:
+        if ': ' in line:
+            key, value = line.split(': ', 1)
+            # Convert string 'None' or empty brackets to empty string
+            value_cleaned = value.strip().lower()
+            if value_cleaned == 'none' or value_cleaned == '[none]' or value_cleaned == '[]' or value_cleaned == 'not specified':
+                value = ''
+            else:
+                value = value.strip().strip('[]') # Keep original case unless empty
+            extracted[key.strip()] = value
+    return extracted
+
+# Limits for /search
+SEARCH_MODES = ('fast', 'full')
+MAX_SEARCH_RADIUS = 50000  # Metres
+MAX_RESULT_PLACES = 20
+
+@app.route('/search', methods=['GET', 'POST'])
+@search_admission.guard()
+@request_profiler.profile_view
+async def search_api():
+    """
+    Structured place search for integrators and the map widget.
+
+    Parameters come from the query string or a JSON body: amenity,
+    requirements, location, radius (metres), limit, mode and fields. In the
+    default `fast` mode the ranked places are returned without any LLM calls.
+    `full` mode also adds AI descriptions and the analysis, and accepts a
+    free-text `query` in place of the structured parameters.
+    """
+    params = request.args.to_dict()
+    if request.method == 'POST':
+        params.update(request.get_json(silent=True) or {})
+
+    mode = str(params.get('mode') or 'fast').lower()
+    if mode not in SEARCH_MODES:
+        return jsonify({'error': f"'mode' must be one of: {', '.join(SEARCH_MODES)}"}), 400
+    user_query = str(params.get('query') or '').strip()
+    amenity = str(params.get('amenity') or '').strip()
+    requirements = str(params.get('requirements') or '').strip()
+    location_query = str(params.get('location') or '').strip()
+    if not amenity and (mode == 'fast' or not user_query):
+        error = "'amenity' is required" + (" in fast mode" if user_query else "")
+        return jsonify({'error': error}), 400
     try:
-        loop = asyncio.get_running_loop()
-        logger.info(f"[Search] Starting Google Nearby Search - Keyword: '{keyword}'")
-        places_result = await loop.run_in_executor(
-            None, # Use default executor
-            lambda: gmaps.places_nearby(location=location, radius=radius, keyword=keyword)
-        )
-        results = places_result.get('results', [])
-        logger.info(f"[Search] Google Nearby Search finished. Found {len(results)} raw results.")
-        return results # Return all results
-    except Exception as e:
-        logger.error(f"[Search] Error during Google Nearby Search API call: {e}", exc_info=True)
-        return []
-
-async def _fetch_place_details(place_id: str) -> Optional[Dict]:
-    """Fetches details for a specific place using its ID."""
-    if not gmaps:
-        logger.error("[Search] Google Maps client not available for Place Details.")
-        return None
+        radius = int(params['radius']) if params.get('radius') else None
+        limit = max(1, min(int(params.get('limit') or MAX_PLACES_TO_ANALYZE), MAX_RESULT_PLACES))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'radius' and 'limit' must be integers"}), 400
+    if radius is not None and not 0 < radius <= MAX_SEARCH_RADIUS:
+        return jsonify({'error': f"'radius' must be between 1 and {MAX_SEARCH_RADIUS}"}), 400
+    fields = parse_fields(params.get('fields'))
+    if not get_gmaps():
+        return jsonify({'error': 'Google Maps API is not properly configured.'}), 503
+
+    annotate_request(mode=mode)
+    if not amenity:
+        try:
+            slots = await openai_upstream.run(_extract_search_slots, user_query)
+        except Exception as e:
+            logger.error(f"[Search] OpenAI extraction failed for /search: {str(e)}")
+            return jsonify({'error': "Could not interpret 'query'; pass 'amenity' and 'location' instead"}), 502
+        amenity = slots.get('amenity', '')
+        requirements = requirements or slots.get('requirements', '')
+        location_query = location_query or slots.get('location', '')
+    if not user_query:
+        user_query = f"{requirements} {amenity} in {location_query or 'Sydney'}".strip()
+
+    status, payload = await _find_places(user_query, amenity, requirements, location_query, limit, radius=radius)
+    if status == 200 and mode == 'full':
+        places = payload['places']
+        query_info = payload['query']
+        await asyncio.gather(*(openai_upstream.run(_describe_place, place, query_info['requirements'])
+                               for place in places))
+        try:
+            payload['analysis'] = await openai_upstream.run(_analyze_places, user_query, places,
+                                                            query_info['amenity'], query_info['requirements'])
+        except Exception as e:
+            logger.error(f"[Search] OpenAI analysis error: {str(e)}")
+            payload['error'] = 'Error analyzing places'
+        if fields is None:
+            fields = {'places', 'analysis', 'query'}
+    return json_response(shape_search_payload(payload, fields), status=status)
+
+# Limits for /search/batch
+BATCH_MAX_ITEMS = 500
+BATCH_DEFAULT_CONCURRENCY = 8
+BATCH_MAX_CONCURRENCY = 32
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Run many place searches concurrently and stream the results as NDJSON.
+
+    Each query is either free text ({"query": "dog friendly cafes in Newtown"},
+    or just the string) or structured ({"amenity": "cafe", "requirements":
+    "dog-friendly", "location": "Newtown"}), optionally with an "id" that is
+    echoed back. One line is written per query as soon as it completes, so
+    lines arrive in completion order and carry the query's index, followed by
+    a final summary line. No session history is read or written.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('queries')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': "Expected a non-empty 'queries' list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f"At most {BATCH_MAX_ITEMS} queries per batch"}), 400
     try:
-        loop = asyncio.get_running_loop()
-        logger.info(f"[Search] Fetching details for place ID: {place_id}")
-        details_result = await loop.run_in_executor(
-            None,
-            lambda: gmaps.place(
-                place_id=place_id,
-                fields=['name', 'formatted_address', 'rating', 'type', 'review',
-                        'photo', 'website', 'price_level', 'opening_hours',
-                        'formatted_phone_number', 'geometry']
-            )
-        )
-        result = details_result.get('result', {})
+        concurrency = max(1, min(int(data.get('concurrency', BATCH_DEFAULT_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+        limit = max(1, min(int(data.get('limit', MAX_PLACES_TO_ANALYZE)), MAX_RESULT_PLACES))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'concurrency' and 'limit' must be integers"}), 400
+    fields = parse_fields(data.get('fields', request.args.get('fields')))
+    if not get_gmaps():
+        return jsonify({'error': 'Google Maps API is not properly configured.'}), 503
+
+    # The whole batch takes one search slot, held until its last line has been produced
+    rejection = search_admission.admit()
+    if rejection is not None:
+        return rejection
+    admitted_at = time.perf_counter()
+
+    logger.debug("[Batch] Starting batch of %s queries (concurrency %s, limit %s)", len(items), concurrency, limit)
+    annotate_request(items=len(items), concurrency=concurrency)
+    lines = queue.Queue()
+    try:
+        future = background_loop.submit(_run_batch(items, concurrency, limit, fields, lines.put))
+    except Exception:
+        search_admission.release(time.perf_counter() - admitted_at)
+        raise
+    future.add_done_callback(lambda _: search_admission.release(time.perf_counter() - admitted_at))
+
+    def generate():
+        try:
+            while True:
+                line = lines.get()
+                if line is None:
+                    break
+                yield line
+        finally:
+            future.cancel()  # Stops outstanding items if the client disconnects
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+async def _run_batch(items: List, concurrency: int, limit: int, fields: Optional[Set[str]], emit):
+    """Run batch items on the background loop, emitting one NDJSON line per item and then None."""
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    memo = {}  # In-flight geocodes, Nearby Searches and details shared across the batch
+    counts = {'ok': 0, 'not_found': 0, 'invalid': 0, 'error': 0}
+
+    async def run(index, item):
+        async with semaphore:
+            try:
+                status, payload = await _search_batch_item(item, limit, memo)
+            except Exception as e:
+                logger.error(f"[Batch] Error processing item {index}: {str(e)}", exc_info=True)
+                status, payload = 500, {'error': 'Error searching for places.'}
+        counts[{200: 'ok', 404: 'not_found', 400: 'invalid'}.get(status, 'error')] += 1
+        line = {'index': index, 'status': status}
+        if isinstance(item, dict) and 'id' in item:
+            line['id'] = item['id']
+        line.update(shape_search_payload(payload, fields))
+        emit(ndjson_line(line))
 
-        # Ensure geometry.location is properly structured for the frontend
-        if 'geometry' in result and 'location' in result['geometry']:
-            # Leave geometry.location as is for the frontend to access
-            pass
+    try:
+        await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+        duration_ms = round((time.perf_counter() - start) * 1000)
+        logger.info(f"[Batch] Finished {len(items)} queries in {duration_ms}ms: {counts}")
+        emit(ndjson_line({'done': True, 'count': len(items), **counts, 'duration_ms': duration_ms}))
+    finally:
+        emit(None)
+
+async def _search_batch_item(item, limit: int, memo: Dict):
+    """Search for one batch item. Returns (status, payload) without touching any session."""
+    if isinstance(item, str):
+        item = {'query': item}
+    if not isinstance(item, dict):
+        return 400, {'error': 'Each query must be a string or an object'}
+    user_query = str(item.get('query') or '').strip()
+    amenity = str(item.get('amenity') or '').strip()
+    requirements = str(item.get('requirements') or '').strip()
+    location_query = str(item.get('location') or '').strip()
+
+    if not amenity:
+        if not user_query:
+            return 400, {'error': "Each query needs a 'query' or an 'amenity'"}
+        slots = await _deduped(memo, ('slots', user_query),
+                               lambda: openai_upstream.run(_extract_search_slots, user_query))
+        amenity = slots.get('amenity', '')
+        requirements = requirements or slots.get('requirements', '')
+        location_query = location_query or slots.get('location', '')
+    if not user_query:
+        user_query = f"{requirements} {amenity} in {location_query or 'Sydney'}".strip()
+
+    return await _find_places(user_query, amenity, requirements, location_query, limit, memo=memo)
+
+async def _find_places(user_query: str, amenity: str, requirements: str, location_query: str, limit: int,
+                       memo: Optional[Dict] = None, radius: Optional[int] = None):
+    """
+    Resolve, rank and fetch details for a structured query, with no LLM calls.
+
+    Returns (status, payload) where payload has 'places' and 'query' (or
+    'error'). `radius` overrides the radius chosen from the location.
+    """
+    search_terms, requirements = _apply_requirement_keywords(user_query, amenity, requirements)
+    search_terms = search_terms or 'places'
+    location, search_radius, _, location_query = await _resolve_location(location_query, memo)
+    search_radius = radius or search_radius
+    search_query = _build_search_query(user_query, search_terms, requirements)
+    query_info = {'original': user_query, 'amenity': search_terms,
+                  'requirements': requirements, 'location': location_query}
+
+    ranked_places = await _rank_candidates(location, search_radius, search_query, search_terms,
+                                           requirements, location_query, memo)
+    if not ranked_places:
+        return 404, {'error': 'No places found matching your query.', 'query': query_info}
+
+    details = await asyncio.gather(*(_fetch_place_details(place['place_id'], memo)
+                                     for place in ranked_places[:limit] if place.get('place_id')))
+    places = [place for place in details if place]
+    _attach_insights(places, location_query, f"{search_terms} {requirements}")
+    return 200, {'places': places, 'query': query_info}
+
+def _attach_insights(places: List[Dict], location_query: str, query: str):
+    """Attach precomputed web insights to places, queueing the rest for background enrichment."""
+    for place in places:
+        place_name = place.get('name', '')
+        place_id = place.get('place_id')
+        insights = enrichment_pipeline.get_insights(place_name, place_id)
+        if insights:
+            place['insights'] = insights
         else:
-            # Add a default location if none exists
-            logger.warning(f"[Search] Place {result.get('name', 'Unknown')} has no geometry data. Using default.")
-            result['geometry'] = {
-                'location': {'lat': -33.8978149, 'lng': 151.1785003}  # Default to Newtown
-            }
+            enrichment_pipeline.enqueue(place_name, location_query, query, place_id)
+
+@timed_stage('describe')
+def _describe_place(place_details: Dict, requirements: str):
+    """Set place_details['ai_description'] to a one-sentence OpenAI description (or a fallback)."""
+    place_name = place_details.get('name', 'This place')
+    place_types = place_details.get('type', [])
+    place_address = place_details.get('formatted_address', '')
+
+    # Construct a prompt for OpenAI
+    description_prompt = f"""
+    Generate a very concise, friendly, one-sentence description (max 20 words)
+    for the amenity '{place_name}' located at '{place_address}'.
+    It is known for being types: {', '.join(place_types) if isinstance(place_types, list) else str(place_types)}.
+    Focus on its main purpose or vibe, and link it to the user's requirement '{requirements}'.
+    """
 
-        logger.info(f"[Search] Successfully fetched details for: {result.get('name', 'Unknown')}")
-        return result
-    except Exception as e:
-        logger.error(f"[Search] Error fetching place details: {e}", exc_info=True)
+    try:
+        # Use OpenAI to generate a short description
+        description_response = _chat_completion(
+            model="gpt-4o-mini",  # Or your preferred model
+            messages=[
+                {"role": "system", "content": "You provide concise, appealing one-sentence descriptions for amenities."},
+                {"role": "user", "content": description_prompt}
+            ],
+            max_tokens=40,  # Limit response length
+            temperature=0.6  # Slightly creative but concise
+        )
+        short_description = description_response['choices'][0]['message']['content'].strip()
+        logger.debug("[Search] Generated description for %s: %s", place_name, short_description)
+
+        # Add the description to the place_details dictionary
+        place_details['ai_description'] = short_description
+
+    except Exception as desc_error:
+        logger.error(f"[Search] Failed to generate description for {place_name}: {str(desc_error)}")
+        # Add a fallback description
+        place_details['ai_description'] = f"A notable place in the area."  # Fallback
+
+def _normalize_requirement(requirements: str) -> str:
+    """'Dog Friendly, wifi' and 'wifi,dog-friendly' both become 'dog-friendly,wifi'."""
+    parts = (re.sub(r'[\s_-]+', '-', part.strip().lower()) for part in (requirements or '').split(','))
+    return ','.join(sorted(part for part in parts if part))
+
+def _details_version(place: Dict) -> str:
+    """Digest of the place details the analysis prompt uses; changes when details are refreshed with new data."""
+    review_list = (place.get('reviews') or place.get('review') or [])[:3]
+    reviews = [(review.get('text', ''), review.get('rating')) for review in review_list]
+    insights = place.get('insights') or {}
+    mentions = [mention.get('title', '') for mention in
+                (insights.get('recent_mentions', []) + insights.get('relevant_discussions', []))[:2]]
+    material = json.dumps([place.get('name'), place.get('formatted_address'), place.get('rating'),
+                           place.get('type'), reviews, mentions], sort_keys=True, default=str)
+    return hashlib.sha1(material.encode('utf-8')).hexdigest()[:12]
+
+def _place_analysis_key(place: Dict, requirements: str) -> Optional[str]:
+    place_id = place.get('place_id')
+    if not place_id:
         return None
+    return f"{place_id}|{_normalize_requirement(requirements)}|{_details_version(place)}"
+
+def _place_prompt_section(number: int, place: Dict) -> str:
+    """A place's details, reviews and web mentions as a numbered section of the analysis prompt."""
+    name = place.get('name', 'Unknown')
+    address = place.get('formatted_address', 'Address unknown')
+    rating = place.get('rating', 'No rating')
+    type_list = place.get('type', [])
+    types = ', '.join(type_list if isinstance(type_list, list) else [str(type_list)])
+
+    section = f"""
+{number}. {name}
+   Address: {address}
+   Rating: {rating}/5
+   Types: {types}
+   """
+
+    # Add reviews if available
+    review_list = place.get('reviews') or place.get('review') or []
+    if review_list:
+        section += "   Recent reviews:\n"
+        for review in review_list[:3]:  # Only include up to 3 reviews
+            review_text = review.get('text', '').replace('\n', ' ')[:100]  # Truncate long reviews
+            review_rating = review.get('rating', 0)
+            section += f"   - {review_text}... (Rating: {review_rating}/5)\n"
+
+    # Add web mentions gathered by background enrichment
+    insights = place.get('insights') or {}
+    mentions = insights.get('recent_mentions', []) + insights.get('relevant_discussions', [])
+    if mentions:
+        section += "   Mentioned online:\n"
+        for mention in mentions[:2]:
+            section += f"   - {mention.get('title', '')}: {mention.get('snippet', '')[:100]}\n"
+    return section
+
+def _parse_json_reply(text: str) -> Dict:
+    """Parse a JSON object from an LLM reply, with or without a ```json fence. Raises ValueError."""
+    json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
+    json_str = json_match.group(1) if json_match else text
+    json_str = re.sub(r'```.*?```', '', json_str, flags=re.DOTALL)
+    data = json.loads(json_str)
+    if not isinstance(data, dict):
+        raise ValueError('expected a JSON object')
+    return data
+
+@timed_stage('analysis')
+def _analyze_places(user_query: str, places: List[Dict], search_terms: str, requirements: str) -> Dict:
+    """
+    Build a structured, conversational analysis of the places.
+
+    Per-place fragments (key features, amenities, practical info) are cached
+    by place_id, normalized requirement and details version, so one OpenAI
+    call only analyzes the places without a cached fragment, and writes the
+    query-level summary and comparisons on top of the cached ones.
+
+    Returns the analysis dict (summary, highlights, comparisons, amenities,
+    practical_info), falling back to a summary-only dict if the reply is not
+    valid JSON. Raises if the OpenAI call itself fails.
+    """
+    keys = [_place_analysis_key(place, requirements) for place in places]
+    fragments = [place_analysis_cache.get(key) if key else None for key in keys]
+    uncached = [i for i, fragment in enumerate(fragments) if fragment is None]
+    annotate_span(cached_places=len(places) - len(uncached), analyzed_places=len(uncached))
+    annotate_request(analysis_cached=len(places) - len(uncached))
+
+    analysis_prompt = f"""Analyze these places in Sydney based on the user's query: "{user_query}"
+"""
+    if uncached:
+        analysis_prompt += "\nPlaces to analyze:\n"
+        for i in uncached:
+            analysis_prompt += _place_prompt_section(i + 1, places[i])
+    if len(uncached) < len(places):
+        analysis_prompt += "\nPlaces analyzed earlier (already have highlights):\n"
+        for i, fragment in enumerate(fragments):
+            if fragment is not None:
+                features = '; '.join(fragment.get('key_features', [])[:2])
+                analysis_prompt += (f"{i + 1}. {places[i].get('name', 'Unknown')} "
+                                    f"(Rating: {places[i].get('rating', 'No rating')}/5) - {features}\n")
+
+    # Add instructions for analysis - more conversational approach
+    analysis_prompt += f"""
+Based on the user's query: "{user_query}", provide:
+1. A friendly, conversational summary of the best options across all places - imagine you're telling a friend about these places
+2. Casual comparisons between options to help the user decide
+"""
+    if uncached:
+        analysis_prompt += f"""3. For each place under "Places to analyze" only, by its number:
+   - Specific highlights that make it special, particularly focusing on {requirements if requirements else 'what makes them great'}
+   - The amenities available (where applicable), such as outdoor seating/beer gardens, pet-friendly policies, family-friendly features, accessibility options, special events or unique features
+   - Practical information like best times to visit, what to expect for crowds or wait times
+"""
+    analysis_prompt += f"""
+The user is looking for: "{search_terms}"{' that are ' + requirements if requirements else ''}.
+Only include places that actually match what they're looking for.
+
+Format your response as JSON with these fields:
+{{
+  "summary": "A friendly, conversational summary of the best places - write as if chatting with a friend",
+  "comparisons": ["A casual comparison between places, like 'If you prefer a relaxed vibe, X is better than Y'", "Another helpful comparison"]"""
+    if uncached:
+        analysis_prompt += """,
+  "places": [
+    {"number": 1, "key_features": ["A specific standout feature described conversationally", "Another great thing about this place"], "amenities": ["Notable amenity 1", "Notable amenity 2"], "info": ["Best time to visit", "What to expect"]}
+  ]"""
+    analysis_prompt += "\n}\n"
+
+    logger.debug("[Search] Calling OpenAI for place analysis (%s of %s places cached)",
+                 len(places) - len(uncached), len(places))
+
+    # Enhanced system message with the specific search context
+    system_message = "You are a friendly, conversational assistant that analyzes places for users in a helpful and personable way. Write as if you're talking to a friend rather than presenting a formal analysis."
+    if requirements:
+        system_message += f" Pay special attention to the '{requirements}' requirement and highlight venues that truly excel at this."
+    if search_terms != "places":
+        system_message += f" Focus specifically on whether these places are excellent {search_terms}s, sharing what makes them special."
+    system_message += " While your response will be structured as JSON, the content should be warm, helpful and engaging."
+
+    analysis_response = _chat_completion(
+        model="gpt-4o-mini",  # Upgraded to GPT-4o mini for better analysis
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": analysis_prompt}
+        ],
+        temperature=0.7
+    )
+
+    # Extract the assistant's response
+    analysis_text = analysis_response['choices'][0]['message']['content'].strip()
+    logger.debug("[Search] Received analysis from OpenAI")
+
+    try:
+        reply = _parse_json_reply(analysis_text)
+        logger.debug("[Search] Successfully parsed analysis JSON")
+    except Exception as json_error:
+        logger.error(f"[Search] Error parsing analysis JSON: {str(json_error)}")
+        # Fallback to text response, keeping whatever per-place fragments were cached
+        reply = {"summary": analysis_text[:500] + "...", "comparisons": []}
+
+    # Cache the fragments for newly analyzed places
+    for entry in reply.get('places') or []:
+        try:
+            i = int(entry.get('number')) - 1
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if i in uncached and fragments[i] is None:
+            fragments[i] = {name: [str(item) for item in entry.get(name) or []]
+                            for name in ('key_features', 'amenities', 'info')}
+            if keys[i]:
+                place_analysis_cache.set(keys[i], fragments[i])
+
+    analysis_data = {
+        "summary": reply.get('summary', ''),
+        "highlights": [],
+        "comparisons": reply.get('comparisons', []),
+        "amenities": [],
+        "practical_info": []
+    }
+    for place, fragment in zip(places, fragments):
+        if fragment is None:
+            continue
+        name = place.get('name', 'Unknown')
+        analysis_data['highlights'].append({"place_name": name, "key_features": fragment.get('key_features', [])})
+        analysis_data['amenities'].append({"place_name": name, "amenities": fragment.get('amenities', [])})
+        analysis_data['practical_info'].append({"place_name": name, "info": fragment.get('info', [])})
+    return analysis_data
+
+def _apply_requirement_keywords(user_query: str, search_terms: str, requirements: str):
+    """Fill in requirements OpenAI missed from keywords, and fold them into the search terms."""
+    user_query_lower = user_query.lower()
+    search_terms = search_terms or ''
+    if not requirements:
+        if 'dog friendly' in user_query_lower or 'dog-friendly' in user_query_lower:
+            requirements = "dog-friendly"
+            logger.debug("[Search] Found 'dog-friendly' requirement via keyword.")
+        elif 'family' in user_query_lower or 'family-friendly' in user_query_lower or 'kid' in user_query_lower:
+            requirements = "family-friendly"
+            logger.debug("[Search] Found 'family-friendly' requirement via keyword.")
+
+    # Ensure requirements are added to search terms for Google
+    if requirements == "dog-friendly" and 'dog' not in search_terms.lower():
+        search_terms = f"{search_terms} dog friendly" if search_terms else "dog friendly"
+    elif requirements == "family-friendly" and 'family' not in search_terms.lower():
+        search_terms = f"{search_terms} family friendly" if search_terms else "family friendly"
+    return search_terms, requirements
+
+def _build_search_query(user_query: str, search_terms: str, requirements: str) -> str:
+    """Turn the extracted search terms into the keyword sent to Nearby Search."""
+    user_query_lower = user_query.lower()
+    search_query = search_terms
+
+    # Special handling for specific venue types
+    if search_terms.lower() == 'beer garden':
+        # Beer gardens are often in pubs, so include both terms
+        search_query = "pub beer garden"
+        logger.debug("[Search] Enhanced search query for beer garden: '%s'", search_query)
+    elif search_terms.lower() == 'pub':
+        # When looking for pubs, prioritize those with beer gardens
+        if 'beer garden' in user_query_lower or 'outdoor' in user_query_lower:
+            search_query = "pub beer garden"
+            logger.debug("[Search] Enhanced pub search to focus on beer gardens: '%s'", search_query)
+
+    # Make sure dog-friendly requirement is included in search terms
+    if requirements == 'dog-friendly' and 'dog' not in search_query.lower():
+        search_query = f"{search_query} dog friendly"
+        logger.debug("[Search] Added dog-friendly requirement to search query: '%s'", search_query)
+    return search_query
+
+async def _deduped(memo: Optional[Dict], key, make_coro):
+    """
+    Await make_coro(), sharing a single in-flight call per key through `memo`.
+
+    Batch searches pass one memo dict for the whole batch so items that need
+    the same geocode or place details wait on one upstream call.
+    """
+    if memo is None:
+        return await make_coro()
+    if key not in memo:
+        memo[key] = asyncio.ensure_future(make_coro())
+    return await asyncio.shield(memo[key])
+
+@timed_stage('geocode')
+async def _geocode(location_query: str, memo: Optional[Dict] = None) -> Optional[Dict]:
+    """Geocode '<query> sydney australia' to {'location': ..., 'types': ...}, caching hits."""
+    with span('cache.geocode') as lookup_span:
+        cached = geocode_cache.get(location_query)
+        lookup_span.set(hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        geocoder = get_geocoder()
+        if not geocoder:
+            return None
+        logger.debug("[Search] Geocoding location query: '%s sydney australia'", location_query)
+        geocode_result = await geocoding_upstream.run(geocoder.geocode, f"{location_query} sydney australia")
+        if not geocode_result:
+            return None
+        geocode = {'location': geocode_result[0]['geometry']['location'],
+                   'types': geocode_result[0].get('types', [])}
+        geocode_cache.set(location_query, geocode)
+        return geocode
+
+    return await _deduped(memo, ('geocode', location_query), fetch)
+
+async def _resolve_location(location_query: str, memo: Optional[Dict] = None):
+    """
+    Resolve a location query to (location, radius, specificity, location_query).
+
+    Suburbs get a tight radius and broad areas a wide one. Without a usable
+    query, or if geocoding fails, this falls back to the Sydney CBD and
+    location_query becomes 'default'.
+    """
+    location_query = (location_query or 'default').lower().strip()
+    location = None
+    search_radius = 5000  # Default large radius
+    location_specificity = "default"
+
+    # Attempt Geocoding if a specific location query was extracted
+    if location_query and location_query != 'default':
+        try:
+            geocode = await _geocode(location_query, memo)
+            if geocode:
+                location_data = geocode['location']
+                location = (location_data['lat'], location_data['lng'])
+
+                # Determine specificity and radius based on result type
+                types = geocode['types']
+                if any(t in types for t in ['locality', 'sublocality', 'neighborhood']):  # Suburb level
+                    # More focused radius for specific suburbs
+                    if location_query in ['newtown', 'surry hills', 'marrickville', 'enmore', 'erskineville']:
+                        search_radius = 800  # Smaller radius for dense inner-city suburbs
+                        logger.debug("[Search] Using smaller radius for dense inner-city suburb: %s", location_query)
+                    else:
+                        search_radius = 1500
+                    location_specificity = "geocoded_suburb"
+                elif any(t in types for t in ['administrative_area_level_1', 'country']):  # Very broad
+                    search_radius = 10000  # Use a larger radius for broad areas like 'Sydney'
+                    location_specificity = "geocoded_broad_area"
+                else:  # Could be a street, PoI, etc.
+                    search_radius = 2000
+                    location_specificity = "geocoded_specific"
+                logger.debug("[Search] Using GEOCODED location: %s -> %s. Radius: %sm", location_query, location, search_radius)
+            else:
+                logger.warning(f"[Search] Geocoding failed for '{location_query}'. Falling back to default Sydney CBD.")
+                location_query = 'default'  # Mark as default if geocoding failed
+        except Exception as e:
+            logger.error(f"[Search] Geocoding error for '{location_query}': {str(e)}", exc_info=True)
+            location_query = 'default'  # Mark as default on error
+    else:
+        logger.debug("[Search] No specific location query ('%s'), using default Sydney CBD.", location_query)
+        location_query = 'default'  # Ensure it is marked default
+
+    # Fallback to Default Sydney CBD if geocoding wasn't attempted or failed
+    if not location:
+        location = (DEFAULT_LOCATION_COORDS['lat'], DEFAULT_LOCATION_COORDS['lng'])
+        search_radius = 5000  # Ensure default radius
+        location_specificity = "default_cbd"
+        logger.debug("[Search] Using DEFAULT location (Sydney CBD) -> %s. Radius: %sm", location, search_radius)
+    return location, search_radius, location_specificity, location_query
+
+@timed_stage('candidates')
+async def _rank_candidates(location, radius, search_query, search_terms, requirements, location_query,
+                           memo: Optional[Dict] = None) -> List[Dict]:
+    """Fetch Nearby candidates and external mentions concurrently and rank them best first."""
+    google_places, external_names = await asyncio.gather(
+        _deduped(memo, ('nearby', location, radius, search_query),
+                 lambda: _fetch_google_nearby(location, radius, search_query)),
+        data_manager.find_external_candidate_names(search_terms, location_query, requirements)
+    )
+    if not google_places:
+        return []
 
-@app.teardown_appcontext
-async def teardown_session(exception=None):
-    await data_manager.close()
+    # Re-rank every candidate so details and LLM calls go to the best ones
+    external_matches = match_candidate_names(external_names, google_places, location=location_query)
+    if external_matches:
+        logger.debug("[Search] %s candidates also recommended by external sources", len(external_matches))
+
+    # Drop candidates whose reviews say they don't meet the requirements before paying for their
+    # details, as long as enough remain; otherwise the evidence weight just ranks them last
+    evidence = review_signals.evidence(google_places, requirements)
+    if evidence is not None:
+        keep = evidence > REVIEW_EVIDENCE_CUTOFF
+        if not keep.all() and keep.sum() >= MAX_PLACES_TO_ANALYZE:
+            logger.debug("[Search] Dropped %s candidates contradicted by their reviews", int((~keep).sum()))
+            annotate_request(evidence_dropped=int((~keep).sum()))
+            google_places = [place for place, kept in zip(google_places, keep) if kept]
+            evidence = evidence[keep]
+    return rank_places(google_places, location, radius, keyword=search_query, requirements=requirements,
+                       weights=RANKING_WEIGHTS, external_matches=external_matches, evidence=evidence)
+
+@timed_stage('nearby')
+async def _fetch_google_nearby(location, radius, keyword, enough=MAX_PLACES_TO_ANALYZE) -> List[Dict]:
+    """
+    Fetches Google Nearby results asynchronously.
+
+    Follows next_page_token lazily and stops as soon as `enough` high-quality
+    candidates have been collected, so common queries cost a single page.
+    """
+    gmaps = get_gmaps()
+    if not gmaps:
+        logger.error("[Search] Google Maps client not available for Nearby Search.")
+        return []
+    # Answer from the local index if an earlier search already covered this circle
+    local_results = place_index.answer_nearby(location, radius, keyword)
+    if local_results is not None:
+        logger.debug("[Search] Answered Nearby Search locally from spatial index. Found %s places.", len(local_results))
+        return local_results
+
+    results = []
+    finished = False  # Every page was fetched, so the index can answer this search next time
+    pager = NearbyPager(gmaps, location, radius, keyword, upstream=maps_upstream)
+    try:
+        async for page in pager:
+            results.extend(page)
+            place_index.insert_many(page, keyword=keyword)
+            if pager.exhausted:
+                finished = True
+            elif sum(1 for place in results if is_quality_candidate(place)) >= enough:
+                logger.debug("[Search] Enough quality candidates after %s page(s); stopping pagination.", pager.pages_fetched)
+                break
+        logger.debug("[Search] Google Nearby Search finished. Found %s raw results over %s page(s).", len(results), pager.pages_fetched)
+    except Exception as e:
+        logger.error(f"[Search] Error during Google Nearby Search API call: {e}", exc_info=True)
+        if not results:
+            return []
+    finally:
+        await pager.aclose()
+
+    if finished:
+        place_index.record_coverage(location, radius, keyword, complete=pager.complete)
+    return results # Return all results
+
+@timed_stage('details')
+async def _fetch_place_details(place_id: str, memo: Optional[Dict] = None) -> Optional[Dict]:
+    """Fetches details for a specific place using its ID (cached; deduped within a batch via `memo`)."""
+    annotate_span(place_id=place_id)
+    with span('cache.details') as lookup_span:
+        cached = details_cache.get(place_id)
+        lookup_span.set(hit=cached is not None)
+    if cached is not None:
+        logger.debug("[Search] Place details for %s served from cache", place_id)
+        return cached
+
+    async def fetch():
+        gmaps = get_gmaps()
+        if not gmaps:
+            logger.error("[Search] Google Maps client not available for Place Details.")
+            return None
+        try:
+            logger.debug("[Search] Fetching details for place ID: %s", place_id)
+            details_result = await maps_upstream.run(
+                lambda: gmaps.place(
+                    place_id=place_id,
+                    fields=['name', 'formatted_address', 'rating', 'type', 'review',
+                            'photo', 'website', 'price_level', 'opening_hours',
+                            'formatted_phone_number', 'geometry']
+                )
+            )
+            result = details_result.get('result', {})
+            result.setdefault('place_id', place_id)  # Details responses don't echo the ID back
+
+            # Ensure geometry.location is properly structured for the frontend
+            if 'geometry' in result and 'location' in result['geometry']:
+                # Leave geometry.location as is for the frontend to access, and
+                # keep the spatial index up to date with the enriched record
+                place_index.insert(result, place_id=place_id)
+            else:
+                # Add a default location if none exists
+                logger.warning(f"[Search] Place {result.get('name', 'Unknown')} has no geometry data. Using default.")
+                result['geometry'] = {
+                    'location': {'lat': -33.8978149, 'lng': 151.1785003}  # Default to Newtown
+                }
 
+            logger.debug("[Search] Successfully fetched details for: %s", result.get('name', 'Unknown'))
+            details_cache.set(place_id, result)
+            review_signals.update(result)
+            return result
+        except Exception as e:
+            logger.error(f"[Search] Error fetching place details: {e}", exc_info=True)
+            return None
+
+    result = await _deduped(memo, ('details', place_id), fetch)
+    # Callers annotate the result, so never hand out a shared dict
+    return dict(result) if result is not None else None
+
+def _generate_place_profile(place: Dict) -> str:
+    """Write a detailed "tell me more" answer for a place from its fetched details and reviews."""
+    name = place.get('name', 'Unknown')
+    profile_prompt = f"""Write a detailed, friendly profile of {name} in Sydney for someone who has asked to hear more about it.
+
+Address: {place.get('formatted_address', 'Address unknown')}
+Rating: {place.get('rating', 'No rating')}/5
+Price level: {place.get('price_level', 'Unknown')}
+Website: {place.get('website', 'Unknown')}
+Phone: {place.get('formatted_phone_number', 'Unknown')}
+"""
+    hours = (place.get('opening_hours') or {}).get('weekday_text', [])
+    if hours:
+        profile_prompt += "Opening hours:\n" + "\n".join(f"- {line}" for line in hours) + "\n"
+    if place.get('ai_description'):
+        profile_prompt += f"Summary: {place['ai_description']}\n"
+
+    # Place Details returns 'reviews' even though we request the 'review' field
+    review_list = place.get('reviews') or place.get('review') or []
+    if review_list:
+        profile_prompt += "Reviews:\n"
+        for review in review_list[:5]:
+            review_text = review.get('text', '').replace('\n', ' ')[:300]
+            profile_prompt += f"- {review_text} (Rating: {review.get('rating', 0)}/5)\n"
+
+    insights = place.get('insights') or {}
+    mentions = insights.get('recent_mentions', []) + insights.get('relevant_discussions', [])
+    if mentions:
+        profile_prompt += "Mentioned online:\n"
+        for mention in mentions[:3]:
+            profile_prompt += f"- {mention.get('title', '')}: {mention.get('snippet', '')[:150]}\n"
+
+    profile_prompt += """
+Cover the atmosphere, specialties and what makes it unique, then practical tips such as the best
+times to visit and what to expect. Be conversational, as if giving advice to a friend, and only
+use the information above."""
+
+    response = _chat_completion(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are CityPulse, a helpful assistant for finding local information about places in Sydney."},
+            {"role": "user", "content": profile_prompt}
+        ],
+        max_tokens=500,
+        temperature=0.7
+    )
+    return response['choices'][0]['message']['content'].strip()
+
+@timed_stage('respond')
 def _create_conversational_response(analysis_data, places, search_terms, requirements, location):
     """Create a friendly, conversational response like you're talking to a friend."""
 
@@ -0,0 +1,178 @@
+"""
+Fingerprinted, precompressed static asset serving.
+
+At startup every file under static/ is read once and given a content-hashed
+name (style.css -> style.3f2a9c1b04de.css). Text assets are compressed with
+gzip and (if the optional `brotli` package is installed) brotli in a
+background thread, so building the manifest does not slow startup. The
+Flask static route then serves the best variant the client accepts, with an
+immutable Cache-Control for hashed names, an ETag, and 304 responses for
+conditional GETs, so repeat page loads cost almost nothing.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.html', '.txt', '.map'}
+MIN_COMPRESS_SIZE = 512  # Bytes; smaller files are not worth compressing
+HASH_LENGTH = 12
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Content-Encoding preference order and the ETag suffix for each variant
+ENCODINGS = (('br', '-br'), ('gzip', '-gz'))
+
+
+class Asset:
+    """One static file with its fingerprint and lazily precompressed variants."""
+
+    def __init__(self, path: str, logical_name: str, content: bytes):
+        self.path = path
+        self.logical_name = logical_name
+        self.mtime = os.path.getmtime(path)
+        self.digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        self.mimetype = mimetypes.guess_type(logical_name)[0] or 'application/octet-stream'
+
+        stem, ext = os.path.splitext(logical_name)
+        self.fingerprinted_name = f"{stem}.{self.digest}{ext}"
+        self.compressible = ext.lower() in COMPRESSIBLE_EXTENSIONS and len(content) >= MIN_COMPRESS_SIZE
+
+        # encoding -> bytes, or None once compression turned out not to help
+        self._variants: Dict[str, Optional[bytes]] = {'identity': content}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: str) -> Optional[bytes]:
+        """Body for an encoding, compressing on first use. None if not worthwhile."""
+        if encoding in self._variants:
+            return self._variants[encoding]
+        if not self.compressible or (encoding == 'br' and brotli is None):
+            return None
+        with self._lock:
+            if encoding not in self._variants:
+                content = self._variants['identity']
+                if encoding == 'br':
+                    compressed = brotli.compress(content, quality=11)
+                else:
+                    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+                self._variants[encoding] = compressed if len(compressed) < len(content) else None
+        return self._variants[encoding]
+
+    def precompress(self):
+        """Build every compressed variant ahead of the first request for it."""
+        for encoding, _ in ENCODINGS:
+            self.variant(encoding)
+
+    def etag(self, encoding: str) -> str:
+        suffix = dict(ENCODINGS).get(encoding, '')
+        return f"{self.digest}{suffix}"
+
+
+class AssetPipeline:
+    """Builds and serves fingerprinted assets for a static directory."""
+
+    def __init__(self, static_dir: str, auto_reload: bool = False):
+        self.static_dir = static_dir
+        self.auto_reload = auto_reload
+        self._by_logical: Dict[str, Asset] = {}
+        self._by_fingerprint: Dict[str, Asset] = {}
+
+    def build(self):
+        """Read and hash every file under the static directory, then precompress in the background."""
+        by_logical, by_fingerprint = {}, {}
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(root, name)
+                logical_name = os.path.relpath(path, self.static_dir).replace(os.sep, '/')
+                asset = self._load(path, logical_name)
+                by_logical[logical_name] = asset
+                by_fingerprint[asset.fingerprinted_name] = asset
+        self._by_logical, self._by_fingerprint = by_logical, by_fingerprint
+        logger.info(f"Built {len(by_logical)} static assets (brotli {'enabled' if brotli else 'unavailable'})")
+
+        # Compress off the startup path; a request that arrives first just compresses on demand
+        threading.Thread(target=lambda: [a.precompress() for a in by_logical.values()],
+                         name='asset-precompress', daemon=True).start()
+        return self
+
+    def _load(self, path: str, logical_name: str) -> Asset:
+        with open(path, 'rb') as f:
+            return Asset(path, logical_name, f.read())
+
+    def _refresh_if_changed(self, asset: Asset) -> Asset:
+        """In debug mode, pick up edits to a file without restarting."""
+        try:
+            if os.path.getmtime(asset.path) == asset.mtime:
+                return asset
+        except OSError:
+            return asset
+        fresh = self._load(asset.path, asset.logical_name)
+        self._by_logical[fresh.logical_name] = fresh
+        self._by_fingerprint[fresh.fingerprinted_name] = fresh
+        return fresh
+
+    def url_name(self, filename: str) -> str:
+        """Name to put in URLs for a logical static filename."""
+        asset = self._by_logical.get(filename)
+        if asset is None:
+            return filename
+        if self.auto_reload:
+            asset = self._refresh_if_changed(asset)
+        return asset.fingerprinted_name
+
+    def lookup(self, filename: str) -> Tuple[Optional[Asset], bool]:
+        """Return (asset, is_fingerprinted) for a requested filename."""
+        asset = self._by_fingerprint.get(filename)
+        if asset is not None:
+            return asset, True
+        asset = self._by_logical.get(filename)
+        if asset is not None and self.auto_reload:
+            asset = self._refresh_if_changed(asset)
+        return asset, False
+
+    def serve(self, filename: str, request) -> Optional[Response]:
+        """
+        Build the response for a static request, or None if the file is unknown.
+
+        Negotiates Content-Encoding from Accept-Encoding, and answers 304 when
+        the client already holds the selected representation.
+        """
+        asset, fingerprinted = self.lookup(filename)
+        if asset is None:
+            return None
+
+        encoding, body = 'identity', asset.variant('identity')
+        for candidate, _ in ENCODINGS:
+            if request.accept_encodings[candidate]:
+                compressed = asset.variant(candidate)
+                if compressed is not None:
+                    encoding, body = candidate, compressed
+                    break
+        etag = asset.etag(encoding)
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,75 @@
+"""
+A process-wide asyncio event loop running in a daemon thread.
+
+Flask runs each async view in its own short-lived event loop, so work that
+must outlive a request (enrichment, prefetching, periodic maintenance) is
+scheduled onto this loop instead. The thread is started on first use, which
+also means each forked gunicorn worker gets its own loop.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """Lazily started event loop in a daemon thread."""
+
+    def __init__(self, name: str = 'citypulse-background'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, starting the thread if needed (or after a fork)."""
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                ready = threading.Event()
+                loop = asyncio.new_event_loop()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop, self._pid = loop, os.getpid()
+                logger.info(f"Started background loop '{self.name}'")
+        return self._loop
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback: Callable, *args):
+        """Run a plain callback on the loop thread from any thread."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def run_periodically(self, interval: float, func: Callable[[], Any]) -> concurrent.futures.Future:
+        """Call a blocking function every `interval` seconds in the loop's executor, logging failures."""
+        async def repeat():
+            loop = asyncio.get_running_loop()
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await loop.run_in_executor(None, func)
+                except Exception as e:
+                    logger.error(f"Periodic task {getattr(func, '__name__', func)} failed: {str(e)}")
+
+        return self.submit(repeat())
+
+
+# Shared by every module that needs work done off the request path
+background_loop = BackgroundLoop()
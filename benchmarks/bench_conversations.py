@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Conversation store size and latency: plain JSON vs compressed and capped.
+
+Builds a corpus of chat sessions shaped like the app's: a system prompt,
+short user queries and long assistant replies listing places with
+descriptions, saved after every message the way add_message() does. Session
+lengths are skewed, so a few long-lived sessions grow well past the byte
+cap. For each storage configuration the benchmark reports:
+
+- the database size after writing every session, after deleting half of
+  them (as cleanup_old_sessions() does), and after compact();
+- save_conversation() latency per write, and get_conversation() latency
+  per session with a cold in-memory cache;
+- how many writes the per-session cap shortened.
+
+The first row is the storage as it was before compression, caps and
+compaction (plain JSON, no cap, nothing vacuumed).
+
+Usage:
+    python benchmarks/bench_conversations.py [--sessions 400] [--max-bytes 16384] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conversation_manager import MAX_SESSION_BYTES, ConversationManager  # noqa: E402
+
+SYSTEM_PROMPT = ("You are CityPulse, a helpful assistant for finding local information and answering questions "
+                 "about places in Sydney. Provide detailed and helpful responses.")
+AMENITIES = ['pubs', 'cafes', 'beer gardens', 'wine bars', 'thai restaurants', 'bakeries', 'brunch spots']
+REQUIREMENTS = ['dog friendly', 'with outdoor seating', 'with wifi', 'family friendly', 'quiet', '']
+SUBURBS = ['Newtown', 'Surry Hills', 'Glebe', 'Marrickville', 'Enmore', 'Bondi', 'Balmain', 'Redfern']
+STREETS = ['King St', 'Crown St', 'Glebe Point Rd', 'Enmore Rd', 'Darling St', 'Regent St']
+FEATURES = ['a leafy beer garden', 'water bowls for dogs', 'a long craft beer list', 'heaters in winter',
+            'live music on Fridays', 'a kids menu', 'fast wifi and plenty of power points', 'a quiet back room',
+            'great coffee', 'wood-fired pizza', 'friendly staff', 'a rooftop terrace', 'trivia on Tuesdays']
+
+
+def user_message(rng):
+    requirement = rng.choice(REQUIREMENTS)
+    return f"{requirement} {rng.choice(AMENITIES)} in {rng.choice(SUBURBS)}".strip().capitalize()
+
+
+def assistant_message(rng):
+    lines = [f"I found some great places in {rng.choice(SUBURBS)} that match what you're after:\n"]
+    for _ in range(7):
+        name = f"The {rng.choice(['Royal', 'Courthouse', 'Union', 'Bank', 'Marly', 'Townie'])} " \
+               f"{rng.choice(['Hotel', 'Cafe', 'Bar', 'Kitchen'])} {rng.randint(1, 99)}"
+        features = ', '.join(rng.sample(FEATURES, 3))
+        lines.append(f"**{name}** - Located at {rng.randint(1, 400)} {rng.choice(STREETS)}. Rated "
+                     f"{rng.uniform(3.8, 4.9):.1f} from {rng.randint(20, 3000)} reviews. Known for {features}. "
+                     f"Reviewers mention it gets busy on weekends, so arrive early.\n")
+    lines.append("Would you like more details on any of these places?")
+    return '\n'.join(lines)
+
+
+def corpus(sessions, seed=11):
+    """Per session, the conversation after each message."""
+    rng = random.Random(seed)
+    for i in range(sessions):
+        turns = min(int(rng.paretovariate(1.1) * 3), 200)
+        conversation = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+        snapshots = []
+        for _ in range(turns):
+            conversation.append({'role': 'user', 'content': user_message(rng)})
+            snapshots.append(list(conversation))
+            conversation.append({'role': 'assistant', 'content': assistant_message(rng)})
+            snapshots.append(list(conversation))
+        yield f"session-{i:05d}", snapshots
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run(name, sessions, compress, max_bytes, compact, directory):
+    path = os.path.join(directory, f"{name.replace(' ', '_')}.db")
+    manager = ConversationManager(path, cache_size=0, compress=compress, max_session_bytes=max_bytes)
+    writes = []
+    session_ids = []
+    for session_id, snapshots in corpus(sessions):
+        session_ids.append(session_id)
+        for conversation in snapshots:
+            start = time.perf_counter()
+            manager.save_conversation(session_id, conversation)
+            writes.append((time.perf_counter() - start) * 1000)
+    written_size = os.path.getsize(path)
+
+    reads = []
+    for session_id in session_ids:
+        start = time.perf_counter()
+        manager.get_conversation(session_id)
+        reads.append((time.perf_counter() - start) * 1000)
+
+    conn = sqlite3.connect(path)
+    conn.executemany('DELETE FROM sessions WHERE session_id = ?', [(sid,) for sid in session_ids[::2]])
+    conn.commit()
+    conn.close()
+    deleted_size = os.path.getsize(path)
+
+    compact_ms = None
+    if compact:
+        start = time.perf_counter()
+        manager.compact(max_pages=10 ** 9)
+        compact_ms = (time.perf_counter() - start) * 1000
+    return {
+        'config': name,
+        'writes': len(writes),
+        'db_mb': round(written_size / 2 ** 20, 2),
+        'after_delete_mb': round(deleted_size / 2 ** 20, 2),
+        'after_compact_mb': round(os.path.getsize(path) / 2 ** 20, 2),
+        'write_p50_ms': round(percentile(writes, 0.5), 3),
+        'write_p99_ms': round(percentile(writes, 0.99), 3),
+        'read_p50_ms': round(percentile(reads, 0.5), 3),
+        'read_p99_ms': round(percentile(reads, 0.99), 3),
+        'compact_ms': round(compact_ms, 1) if compact_ms is not None else None,
+        'capped_writes': manager.capped_writes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=400)
+    parser.add_argument('--max-bytes', type=int, default=MAX_SESSION_BYTES)
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per row')
+    args = parser.parse_args()
+
+    configs = [
+        ('plain json', False, None, False),
+        ('zlib', True, None, True),
+        ('zlib + cap', True, args.max_bytes, True),
+    ]
+    columns = ['config', 'writes', 'db_mb', 'after_delete_mb', 'after_compact_mb', 'write_p50_ms', 'write_p99_ms',
+               'read_p50_ms', 'read_p99_ms', 'compact_ms', 'capped_writes']
+    with tempfile.TemporaryDirectory() as directory:
+        if not args.json:
+            print(' '.join(f"{column:>16}" for column in columns))
+        for name, compress, max_bytes, compact in configs:
+            row = run(name, args.sessions, compress, max_bytes, compact, directory)
+            if args.json:
+                print(json.dumps(row))
+            else:
+                print(' '.join(f"{'-' if row[column] is None else row[column]!s:>16}" for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Per-request logging overhead benchmark.
+
+Replays the logging a single chat search used to do (about 45 INFO lines
+with eagerly built f-strings, some of them embedding place dicts) against
+the current setup: the same lines at DEBUG with lazy %-arguments, a
+DeferredQueueHandler feeding a QueueListener thread, and one structured
+summary line per request. The time reported is what the request thread
+spends in logging calls; the listener's writing happens off that thread.
+
+Sinks: a plain file, and a file behind a simulated slow stream (a pipe to
+a busy log shipper or a terminal), where each write blocks for
+--slow-write-us microseconds.
+
+Usage:
+    python benchmarks/bench_logging.py [--requests 500] [--slow-write-us 200] [--json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from logging.handlers import QueueListener
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from logging_setup import (LOG_FORMAT, DeferredQueueHandler, finish_request, record_stage,  # noqa: E402
+                           start_request)
+
+LINES_PER_REQUEST = 45
+PLACE = {'name': 'The Test Hotel', 'place_id': 'ChIJ' + 'x' * 23, 'rating': 4.4, 'user_ratings_total': 812,
+         'vicinity': '1 King St, Newtown', 'types': ['bar', 'restaurant', 'food', 'point_of_interest']}
+
+logger = logging.getLogger('bench.search')
+
+
+class SlowStream:
+    """File wrapper whose writes block, like a full pipe to a log collector."""
+
+    def __init__(self, stream, delay_s):
+        self.stream = stream
+        self.delay_s = delay_s
+
+    def write(self, text):
+        time.sleep(self.delay_s)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def before_request(i):
+    """The old hot path: INFO with eager f-strings."""
+    query = f"dog friendly pubs with a beer garden in Newtown {i}"
+    for line in range(LINES_PER_REQUEST):
+        if line % 5 == 0:
+            logger.info(f"[Search] Place details for {PLACE['name']}: {PLACE}")
+        else:
+            logger.info(f"[Search] Step {line} for query '{query}' - candidates: {line * 3}")
+
+
+def after_request(i):
+    """The current hot path: lazy DEBUG lines plus one summary line."""
+    query = f"dog friendly pubs with a beer garden in Newtown {i}"
+    start_request(method='POST', path='/chat')
+    for line in range(LINES_PER_REQUEST):
+        if line % 5 == 0:
+            logger.debug("[Search] Place details for %s: %s", PLACE['name'], PLACE)
+        else:
+            logger.debug("[Search] Step %s for query '%s' - candidates: %s", line, query, line * 3)
+    for stage in ('extract', 'geocode', 'candidates', 'details', 'analysis'):
+        record_stage(stage, 0.001)
+    finish_request(status=200)
+
+
+def run(mode, requests, stream):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = None
+    if mode == 'before':
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        request = before_request
+    else:
+        queue_handler = DeferredQueueHandler(queue.Queue(maxsize=100000))
+        listener = QueueListener(queue_handler.queue, handler)
+        listener.start()
+        root.addHandler(queue_handler)
+        root.setLevel(logging.INFO)
+        request = after_request
+
+    try:
+        start = time.perf_counter()
+        for i in range(requests):
+            request(i)
+        request_thread_s = time.perf_counter() - start
+        if listener:
+            listener.stop()  # Drain the queue so the next run starts clean
+    finally:
+        for h in root.handlers[:]:
+            root.removeHandler(h)
+        for h in saved_handlers:
+            root.addHandler(h)
+        root.setLevel(saved_level)
+    return request_thread_s / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--slow-write-us', type=float, default=200, help='Blocking time per write for the slow sink')
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per row')
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{args.requests} requests, {LINES_PER_REQUEST} log lines each")
+        print(f"{'sink':>10} {'before us/req':>14} {'after us/req':>13} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for sink in ('file', 'slow'):
+            results = {}
+            for mode in ('before', 'after'):
+                with open(os.path.join(tmp, f'{sink}-{mode}.log'), 'w') as stream:
+                    target = SlowStream(stream, args.slow_write_us / 1e6) if sink == 'slow' else stream
+                    results[mode] = run(mode, args.requests, target)
+            speedup = results['before'] / results['after']
+            if args.json:
+                print(json.dumps({'sink': sink, 'before_us': round(results['before'], 1),
+                                  'after_us': round(results['after'], 1), 'speedup': round(speedup, 1)}))
+            else:
+                print(f"{sink:>10} {results['before']:>14.1f} {results['after']:>13.1f} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark for candidate re-ranking.
+
+Times rank_places() over synthetic Nearby Search results for the candidate
+counts a search can produce (one to three pages of 20), to show ranking is
+negligible next to a single Place Details round trip (~100-300ms).
+
+Usage:
+    python benchmarks/bench_ranking.py [--repeat 2000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ranking import rank_places  # noqa: E402
+
+NEWTOWN = (-33.8978, 151.1785)
+CANDIDATE_COUNTS = [5, 10, 20, 40, 60]
+TYPES = [['bar', 'restaurant', 'food'], ['cafe', 'food'], ['night_club', 'bar'], ['restaurant', 'food']]
+
+
+def make_candidates(count, seed=0):
+    """Generate Nearby Search style candidates around Newtown."""
+    rng = random.Random(seed)
+    candidates = []
+    for i in range(count):
+        place = {
+            'place_id': f"place-{i}",
+            'name': rng.choice(['The Courthouse Hotel', 'Bank Hotel', 'Coffee Lab', 'Union Hotel', 'Thai Pothong']),
+            'types': rng.choice(TYPES) + ['point_of_interest', 'establishment'],
+            'geometry': {'location': {'lat': NEWTOWN[0] + rng.uniform(-0.01, 0.01),
+                                      'lng': NEWTOWN[1] + rng.uniform(-0.01, 0.01)}},
+        }
+        if rng.random() > 0.1:
+            place['rating'] = round(rng.uniform(3.0, 5.0), 1)
+            place['user_ratings_total'] = rng.randint(1, 4000)
+        if rng.random() > 0.2:
+            place['opening_hours'] = {'open_now': rng.random() > 0.3}
+        candidates.append(place)
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10} {'mean us':>9} {'p99 us':>8}")
+    for count in CANDIDATE_COUNTS:
+        candidates = make_candidates(count)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rank_places(candidates, NEWTOWN, 800, keyword='pub beer garden dog friendly', requirements='dog-friendly')
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+        print(f"{count:>10} {statistics.mean(timings):>9.1f} {timings[int(len(timings) * 0.99)]:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Memory per cached place and per conversation message: dicts vs records.
+
+Builds synthetic Google-shaped Nearby Search results, Place Details results
+(with reviews and photos) and chat messages, and decodes each from its own
+JSON document the way responses arrive. It then measures the memory kept
+alive by holding them as plain dicts and as the compact slotted records
+from records.py, using tracemalloc. The records are also checked to
+round-trip to the original dicts.
+
+Usage:
+    python benchmarks/bench_records.py [--places 5000] [--messages 20000] [--json]
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from records import MessageRecord, PlaceRecord  # noqa: E402
+
+TYPES = ['bar', 'restaurant', 'cafe', 'food', 'point_of_interest', 'establishment', 'night_club', 'bakery',
+         'meal_takeaway', 'liquor_store']
+RELATIVE_TIMES = ['a week ago', '2 weeks ago', 'a month ago', '2 months ago', '5 months ago', 'a year ago']
+WORDS = ('great friendly staff beer garden dog water bowl coffee quiet busy weekend live music food '
+         'cheap pricey cosy outdoor seating heaters view service slow fast clean').split()
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def nearby_place(rng, i):
+    lat, lng = -33.89 + rng.uniform(-0.05, 0.05), 151.18 + rng.uniform(-0.05, 0.05)
+    return {
+        'business_status': 'OPERATIONAL',
+        'geometry': {'location': {'lat': lat, 'lng': lng},
+                     'viewport': {'northeast': {'lat': lat + 0.001, 'lng': lng + 0.001},
+                                  'southwest': {'lat': lat - 0.001, 'lng': lng - 0.001}}},
+        'icon': 'https://maps.gstatic.com/mapfiles/place_api/icons/v1/png_71/bar-71.png',
+        'icon_background_color': '#FF9E67',
+        'icon_mask_base_uri': 'https://maps.gstatic.com/mapfiles/place_api/icons/v2/bar_pinlet',
+        'name': f'The Test Hotel {i}',
+        'opening_hours': {'open_now': rng.random() < 0.7},
+        'photos': [{'height': 3024, 'width': 4032,
+                    'html_attributions': [f'<a href="https://maps.google.com/maps/contrib/{rng.getrandbits(60)}">A Photographer</a>'],
+                    'photo_reference': 'Aap_uE' + ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(180))}],
+        'place_id': f'ChIJ{rng.getrandbits(100):025x}',
+        'plus_code': {'compound_code': '46C8+XX Newtown NSW, Australia', 'global_code': '4RRH46C8+XX'},
+        'price_level': rng.randint(1, 3),
+        'rating': round(rng.uniform(3, 5), 1),
+        'reference': f'ChIJ{rng.getrandbits(100):025x}',
+        'scope': 'GOOGLE',
+        'types': rng.sample(TYPES, 4),
+        'user_ratings_total': rng.randint(5, 3000),
+        'vicinity': f'{rng.randint(1, 400)} King Street, Newtown',
+    }
+
+
+def details_place(rng, i):
+    place = nearby_place(rng, i)
+    place['formatted_address'] = f"{place['vicinity']} NSW 2042, Australia"
+    place['formatted_phone_number'] = f'(02) 95{rng.randint(10, 99)} {rng.randint(1000, 9999)}'
+    place['website'] = f'https://www.testhotel{i}.com.au/'
+    place['opening_hours']['weekday_text'] = [f'{day}: 11:00 AM – 12:00 AM' for day in
+                                              ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+                                               'Saturday', 'Sunday')]
+    place['reviews'] = [{
+        'author_name': f'Reviewer {rng.randint(1, 10 ** 6)}',
+        'author_url': f'https://www.google.com/maps/contrib/{rng.getrandbits(60)}/reviews',
+        'language': 'en', 'original_language': 'en',
+        'profile_photo_url': f'https://lh3.googleusercontent.com/a-/{rng.getrandbits(120):x}=s128-c0x00000000-cc-rp-mo',
+        'rating': rng.randint(1, 5),
+        'relative_time_description': rng.choice(RELATIVE_TIMES),
+        'text': text(rng, rng.randint(10, 60)),
+        'time': 1700000000 + rng.randint(0, 10 ** 7),
+        'translated': False,
+    } for _ in range(5)]
+    return place
+
+
+def message(rng):
+    role = rng.choice(['user', 'assistant'])
+    return {'role': role, 'content': text(rng, 8 if role == 'user' else 60)}
+
+
+def retained_bytes(build):
+    """Bytes still allocated after build() returns the objects to keep."""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, kept
+
+
+def compare(documents, to_record):
+    dict_bytes, dicts = retained_bytes(lambda: [json.loads(doc) for doc in documents])
+    record_bytes, records = retained_bytes(lambda: [to_record(json.loads(doc)) for doc in documents])
+    assert all(record.to_dict() == original for record, original in zip(records, dicts)), 'round trip changed data'
+    return dict_bytes / len(documents), record_bytes / len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--places', type=int, default=5000)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per row')
+    args = parser.parse_args()
+
+    rng = random.Random(41)
+    rows = [
+        ('nearby place', [json.dumps(nearby_place(rng, i)) for i in range(args.places)], PlaceRecord.from_google),
+        ('details place', [json.dumps(details_place(rng, i)) for i in range(args.places)], PlaceRecord.from_google),
+        ('message', [json.dumps(message(rng)) for _ in range(args.messages)], MessageRecord.from_dict),
+    ]
+    if not args.json:
+        print(f"{'kind':>14} {'dict bytes':>11} {'record bytes':>13} {'saved':>7}")
+    for kind, documents, to_record in rows:
+        dict_bytes, record_bytes = compare(documents, to_record)
+        saved = 1 - record_bytes / dict_bytes
+        if args.json:
+            print(json.dumps({'kind': kind, 'dict_bytes': round(dict_bytes), 'record_bytes': round(record_bytes),
+                              'saved': round(saved, 3)}))
+        else:
+            print(f"{kind:>14} {dict_bytes:>11.0f} {record_bytes:>13.0f} {saved * 100:>6.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Shared-state cache hit rate benchmark.
+
+Replays one Zipf-distributed stream of cache keys (popular searches repeat,
+the long tail does not) across N worker processes, dealt out round-robin the
+way a load balancer spreads requests. Each worker does a get, and a set on
+a miss, against either the per-process memory backend or the shared SQLite
+backend. With the memory backend every worker warms its own copy, so the hit
+rate falls as workers are added; with SQLite it should stay flat.
+
+Usage:
+    python benchmarks/bench_shared_state.py [--requests 20000] [--keys 2000] [--workers 1,2,4,8] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared_state import create_shared_state  # noqa: E402
+
+
+def key_stream(requests, keys, skew, seed=7):
+    """Zipf-distributed keys, truncated to `keys` distinct values."""
+    rng = np.random.default_rng(seed)
+    ranks = rng.zipf(skew, size=requests * 2)
+    return [f"search-{rank}" for rank in ranks[ranks <= keys][:requests]]
+
+
+def worker(backend, path, keys, results):
+    state = create_shared_state(backend, path)
+    namespace = state.namespace('bench', ttl=3600)
+    hits = 0
+    start = time.perf_counter()
+    for key in keys:
+        if namespace.get(key) is not None:
+            hits += 1
+        else:
+            namespace.set(key, {'query': key, 'places': ['place-id'] * 10})
+    results.put((hits, len(keys), time.perf_counter() - start))
+    state.close()
+
+
+def run(backend, workers, stream):
+    """Replay the stream over `workers` processes and return (hit rate, mean us per request)."""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'shared_state.db')
+        create_shared_state(backend, path).close()  # Create the schema before the workers race for it
+        processes = [context.Process(target=worker, args=(backend, path, stream[i::workers], results))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    hits = sum(o[0] for o in outcomes)
+    total = sum(o[1] for o in outcomes)
+    per_request_us = sum(o[2] for o in outcomes) / total * 1e6
+    return hits / total, per_request_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=2000, help='Distinct cache keys')
+    parser.add_argument('--skew', type=float, default=1.2, help='Zipf exponent')
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts')
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per row')
+    args = parser.parse_args()
+
+    stream = key_stream(args.requests, args.keys, args.skew)
+    if not args.json:
+        print(f"{len(stream)} requests over {len(set(stream))} distinct keys")
+        print(f"{'workers':>8} {'memory hit%':>12} {'sqlite hit%':>12} {'memory us/req':>14} {'sqlite us/req':>14}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        memory_rate, memory_us = run('memory', workers, stream)
+        sqlite_rate, sqlite_us = run('sqlite', workers, stream)
+        if args.json:
+            print(json.dumps({'workers': workers, 'memory_hit_rate': round(memory_rate, 4),
+                              'sqlite_hit_rate': round(sqlite_rate, 4), 'memory_us': round(memory_us, 1),
+                              'sqlite_us': round(sqlite_us, 1)}))
+        else:
+            print(f"{workers:>8} {memory_rate * 100:>11.1f}% {sqlite_rate * 100:>11.1f}% "
+                  f"{memory_us:>14.1f} {sqlite_us:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Similarity response cache: paraphrase precision/recall and lookup latency.
+
+Precision and recall come from a labelled paraphrase set: groups of
+queries that should share a cached response, all in the same location
+scope. Queries are compared as the raw user message, which is the key
+search() looks responses up by. Every pair within a group is a positive and every pair across
+groups a negative. A pair is predicted to match when its cosine similarity
+reaches the threshold. Precision is the share of predicted matches that
+are real paraphrases; a false match serves the wrong places, so precision
+matters more than recall.
+
+Latency is per SimilarityCache.get() miss with --entries indexed (a miss
+scans the whole scope, so it is the slow case). The entries are spread
+over --cells location scopes, and also all put in one scope as the worst
+case.
+
+Usage:
+    python benchmarks/bench_similarity_cache.py [--entries 100000] [--cells 200] [--lookups 1000] [--json]
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shared_state import SharedState  # noqa: E402
+from similarity_cache import SIMILARITY_THRESHOLD, SimilarityCache, vectorize  # noqa: E402
+
+PARAPHRASE_GROUPS = [
+    ["dog-friendly pubs newtown", "pubs in newtown that allow dogs", "dog friendly pubs in Newtown",
+     "pet friendly pubs in newtown", "where can I take my dog for a beer in newtown"],
+    # One extra requirement away from the group above, so they must not match it
+    ["dog friendly pubs in newtown with live music", "dog friendly pubs with live music in newtown"],
+    ["cheap dog friendly pubs in newtown", "affordable dog friendly pubs newtown"],
+    ["dog friendly pubs in newtown with vegan food", "vegan friendly dog friendly pubs newtown"],
+    ["family friendly pubs in newtown", "kid friendly pubs newtown", "pubs good for kids in newtown"],
+    ["dog friendly cafes in newtown", "cafes that allow dogs newtown", "pet friendly coffee shops newtown"],
+    ["cafes with wifi in newtown", "newtown cafe with free wifi", "coffee with internet in newtown"],
+    ["quiet cafes with wifi newtown", "cafes with wifi that are quiet in newtown"],
+    ["beer gardens in newtown", "pubs with a beer garden in newtown", "best beer garden newtown"],
+    ["thai food newtown", "thai restaurants in newtown", "best thai in newtown"],
+    ["cheap pubs in newtown", "affordable pubs newtown", "budget friendly pubs in newtown"],
+    ["cafes with good pastries in newtown", "cafes with great pastries newtown", "newtown cafes known for pastries"],
+    ["bars with live music in newtown", "live music bars newtown", "newtown bar with live music"],
+    ["pubs in newtown", "newtown pubs", "good pubs near newtown"],
+    ["vegan restaurants in newtown", "restaurants with vegan options newtown"],
+    ["cafes that are not busy in newtown", "quiet cafes newtown"],
+]
+THRESHOLDS = (0.75, 0.8, 0.85, 0.9, 0.95)
+AMENITIES = ['pubs', 'cafes', 'bars', 'thai food', 'restaurants', 'beer gardens', 'bakeries', 'wine bars']
+REQUIREMENTS = ['', 'dog friendly', 'with wifi', 'cheap', 'quiet', 'with live music', 'family friendly', 'vegan']
+EXTRAS = ['', 'with good pastries', 'with heaters', 'near the station', 'with pool tables', 'for brunch',
+          'open on sunday', 'with big screens', 'with a fireplace', 'with board games']
+
+
+def pair_metrics():
+    vectors = [[vectorize(query) for query in group] for group in PARAPHRASE_GROUPS]
+    similarities = []  # (similarity, is_paraphrase)
+    for g, group in enumerate(vectors):
+        for a, b in itertools.combinations(group, 2):
+            similarities.append((float(a @ b), True))
+        for other in vectors[g + 1:]:
+            for a, b in itertools.product(group, other):
+                similarities.append((float(a @ b), False))
+    rows = []
+    for threshold in THRESHOLDS:
+        tp = sum(1 for s, same in similarities if same and s >= threshold)
+        fp = sum(1 for s, same in similarities if not same and s >= threshold)
+        fn = sum(1 for s, same in similarities if same and s < threshold)
+        rows.append({'threshold': threshold, 'precision': round(tp / (tp + fp), 3) if tp + fp else None,
+                     'recall': round(tp / (tp + fn), 3), 'false_matches': fp})
+    return rows
+
+
+def synthetic_queries(rng, count):
+    queries = set()
+    while len(queries) < count:
+        queries.add(f"{rng.choice(REQUIREMENTS)} {rng.choice(AMENITIES)} {rng.choice(EXTRAS)} "
+                    f"{rng.randint(0, 10 ** 6)}".strip())
+    return list(queries)
+
+
+def lookup_latency(entries, cells, lookups, rng):
+    cache = SimilarityCache(SharedState(), max_entries=entries)
+    scopes = [f"{-3390 + i // 20}:{15118 + i % 20}:1500" for i in range(cells)]
+    start = time.perf_counter()
+    for i, query in enumerate(synthetic_queries(rng, entries)):
+        cache.put(scopes[i % cells], query, {'places': []})
+    put_us = (time.perf_counter() - start) / entries * 1e6
+    probes = synthetic_queries(random.Random(7), lookups)
+    timings = []
+    for i, probe in enumerate(probes):
+        start = time.perf_counter()
+        cache.get(scopes[i % cells], probe + ' unseen')
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return {'entries': entries, 'cells': cells, 'put_us': round(put_us, 1),
+            'get_p50_us': round(timings[len(timings) // 2], 1), 'get_p99_us': round(timings[int(len(timings) * 0.99)], 1),
+            'index_mb': round(cache.stats()['indexed'] * vectorize('x').nbytes / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--cells', type=int, default=200)
+    parser.add_argument('--lookups', type=int, default=1000)
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per row')
+    args = parser.parse_args()
+    rng = random.Random(46)
+    np.random.seed(46)
+
+    if not args.json:
+        print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'false matches':>13}")
+    for row in pair_metrics():
+        if args.json:
+            print(json.dumps(row))
+        else:
+            marker = '  <- default' if row['threshold'] == SIMILARITY_THRESHOLD else ''
+            print(f"{row['threshold']:>9} {row['precision']!s:>9} {row['recall']:>7} {row['false_matches']:>13}{marker}")
+
+    if not args.json:
+        print(f"\n{'entries':>8} {'cells':>6} {'put us':>7} {'get p50 us':>10} {'get p99 us':>10} {'index MB':>8}")
+    # A single scope scans every entry per lookup, so fewer lookups are enough there
+    for cells, lookups in ((args.cells, args.lookups), (1, max(args.lookups // 10, 1))):
+        row = lookup_latency(args.entries, cells, lookups, rng)
+        if args.json:
+            print(json.dumps(row))
+        else:
+            print(f"{row['entries']:>8} {row['cells']:>6} {row['put_us']:>7} {row['get_p50_us']:>10} "
+                  f"{row['get_p99_us']:>10} {row['index_mb']:>8}")
+
+
+if __name__ == '__main__':
+    main()
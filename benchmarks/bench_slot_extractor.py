@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency of the local slot extractor on a labelled query set.
+
+Each query is labelled with the slots the search pipeline should use
+(amenity, requirements, location, follow_up), as the LLM extraction would
+return them. The benchmark reports:
+
+- how many queries the extractor answers itself (confidence at or above
+  the threshold) and so skip the extraction LLM call;
+- how many of those confident answers match the label exactly, plus
+  per-slot accuracy over them; a confident wrong answer is a search the
+  LLM would have got right, so this number should stay at 100%;
+- extraction latency per query, over --repeat passes.
+
+Queries the extractor defers are the ones the LLM still sees; their labels
+show what it has to get right.
+
+Usage:
+    python benchmarks/bench_slot_extractor.py [--threshold 0.8] [--repeat 200] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from slot_extractor import SLOT_CONFIDENCE_THRESHOLD, extract_slots  # noqa: E402
+
+# (query, amenity, requirements, location, follow_up)
+LABELLED_QUERIES = [
+    ("dog friendly cafes in Newtown", 'cafe', 'dog-friendly', 'Newtown', 'no'),
+    ("Dog friendly beer gardens in Newtown", 'beer garden', 'dog-friendly', 'Newtown', 'no'),
+    ("Where can I find good coffee shops with wifi?", 'coffee shop', 'wifi', 'default', 'no'),
+    ("family restaurant in Newtown", 'restaurant', 'family-friendly', 'Newtown', 'no'),
+    ("best pubs in Surry Hills", 'pub', '', 'Surry Hills', 'no'),
+    ("pubs near Glebe", 'pub', '', 'Glebe', 'no'),
+    ("cafes in Marrickville", 'cafe', '', 'Marrickville', 'no'),
+    ("Any good brunch spots around Bondi Beach with outdoor seating?", 'brunch spot', 'outdoor seating',
+     'Bondi Beach', 'no'),
+    ("thai food in Enmore", 'thai restaurant', '', 'Enmore', 'no'),
+    ("italian restaurants near Leichhardt", 'italian restaurant', '', 'Leichhardt', 'no'),
+    ("cheap sushi in Chatswood", 'sushi restaurant', 'cheap', 'Chatswood', 'no'),
+    ("pet friendly pubs in Balmain", 'pub', 'dog-friendly', 'Balmain', 'no'),
+    ("pub with a beer garden in Rozelle", 'beer garden', '', 'Rozelle', 'no'),
+    ("rooftop bars in the CBD", 'rooftop bar', '', 'Sydney CBD', 'no'),
+    ("wine bars in Potts Point", 'wine bar', '', 'Potts Point', 'no'),
+    ("cocktail bars near Darlinghurst", 'cocktail bar', '', 'Darlinghurst', 'no'),
+    ("kid friendly cafes in Erskineville", 'cafe', 'family-friendly', 'Erskineville', 'no'),
+    ("parks with playgrounds in Annandale", 'park', '', 'Annandale', 'no'),
+    ("gyms in Redfern", 'gym', '', 'Redfern', 'no'),
+    ("bakeries in Paddington", 'bakery', '', 'Paddington', 'no'),
+    ("vegan restaurants in Newtown", 'restaurant', 'vegan', 'Newtown', 'no'),
+    ("pizza near Camperdown", 'pizza place', '', 'Camperdown', 'no'),
+    ("burger joints in Chippendale", 'burger place', '', 'Chippendale', 'no'),
+    ("quiet cafes with wifi in Ultimo", 'cafe', 'quiet, wifi', 'Ultimo', 'no'),
+    ("bars with live music in Enmore", 'bar', 'live music', 'Enmore', 'no'),
+    ("breweries in Marrickville", 'brewery', '', 'Marrickville', 'no'),
+    ("dog friendly beaches", 'beach', 'dog-friendly', 'default', 'no'),
+    ("libraries near Pyrmont", 'library', '', 'Pyrmont', 'no'),
+    ("beer gardens in Sydney", 'beer garden', '', 'Sydney', 'no'),
+    ("cafés in Darlo", 'cafe', '', 'Darlinghurst', 'no'),
+    ("good coffee near me", 'cafe', '', 'default', 'no'),
+    ("Where can I get dumplings in Haymarket?", 'dumpling restaurant', '', 'Haymarket', 'no'),
+    ("ramen in the city", 'ramen restaurant', '', 'Sydney CBD', 'no'),
+    ("korean food around Strathfield", 'korean restaurant', '', 'Strathfield', 'no'),
+    ("restaurants with harbour views in Kirribilli", 'restaurant', 'views', 'Kirribilli', 'no'),
+    ("romantic restaurants in Surry Hills", 'restaurant', 'romantic', 'Surry Hills', 'no'),
+    ("late night food in Kings Cross", 'restaurant', 'open late', 'Kings Cross', 'no'),
+    ("gelato in Manly", 'ice cream shop', '', 'Manly', 'no'),
+    ("farmers markets in the inner west", 'farmers market', '', 'Inner West', 'no'),
+    ("wheelchair accessible pubs in Parramatta", 'pub', 'wheelchair accessible', 'Parramatta', 'no'),
+    ("what about in Surry Hills?", '', '', 'Surry Hills', 'yes'),
+    ("how about Glebe", '', '', 'Glebe', 'yes'),
+    ("any in Bondi?", '', '', 'Bondi', 'yes'),
+    ("what about dog friendly ones?", '', 'dog-friendly', 'default', 'yes'),
+    ("similar places in Balmain", '', '', 'Balmain', 'yes'),
+    # Harder queries the LLM should handle
+    ("cafes that aren't too busy on weekends in Newtown", 'cafe', 'not busy on weekends', 'Newtown', 'no'),
+    ("somewhere to take my mum for her birthday in Mosman", 'restaurant', 'special occasion', 'Mosman', 'no'),
+    ("pubs or bars in Glebe", 'pub', '', 'Glebe', 'no'),
+    ("a hotel pub with a big screen for the footy in Coogee", 'pub', 'big screen', 'Coogee', 'no'),
+    ("cafes without loud music near Town Hall", 'cafe', 'quiet', 'Town Hall', 'no'),
+    ("where do locals go for yum cha in Hurstville", 'yum cha restaurant', '', 'Hurstville', 'no'),
+    ("tell me a joke", '', '', 'default', 'no'),
+    ("places with good vibes and cheap beer in Newtown", 'pub', 'cheap beer', 'Newtown', 'no'),
+    ("a spot for a first date near Circular Quay that isn't too fancy", 'restaurant', 'romantic, casual',
+     'Circular Quay', 'no'),
+    ("bottomless brunch in Surry Hills", 'brunch spot', 'bottomless', 'Surry Hills', 'no'),
+    ("pubs in Wolli Creek", 'pub', '', 'Wolli Creek', 'no'),
+    ("which of those has the best beer?", '', 'best beer', 'default', 'yes'),
+    ("cafes with good pastries in Rozelle", 'cafe', 'good pastries', 'Rozelle', 'no'),
+]
+SLOTS = ('amenity', 'requirements', 'location', 'follow_up')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threshold', type=float, default=SLOT_CONFIDENCE_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--json', action='store_true', help='Print one JSON line per row')
+    args = parser.parse_args()
+
+    confident = correct = 0
+    slot_correct = dict.fromkeys(SLOTS, 0)
+    mistakes = []
+    for query, *label in LABELLED_QUERIES:
+        result = extract_slots(query)
+        if result.confidence < args.threshold:
+            continue
+        confident += 1
+        slots = result.to_dict()
+        matches = [slots[name].lower() == expected.lower() for name, expected in zip(SLOTS, label)]
+        for name, match in zip(SLOTS, matches):
+            slot_correct[name] += match
+        if all(matches):
+            correct += 1
+        else:
+            mistakes.append((query, slots))
+
+    timings = []
+    for _ in range(args.repeat):
+        for query, *_ in LABELLED_QUERIES:
+            start = time.perf_counter()
+            extract_slots(query)
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+
+    rows = [
+        ('queries', len(LABELLED_QUERIES)),
+        ('answered locally', confident),
+        ('LLM calls avoided', f"{confident / len(LABELLED_QUERIES) * 100:.1f}%"),
+        ('local exact match', f"{correct / max(confident, 1) * 100:.1f}%"),
+        *((f'local {name} accuracy', f"{slot_correct[name] / max(confident, 1) * 100:.1f}%") for name in SLOTS),
+        ('mean latency (us)', f"{statistics.mean(timings):.1f}"),
+        ('p50 latency (us)', f"{timings[len(timings) // 2]:.1f}"),
+        ('p99 latency (us)', f"{timings[int(len(timings) * 0.99)]:.1f}"),
+    ]
+    for name, value in rows:
+        if args.json:
+            print(json.dumps({'metric': name, 'value': value}))
+        else:
+            print(f"{name:>28} {value:>10}")
+    if mistakes and not args.json:
+        print('\nConfident but wrong:')
+        for query, slots in mistakes:
+            print(f"  {query!r}: {slots}")
+
+
+if __name__ == '__main__':
+    main()
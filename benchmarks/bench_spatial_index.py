@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the local place spatial index.
+
+Builds an index of synthetic places scattered over greater Sydney, then
+measures bulk and incremental insert throughput and radius query latency
+at the radii search() actually uses, capped at Google's 60-result limit as
+answer_nearby() is. A brute-force NumPy scan over every place is timed
+alongside for comparison.
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--places 100000] [--queries 2000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from spatial_index import NEARBY_RESULT_LIMIT, PlaceSpatialIndex, haversine_m  # noqa: E402
+
+SYDNEY_BOUNDS = (-34.10, -33.60, 150.90, 151.35)  # lat_min, lat_max, lng_min, lng_max
+KEYWORDS = ['cafe', 'pub beer garden', 'restaurant', 'bar', 'gym', 'park']
+RADII = [800, 1500, 5000, 10000]
+
+
+def make_places(count, seed=42):
+    """Generate synthetic Nearby Search style place dicts."""
+    rng = random.Random(seed)
+    lat_min, lat_max, lng_min, lng_max = SYDNEY_BOUNDS
+    places = []
+    for i in range(count):
+        keyword = rng.choice(KEYWORDS)
+        places.append(({
+            'place_id': f"place-{i}",
+            'name': f"{keyword.title()} {i}",
+            'types': [keyword.split()[-1].replace(' ', '_'), 'point_of_interest'],
+            'rating': round(rng.uniform(3.0, 5.0), 1),
+            'geometry': {'location': {'lat': rng.uniform(lat_min, lat_max),
+                                      'lng': rng.uniform(lng_min, lng_max)}},
+        }, keyword))
+    return places
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--places', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    places = make_places(args.places)
+    index = PlaceSpatialIndex()
+
+    start = time.perf_counter()
+    for place, keyword in places:
+        index.insert(place, keyword=keyword)
+    build_s = time.perf_counter() - start
+    print(f"Indexed {len(index):,} places in {build_s:.2f}s "
+          f"({len(index) / build_s:,.0f} inserts/s)")
+
+    # Incremental inserts of a fresh 20-result Nearby Search page
+    fresh = make_places(2000, seed=7)
+    start = time.perf_counter()
+    for i in range(0, len(fresh), 20):
+        page = []
+        for place, _ in fresh[i:i + 20]:
+            place = dict(place, place_id=f"fresh-{place['place_id']}")
+            page.append(place)
+        index.insert_many(page, keyword='cafe')
+    page_us = (time.perf_counter() - start) / (len(fresh) / 20) * 1e6
+    print(f"Incremental insert of a 20-place page: {page_us:.1f}us")
+
+    rng = random.Random(1)
+    lat_min, lat_max, lng_min, lng_max = SYDNEY_BOUNDS
+    all_lats = index._lats[:len(index)].copy()
+    all_lngs = index._lngs[:len(index)].copy()
+
+    print()
+    print(f"{'radius':>8} {'keyword':>16} {'mean us':>9} {'p50 us':>8} {'p99 us':>8} {'results':>8} {'brute us':>9}")
+    for radius in RADII:
+        for keyword in (None, 'cafe'):
+            timings, counts, brute = [], [], []
+            for _ in range(args.queries):
+                location = (rng.uniform(lat_min + 0.1, lat_max - 0.1), rng.uniform(lng_min + 0.1, lng_max - 0.1))
+                start = time.perf_counter()
+                results = index.query(location, radius, keyword=keyword, limit=NEARBY_RESULT_LIMIT)
+                timings.append((time.perf_counter() - start) * 1e6)
+                counts.append(len(results))
+
+                start = time.perf_counter()
+                np.nonzero(haversine_m(location[0], location[1], all_lats, all_lngs) <= radius)
+                brute.append((time.perf_counter() - start) * 1e6)
+            print(f"{radius:>8} {keyword or '-':>16} {statistics.mean(timings):>9.1f} "
+                  f"{percentile(timings, 50):>8.1f} {percentile(timings, 99):>8.1f} "
+                  f"{statistics.mean(counts):>8.1f} {statistics.mean(brute):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark.
+
+Starts fresh interpreters and measures, for each one, how long `import app`
+takes and how long the first request to `/` takes after that. This is the
+work every new worker does before it can serve traffic, so it is the number
+to watch for cold starts and autoscaling. Results are printed as a table,
+or as one JSON line with --json for tracking over time.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({{'import_s': imported - start, 'first_request_s': served - imported,
+                  'status': response.status_code}}))
+"""
+
+
+def run_once(workdir):
+    """Run one cold start in a fresh interpreter and return its timings."""
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT.format(repo=str(REPO_ROOT))],
+        cwd=workdir, capture_output=True, text=True, check=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='Print a single JSON summary line')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        run_once(workdir)  # Warm the OS file cache and .pyc files
+        runs = [run_once(workdir) for _ in range(args.runs)]
+
+    imports = [r['import_s'] * 1000 for r in runs]
+    firsts = [r['first_request_s'] * 1000 for r in runs]
+    totals = [i + f for i, f in zip(imports, firsts)]
+    summary = {
+        'runs': args.runs,
+        'import_ms': round(statistics.median(imports), 1),
+        'first_request_ms': round(statistics.median(firsts), 1),
+        'total_ms': round(statistics.median(totals), 1),
+    }
+
+    if args.json:
+        print(json.dumps(summary))
+        return
+    print(f"{'':>18} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for label, values in (('import app', imports), ('first request', firsts), ('total', totals)):
+        print(f"{label:>18} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Record and replay of upstream HTTP traffic.
+
+Every Maps, geocoding and OpenAI call goes through the keep-alive session
+of its UpstreamPool (upstream.py), so one transport adapter mounted on
+those sessions sees all of it, below googlemaps and openai:
+
+- record: calls go upstream as usual, and each successful response is
+  stored in the cassette, replacing any earlier recording of the same
+  request;
+- replay: nothing leaves the process. Each request is answered from the
+  cassette, optionally after sleeping for its recorded latency times
+  CASSETTE_LATENCY_SCALE, and a request that was never recorded raises
+  CassetteMiss. This is what reproducible performance runs and offline
+  profiling use;
+- fallback: like record, but when an upstream fails (connection error,
+  timeout, 429 or 5xx) the last recorded response is served instead, as a
+  last-known-good answer while the upstream is down.
+
+Requests are keyed by method, URL and body after normalisation: API keys
+and signatures are dropped from the query string, query parameters are
+sorted, and JSON bodies are re-serialised with sorted keys, so the same
+call matches across runs and keys. Headers are not part of the key.
+
+The cassette is one SQLite file (CASSETTE_PATH) with a zlib-compressed
+body per request, shared by every worker. Replay still builds the normal
+clients, so OPENAI_API_KEY and the Maps key need a value, though any will
+do. Streaming responses are never recorded.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from logging_setup import annotate_request
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'replay', 'fallback')
+DEFAULT_CASSETTE_PATH = 'cassettes.db'
+SECRET_PARAMS = frozenset(('key', 'signature', 'client'))  # Never part of a key, never stored
+STORED_HEADERS = ('Content-Type',)
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request the cassette has no recording of."""
+
+
+def normalize_url(url: str) -> str:
+    """The URL without secret query parameters, with the rest sorted."""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def normalize_body(body) -> bytes:
+    if body is None:
+        return b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, separators=(',', ':')).encode('utf-8')
+    except ValueError:
+        return body
+
+
+def request_key(method: str, url: str, body) -> str:
+    digest = hashlib.sha1(f"{method.upper()} {normalize_url(url)}\n".encode('utf-8'))
+    digest.update(normalize_body(body))
+    return digest.hexdigest()
+
+
+class CassetteStore:
+    """Recorded responses in one SQLite file, keyed by normalised request."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('CASSETTE_PATH', DEFAULT_CASSETTE_PATH)
+        self._local = threading.local()
+        self._connect().execute('''
+        CREATE TABLE IF NOT EXISTS interactions (
+            key TEXT PRIMARY KEY,
+            upstream TEXT NOT NULL,
+            method TEXT NOT NULL,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            latency REAL NOT NULL,
+            recorded_at REAL NOT NULL
+        ) WITHOUT ROWID
+        ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._connect().execute('SELECT status, headers, body, latency FROM interactions WHERE key = ?',
+                                      (key,)).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'headers': json.loads(row[1]), 'body': zlib.decompress(row[2]), 'latency': row[3]}
+
+    def put(self, key: str, upstream: str, method: str, url: str, status: int, headers: Dict[str, str],
+            body: bytes, latency: float):
+        self._connect().execute('INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                (key, upstream, method, normalize_url(url), status, json.dumps(headers),
+                                 zlib.compress(body), latency, time.time()))
+
+    def count(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM interactions').fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+class Cassette:
+    """A CassetteStore in one of record, replay or fallback mode."""
+
+    def __init__(self, store: CassetteStore, mode: str, latency_scale: float = 0.0):
+        if mode not in MODES[1:]:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {', '.join(MODES[1:])}")
+        self.store = store
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self.counters = {'recorded': 0, 'replayed': 0, 'misses': 0, 'fallbacks': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def adapter(self, upstream: str, **kwargs) -> 'CassetteAdapter':
+        """A transport adapter for an upstream's session; kwargs go to HTTPAdapter."""
+        return CassetteAdapter(self, upstream, **kwargs)
+
+    def record(self, upstream: str, key: str, request: requests.PreparedRequest, response: requests.Response,
+               latency: float):
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        try:
+            self.store.put(key, upstream, request.method, request.url, response.status_code, headers,
+                           response.content, latency)
+        except sqlite3.Error as e:
+            logger.error(f"[Cassette] Could not record {upstream} response: {str(e)}")
+            return
+        self._count('recorded')
+
+    def replay(self, upstream: str, key: str, request: requests.PreparedRequest,
+               simulate_latency: bool = True) -> Optional[requests.Response]:
+        recording = self.store.get(key)
+        if recording is None:
+            return None
+        if simulate_latency and self.latency_scale > 0:
+            time.sleep(recording['latency'] * self.latency_scale)
+        response = requests.Response()
+        response.status_code = recording['status']
+        response.reason = 'Replayed'
+        response.headers = CaseInsensitiveDict(recording['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = recording['body']
+        response.url = request.url
+        response.request = request
+        return response
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {'mode': self.mode, 'path': self.store.path, 'latency_scale': self.latency_scale, **counters}
+
+
+class CassetteAdapter(HTTPAdapter):
+    """HTTPAdapter that records, replays or falls back to recorded responses."""
+
+    def __init__(self, cassette: Cassette, upstream: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.upstream = upstream
+
+    def _fallback(self, key: str, request: requests.PreparedRequest, reason: str) -> Optional[requests.Response]:
+        response = self.cassette.replay(self.upstream, key, request, simulate_latency=False)
+        if response is not None:
+            self.cassette._count('fallbacks')
+            logger.warning(f"[Cassette] {self.upstream} failed ({reason}); serving the last recorded response")
+            annotate_request(cassette='fallback')
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if stream:
+            return super().send(request, stream, timeout, verify, cert, proxies)
+        key = request_key(request.method, request.url, request.body)
+
+        if self.cassette.mode == 'replay':
+            response = self.cassette.replay(self.upstream, key, request)
+            if response is None:
+                self.cassette._count('misses')
+                raise CassetteMiss(f"No recorded {self.upstream} response for {request.method} "
+                                   f"{normalize_url(request.url)}")
+            self.cassette._count('replayed')
+            return response
+
+        start = time.perf_counter()
+        try:
+            response = super().send(request, stream, timeout, verify, cert, proxies)
+            response.content  # Read the body now, so the latency covers it
+        except (requests.ConnectionError, requests.Timeout) as e:
+            fallback = self._fallback(key, request, type(e).__name__) if self.cassette.mode == 'fallback' else None
+            if fallback is None:
+                raise
+            return fallback
+        latency = time.perf_counter() - start
+
+        if response.status_code < 400:
+            self.cassette.record(self.upstream, key, request, response, latency)
+        elif self.cassette.mode == 'fallback' and (response.status_code == 429 or response.status_code >= 500):
+            fallback = self._fallback(key, request, f"HTTP {response.status_code}")
+            if fallback is not None:
+                return fallback
+        return response
+
+
+def create_cassette(mode: Optional[str] = None, path: Optional[str] = None) -> Optional[Cassette]:
+    """The Cassette selected by CASSETTE_MODE / CASSETTE_PATH / CASSETTE_LATENCY_SCALE, or None when off."""
+    mode = (mode or os.getenv('CASSETTE_MODE', 'off')).lower()
+    if mode == 'off':
+        return None
+    if mode not in MODES:
+        logger.warning(f"Unknown CASSETTE_MODE '{mode}', not recording")
+        return None
+    cassette = Cassette(CassetteStore(path), mode, latency_scale=float(os.getenv('CASSETTE_LATENCY_SCALE', '0')))
+    logger.info(f"Upstream cassette in {mode} mode at {cassette.store.path}")
+    return cassette
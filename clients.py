@@ -0,0 +1,123 @@
+"""
+Lazily constructed API clients.
+
+Building clients at import time (and validating keys with a live request)
+made every worker pay network round trips before serving anything. Clients
+are now registered as factories and built on first use; key validation is
+an optional background health check whose result is reported by /health.
+Clients are never shared across a fork: a worker forked from a preloaded
+master builds its own instead of reusing the parent's connection pools.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FAILED_INIT_RETRY_SECONDS = 60  # Don't hammer a broken factory on every request
+
+
+class LazyClientRegistry:
+    """Thread-safe registry of clients that are built on first use."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._failures: Dict[str, float] = {}
+        self._health: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        """Drop clients built by a parent process (their sockets are shared after fork)."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._clients.clear()
+                    self._failures.clear()
+                    self._pid = os.getpid()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register a zero-argument factory for a client."""
+        with self._lock:
+            self._factories[name] = factory
+            self._clients.pop(name, None)
+            self._failures.pop(name, None)
+
+    def set(self, name: str, client: Any):
+        """Install an already-built client (or None to disable it)."""
+        with self._lock:
+            self._clients[name] = client
+            self._failures.pop(name, None)
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the client, building it on first use. Returns None if it cannot be built."""
+        self._check_fork()
+        if name in self._clients:
+            return self._clients[name]
+        with self._lock:
+            if name in self._clients:
+                return self._clients[name]
+            failed_at = self._failures.get(name)
+            if failed_at and time.monotonic() - failed_at < FAILED_INIT_RETRY_SECONDS:
+                return None
+            factory = self._factories.get(name)
+            if factory is None:
+                return None
+            try:
+                start = time.perf_counter()
+                client = factory()
+                logger.info(f"Initialized {name} client in {(time.perf_counter() - start) * 1000:.1f}ms")
+            except Exception as e:
+                logger.error(f"Error initializing {name} client: {str(e)}")
+                self._failures[name] = time.monotonic()
+                return None
+            self._clients[name] = client
+            return client
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self._clients
+
+    def start_health_check(self, checks: Dict[str, Callable[[Any], Any]]) -> threading.Thread:
+        """
+        Validate clients in a background thread.
+
+        Each check receives the built client and should raise or return a
+        falsy value if the client (or its API key) is not usable.
+        """
+        def run():
+            for name, check in checks.items():
+                started = time.time()
+                client = self.get(name)
+                status = {'checked_at': started}
+                if client is None:
+                    status.update(ok=False, error='client could not be initialized')
+                else:
+                    try:
+                        status['ok'] = bool(check(client))
+                        if not status['ok']:
+                            status['error'] = 'check returned no result'
+                    except Exception as e:
+                        status.update(ok=False, error=str(e))
+                if not status['ok']:
+                    logger.warning(f"Health check failed for {name}: {status['error']}")
+                with self._lock:
+                    self._health[name] = status
+
+        thread = threading.Thread(target=run, name='client-health-check', daemon=True)
+        thread.start()
+        return thread
+
+    def health(self) -> Dict[str, Dict]:
+        """Initialization and health-check status for every registered client."""
+        with self._lock:
+            return {
+                name: {
+                    'initialized': name in self._clients and self._clients[name] is not None,
+                    **self._health.get(name, {}),
+                }
+                for name in self._factories
+            }
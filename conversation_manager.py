@@ -1,13 +1,64 @@
 import sqlite3
 import json
+import logging
+import zlib
+from collections import OrderedDict
 from datetime import datetime
 import hashlib
 import os
+import threading
+
+from records import messages_from_dicts, messages_to_dicts
+
+logger = logging.getLogger(__name__)
+
+# Recently used conversations kept in memory per worker, as compact records
+CONVERSATION_CACHE_SIZE = 10000
+
+# Stored conversations are either plain JSON text (written before compression
+# existed, or with compress=False) or a BLOB whose first byte is the format version
+FORMAT_ZLIB_JSON = 1
+COMPRESSION_LEVEL = 1  # Most of the size win for a fraction of the CPU of the default level
+MAX_SESSION_BYTES = 16 * 1024  # Cap on a stored conversation; oldest messages are dropped beyond it
+COMPACT_MAX_PAGES = 2000  # Free pages returned to the filesystem per compaction run
+
+
+def encode_conversation(conversation, compress=True):
+    """Serialize a conversation for the conversation_json column."""
+    data = json.dumps(conversation, separators=(',', ':'), ensure_ascii=False)
+    if not compress:
+        return data
+    return bytes([FORMAT_ZLIB_JSON]) + zlib.compress(data.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decode_conversation(value):
+    """Inverse of encode_conversation, also reading plain JSON text."""
+    if isinstance(value, str):
+        return json.loads(value)
+    if value and value[0] == FORMAT_ZLIB_JSON:
+        return json.loads(zlib.decompress(value[1:]).decode('utf-8'))
+    raise ValueError(f"Unknown stored conversation format {value[0] if value else None}")
 
 class ConversationManager:
-    def __init__(self, db_path='conversations.db'):
-        """Initialize the conversation manager with database path."""
+    def __init__(self, db_path='conversations.db', cache_size=CONVERSATION_CACHE_SIZE, compress=True,
+                 max_session_bytes=MAX_SESSION_BYTES):
+        """
+        Initialize the conversation manager with database path.
+
+        compress stores new conversations zlib-compressed (existing plain JSON
+        rows stay readable), and max_session_bytes caps each stored
+        conversation (None for no cap).
+        """
         self.db_path = db_path
+        self.cache_size = cache_size
+        self.compress = compress
+        self.max_session_bytes = max_session_bytes
+        self.capped_writes = 0
+        self.last_compaction = None
+        # session_id -> (revision, tuple of MessageRecord). The revision column
+        # is bumped on every save, so entries written by other workers are detected.
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
         self.init_db()
     
     def init_db(self):
@@ -15,49 +66,119 @@ class ConversationManager:
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
         
+        # Let compact() return freed pages to the filesystem. This only takes
+        # effect on a new database; compact() converts existing ones.
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
         # Create sessions table for storing conversation history
         c.execute('''
         CREATE TABLE IF NOT EXISTS sessions (
             session_id TEXT PRIMARY KEY,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            conversation_json TEXT
+            conversation_json TEXT,
+            revision INTEGER NOT NULL DEFAULT 0
         )
         ''')
         
+        # Databases created before the revision column existed
+        columns = [row[1] for row in c.execute('PRAGMA table_info(sessions)')]
+        if 'revision' not in columns:
+            c.execute('ALTER TABLE sessions ADD COLUMN revision INTEGER NOT NULL DEFAULT 0')
+        
         conn.commit()
         conn.close()
     
+    def _cache_put(self, session_id, revision, conversation):
+        with self._cache_lock:
+            self._cache[session_id] = (revision, messages_from_dicts(conversation))
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
     def get_conversation(self, session_id):
         """Retrieve conversation history for a session."""
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+        cached_revision = cached[0] if cached else None
+        
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
         
-        c.execute('SELECT conversation_json FROM sessions WHERE session_id = ?', (session_id,))
+        # Only transfer the JSON when our cached copy is stale
+        c.execute('''
+        SELECT revision, CASE WHEN revision = ? THEN NULL ELSE conversation_json END
+        FROM sessions WHERE session_id = ?
+        ''', (cached_revision, session_id))
         result = c.fetchone()
         conn.close()
         
-        if result:
-            return json.loads(result[0])
-        return []
+        if not result:
+            return []
+        revision, conversation_json = result
+        if conversation_json is None and cached:
+            with self._cache_lock:
+                if session_id in self._cache:
+                    self._cache.move_to_end(session_id)
+            return messages_to_dicts(cached[1])
+        conversation = decode_conversation(conversation_json)
+        self._cache_put(session_id, revision, conversation)
+        return conversation
+    
+    def _encode_capped(self, session_id, conversation):
+        """Encode a conversation, dropping its oldest messages until it fits max_session_bytes."""
+        encoded = encode_conversation(conversation, self.compress)
+        if self.max_session_bytes is None or len(encoded) <= self.max_session_bytes:
+            return conversation, encoded
+        
+        # Keep the system message and the latest message, then as many recent ones as fit
+        system = conversation[:1] if conversation and conversation[0]['role'] == 'system' else []
+        messages = conversation[len(system):]
+        keep = len(messages)
+        while len(encoded) > self.max_session_bytes and keep > 1:
+            # Estimate how many messages fit from the current size, dropping at least one
+            keep = min(keep - 1, int(keep * self.max_session_bytes / len(encoded)))
+            keep = max(keep, 1)
+            encoded = encode_conversation(system + messages[-keep:], self.compress)
+        conversation = system + messages[-keep:]
+        
+        # A single oversized message is truncated
+        if len(encoded) > self.max_session_bytes and messages:
+            latest = dict(conversation[-1])
+            content = latest['content']
+            while len(encoded) > self.max_session_bytes and content:
+                content = content[:int(len(content) * self.max_session_bytes / len(encoded) * 0.9)]
+                latest['content'] = content
+                conversation = conversation[:-1] + [latest]
+                encoded = encode_conversation(conversation, self.compress)
+        
+        self.capped_writes += 1
+        logger.debug("Capped conversation %s to %s messages (%s bytes)", session_id, len(conversation), len(encoded))
+        return conversation, encoded
     
     def save_conversation(self, session_id, conversation):
-        """Save the conversation history for a session."""
+        """Save the conversation history for a session, capped to max_session_bytes."""
+        conversation, encoded = self._encode_capped(session_id, conversation)
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
         
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         c.execute('''
-        INSERT INTO sessions (session_id, conversation_json, last_activity) 
-        VALUES (?, ?, ?) 
+        INSERT INTO sessions (session_id, conversation_json, last_activity, revision) 
+        VALUES (?, ?, ?, 1) 
         ON CONFLICT(session_id) DO UPDATE SET 
         conversation_json = excluded.conversation_json,
-        last_activity = excluded.last_activity
-        ''', (session_id, json.dumps(conversation), current_time))
+        last_activity = excluded.last_activity,
+        revision = sessions.revision + 1
+        ''', (session_id, encoded, current_time))
+        c.execute('SELECT revision FROM sessions WHERE session_id = ?', (session_id,))
+        revision = c.fetchone()[0]
         
         conn.commit()
         conn.close()
+        self._cache_put(session_id, revision, conversation)
+        return conversation
     
     def add_message(self, session_id, role, content):
         """Add a message to the conversation history."""
@@ -77,8 +198,7 @@ class ConversationManager:
         })
         
         # Save the updated conversation
-        self.save_conversation(session_id, conversation)
-        return conversation
+        return self.save_conversation(session_id, conversation)
     
     def trim_conversation(self, session_id, max_tokens=3000, preserve_places=True):
         """Trim conversation to stay under token limits while preserving context about places."""
@@ -155,8 +275,45 @@ class ConversationManager:
         conn.commit()
         conn.close()
         
+        with self._cache_lock:
+            self._cache.clear()
+        
         return deleted_count
     
+    def compact(self, max_pages=COMPACT_MAX_PAGES):
+        """
+        Return up to max_pages free pages (left by deleted and shrunk sessions) to the filesystem.
+        
+        A database created before incremental vacuum was enabled is rebuilt
+        once with a full VACUUM. Returns the number of pages freed.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            c = conn.cursor()
+            free_before = c.execute('PRAGMA freelist_count').fetchone()[0]
+            if c.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:  # 2 = INCREMENTAL
+                logger.info(f"Converting {self.db_path} to incremental vacuum")
+                c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                c.execute('VACUUM')
+            else:
+                # executescript steps the pragma to completion; execute() would free a single page
+                c.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+            free_after = c.execute('PRAGMA freelist_count').fetchone()[0]
+            page_count = c.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+            conn.close()
+        
+        freed = free_before - free_after
+        self.last_compaction = {'at': datetime.now().isoformat(timespec='seconds'), 'pages_freed': freed,
+                                'pages_free': free_after, 'page_count': page_count}
+        return freed
+    
+    def stats(self):
+        """Storage settings and counters for /health."""
+        return {'compress': self.compress, 'max_session_bytes': self.max_session_bytes,
+                'capped_writes': self.capped_writes, 'cached': len(self._cache),
+                'last_compaction': self.last_compaction}
+    
     def generate_session_id(self, user_ip=None, additional_info=None):
         """Generate a unique session ID."""
         # Combine current time with user info for uniqueness
@@ -5,55 +5,383 @@ from datetime import datetime, timedelta
 import logging
 import urllib.parse
 import re
-from googleapiclient.discovery import build
+import json
+import unicodedata
+from pathlib import Path
+import requests
+from clients import LazyClientRegistry
+from shared_state import SharedState
+from tracing import span
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Discovery documents are cached here so building the Custom Search client
+# never has to fetch one over the network at request time
+DISCOVERY_CACHE_DIR = Path(os.getenv('DISCOVERY_CACHE_DIR', Path(__file__).resolve().parent / '.discovery_cache'))
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest'
+
+
+def load_discovery_document(api: str, version: str) -> str:
+    """Return a discovery document from the local cache, the client library, or the network."""
+    cache_path = DISCOVERY_CACHE_DIR / f"{api}.{version}.json"
+    if cache_path.exists():
+        return cache_path.read_text()
+
+    from googleapiclient.discovery_cache import get_static_doc
+    document = get_static_doc(api, version)
+    if document is None:
+        logger.info(f"Fetching discovery document for {api} {version}")
+        response = requests.get(DISCOVERY_URL.format(api=api, version=version), timeout=10)
+        response.raise_for_status()
+        document = response.text
+
+    try:
+        DISCOVERY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(document)
+    except OSError as e:
+        logger.warning(f"Could not cache discovery document for {api} {version}: {e}")
+    return document
+
+
+# External candidate discovery
+CANDIDATE_SOURCE_TIMEOUT = 2.0  # Seconds a single source may take
+CANDIDATE_SEARCH_BUDGET = 2.5  # Seconds the whole fan-out may take
+CANDIDATE_CACHE_TTL = 60 * 60
+
+# Words that vary between sources for the same venue ("The Bank Hotel" vs "Bank Hotel Newtown")
+NAME_STOPWORDS = {'the', 'a', 'an', 'and', 'hotel', 'pub', 'bar', 'cafe', 'restaurant',
+                  'sydney', 'nsw', 'australia'}
+TITLE_SEPARATORS = re.compile(r'\s+[|\-\u2013\u2014:]\s+')
+# Page titles that are roundups or guides rather than a venue ("10 best dog friendly pubs in Newtown")
+LISTICLE_TITLE = re.compile(r'^\s*(\d+|top|best)\b|\b(best|top \d+|guide|things to|where to|places to|reviews?)\b',
+                            re.IGNORECASE)
+MAX_VENUE_NAME_WORDS = 6
+NAME_MATCH_OVERLAP = 0.75  # Shared tokens over all tokens of both names, once the suburb is removed
+
+
+def normalize_place_name(name: str, keep_stopwords: bool = False) -> str:
+    """
+    Normalise a venue name so the same place matches across sources.
+
+    `keep_stopwords` keeps words like "hotel" and "cafe", for matching a
+    name inside free text where they tell venues apart from suburbs.
+    """
+    if not name:
+        return ''
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower()
+    name = name.replace('&', ' and ').replace("'", '')
+    tokens = [t for t in re.findall(r'[a-z0-9]+', name) if keep_stopwords or t not in NAME_STOPWORDS]
+    return ' '.join(tokens)
+
+
+def looks_like_venue_name(title: str) -> bool:
+    """False for page titles that are lists or guides of places rather than one place."""
+    return bool(title) and len(title.split()) <= MAX_VENUE_NAME_WORDS and not LISTICLE_TITLE.search(title)
+
+
+def match_candidate_names(external_names: Set[str], places: List[Dict], location: Optional[str] = None) -> Set[str]:
+    """
+    Return the place_ids of Maps candidates that an external source also mentioned.
+
+    A place matches when its normalised name equals an external name, or when
+    the two names share at least NAME_MATCH_OVERLAP of their tokens after
+    dropping the words of `location` ("Bank Hotel Newtown" vs "The Bank Hotel").
+    A name that is nothing but the suburb only matches exactly.
+    """
+    if not external_names:
+        return set()
+    location_tokens = set(normalize_place_name(location or '').split())
+    external_tokens = [tokens for tokens in (set(name.split()) - location_tokens for name in external_names if name)
+                       if tokens]
+    matched = set()
+    for place in places:
+        normalized = normalize_place_name(place.get('name', ''))
+        if not normalized or not place.get('place_id'):
+            continue
+        if normalized in external_names:
+            matched.add(place['place_id'])
+            continue
+        tokens = set(normalized.split()) - location_tokens
+        if tokens and any(len(tokens & ext) >= NAME_MATCH_OVERLAP * len(tokens | ext) for ext in external_tokens):
+            matched.add(place['place_id'])
+    return matched
+
+
+class CandidateSource:
+    """A source of candidate venue names for an (amenity, location, requirements) query."""
+
+    name = 'base'
+
+    def __init__(self, timeout: float = CANDIDATE_SOURCE_TIMEOUT):
+        self.timeout = timeout
+
+    async def fetch(self, amenity: str, location: str, requirements: str) -> List[str]:
+        raise NotImplementedError
+
+
+class GoogleCSECandidateSource(CandidateSource):
+    """Candidate names from Google Custom Search result titles and structured data."""
+
+    name = 'google_cse'
+
+    def __init__(self, manager: 'DataSourceManager', timeout: float = CANDIDATE_SOURCE_TIMEOUT, num_results: int = 10):
+        super().__init__(timeout)
+        self.manager = manager
+        self.num_results = num_results
+
+    async def fetch(self, amenity: str, location: str, requirements: str) -> List[str]:
+        service = self.manager.google_search_service
+        if service is None:
+            return []
+        query = ' '.join(part for part in [requirements, amenity, location, 'Sydney'] if part and part != 'default')
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None,
+            lambda: service.cse().list(q=query, cx=self.manager.google_cse_id, num=self.num_results).execute()
+        )
+
+        names = []
+        for item in response.get('items', []):
+            # Prefer schema.org names when the page declares a business
+            pagemap = item.get('pagemap', {})
+            for kind in ('localbusiness', 'restaurant', 'barorpub', 'cafeorcoffeeshop'):
+                names.extend(entry.get('name') for entry in pagemap.get(kind, []) if entry.get('name'))
+            title = TITLE_SEPARATORS.split(item.get('title', ''))[0]
+            if looks_like_venue_name(title):
+                names.append(title)
+        return names
+
+
+class FixtureCandidateSource(CandidateSource):
+    """
+    Candidate names from a local JSON fixture, for testing and offline development.
+
+    The fixture maps "amenity|location" keys (lowercase, "*" as a wildcard)
+    to lists of names. An optional delay simulates a slow upstream.
+    """
+
+    name = 'fixture'
+
+    def __init__(self, fixtures, delay: float = 0.0, timeout: float = CANDIDATE_SOURCE_TIMEOUT):
+        super().__init__(timeout)
+        if isinstance(fixtures, (str, Path)):
+            fixtures = json.loads(Path(fixtures).read_text())
+        self.fixtures = {key.lower(): names for key, names in fixtures.items()}
+        self.delay = delay
+
+    async def fetch(self, amenity: str, location: str, requirements: str) -> List[str]:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        amenity, location = (amenity or '*').lower(), (location or '*').lower()
+        names = []
+        for key in (f"{amenity}|{location}", f"{amenity}|*", f"*|{location}"):
+            names.extend(self.fixtures.get(key, []))
+        return names
+
+
+# Place enrichment (articles, discussions)
+INSIGHT_SOURCE_TIMEOUT = 5.0
+INSIGHTS_PER_KIND = 3
+
+
+class InsightSource:
+    """A source of articles or discussions mentioning a specific place."""
+
+    name = 'base'
+
+    def __init__(self, kind: str = 'articles', timeout: float = INSIGHT_SOURCE_TIMEOUT):
+        self.kind = kind  # Key in gather_additional_data()'s result, e.g. 'articles' or 'reddit_posts'
+        self.timeout = timeout
+
+    async def fetch(self, place_name: str, location: str) -> List[Dict]:
+        """Return items shaped like {'title', 'snippet', 'link'}."""
+        raise NotImplementedError
+
+
+class GoogleCSEInsightSource(InsightSource):
+    """Web pages mentioning a place, optionally restricted to one site."""
+
+    name = 'google_cse'
+
+    def __init__(self, manager: 'DataSourceManager', kind: str = 'articles', site: Optional[str] = None,
+                 timeout: float = INSIGHT_SOURCE_TIMEOUT, num_results: int = 5):
+        super().__init__(kind, timeout)
+        self.manager = manager
+        self.site = site
+        self.num_results = num_results
+
+    async def fetch(self, place_name: str, location: str) -> List[Dict]:
+        service = self.manager.google_search_service
+        if service is None:
+            return []
+        query = f'"{place_name}" {location or "Sydney"}'
+        if self.site:
+            query += f" site:{self.site}"
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None,
+            lambda: service.cse().list(q=query, cx=self.manager.google_cse_id, num=self.num_results).execute()
+        )
+        return [{'title': item.get('title', ''), 'snippet': item.get('snippet', ''), 'link': item.get('link', '')}
+                for item in response.get('items', [])]
+
+
+class FixtureInsightSource(InsightSource):
+    """Items for a place from a local mapping of normalised place name -> items."""
+
+    name = 'fixture'
+
+    def __init__(self, fixtures: Dict[str, List[Dict]], kind: str = 'articles',
+                 delay: float = 0.0, timeout: float = INSIGHT_SOURCE_TIMEOUT):
+        super().__init__(kind, timeout)
+        self.fixtures = {normalize_place_name(name): items for name, items in fixtures.items()}
+        self.delay = delay
+
+    async def fetch(self, place_name: str, location: str) -> List[Dict]:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return list(self.fixtures.get(normalize_place_name(place_name), []))
+
+
 class DataSourceManager:
-    def __init__(self):
-        self.google_search_service = None
-        try:
-            api_key = os.getenv('GOOGLE_SEARCH_API_KEY')
-            self.google_cse_id = os.getenv('GOOGLE_CSE_ID')
-            if not api_key:
-                logger.warning("Missing Google Search API Key. Web search will be disabled.")
-            elif not self.google_cse_id:
-                 logger.warning("Missing Google CSE ID. Web search will be disabled.")
-            else:
-                self.google_search_service = build("customsearch", "v1", developerKey=api_key)
-                logger.info("Google Custom Search service initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Google Custom Search service: {e}", exc_info=True)
-            self.google_search_service = None
+    def __init__(self, clients: Optional[LazyClientRegistry] = None, state: Optional[SharedState] = None):
+        self.clients = clients or LazyClientRegistry()
+        self.state = state or SharedState()
+        self.google_search_api_key = os.getenv('GOOGLE_SEARCH_API_KEY')
+        self.google_cse_id = os.getenv('GOOGLE_CSE_ID')
+        if not self.google_search_api_key:
+            logger.warning("Missing Google Search API Key. Web search will be disabled.")
+        elif not self.google_cse_id:
+            logger.warning("Missing Google CSE ID. Web search will be disabled.")
+        else:
+            self.clients.register('customsearch', self._build_google_search_service)
+
+        self.candidate_sources: List[CandidateSource] = []
+        if self.google_search_api_key and self.google_cse_id:
+            self.candidate_sources.append(GoogleCSECandidateSource(self))
+        fixture_path = os.getenv('CANDIDATE_FIXTURES')
+        if fixture_path:
+            self.candidate_sources.append(FixtureCandidateSource(fixture_path))
+        self._candidate_cache = self.state.namespace('external_candidates', ttl=CANDIDATE_CACHE_TTL, persist=True)
+
+        self.insight_sources: List[InsightSource] = []
+        if self.google_search_api_key and self.google_cse_id:
+            self.insight_sources.append(GoogleCSEInsightSource(self, kind='articles'))
+            self.insight_sources.append(GoogleCSEInsightSource(self, kind='reddit_posts', site='reddit.com'))
+        insight_fixture_path = os.getenv('INSIGHT_FIXTURES')
+        if insight_fixture_path:
+            # {"articles": {"place name": [items]}, "reddit_posts": {...}}
+            for kind, fixtures in json.loads(Path(insight_fixture_path).read_text()).items():
+                self.insight_sources.append(FixtureInsightSource(fixtures, kind=kind))
+
+    def register_candidate_source(self, source: CandidateSource):
+        """Add a source to the external candidate fan-out."""
+        self.candidate_sources.append(source)
+
+    def register_insight_source(self, source: InsightSource):
+        """Add a source used by gather_additional_data()."""
+        self.insight_sources.append(source)
+
+    def _build_google_search_service(self):
+        """Build the Custom Search client from a locally cached discovery document."""
+        from googleapiclient.discovery import build_from_document
+        document = load_discovery_document('customsearch', 'v1')
+        return build_from_document(document, developerKey=self.google_search_api_key)
+
+    @property
+    def google_search_service(self):
+        """Custom Search client, built on first use (None if web search is disabled)."""
+        return self.clients.get('customsearch')
 
     async def close(self):
         """Close any necessary resources (currently none needed)."""
         logger.info("DataSourceManager close called (no explicit actions needed).")
         pass
 
-    async def find_external_candidate_names(self, amenity: str, location: str, requirements: str) -> Set[str]:
+    async def find_external_candidate_names(self, amenity: str, location: str, requirements: str,
+                                            budget: float = CANDIDATE_SEARCH_BUDGET) -> Set[str]:
         """
-        Placeholder for future multi-source search implementation.
-        Currently returns an empty set.
+        Ask every candidate source for venue names concurrently.
+
+        Each source runs under its own timeout (capped by the overall budget),
+        failures and timeouts are logged and skipped, and the deduplicated,
+        normalised names are cached per query. Never raises.
         """
-        logger.info(f"External candidate search requested but currently disabled. Using Google Maps API only.")
-        return set()
+        if not self.candidate_sources:
+            return set()
+
+        # The amenity keeps its stopwords: "cafe" and "pub" normalise to the same empty name
+        cache_key = '|'.join((' '.join((amenity or '').lower().split()), (location or '').lower().strip(),
+                              (requirements or '').lower().strip()))
+        with span('cache.external_candidates') as lookup_span:
+            cached = self._candidate_cache.get(cache_key)
+            lookup_span.set(hit=cached is not None)
+        if cached is not None:
+            logger.debug("External candidate names served from cache (%s names)", len(cached))
+            return set(cached)
+
+        async def run_source(source: CandidateSource):
+            return await asyncio.wait_for(source.fetch(amenity, location, requirements),
+                                          timeout=min(source.timeout, budget))
+
+        results = await asyncio.gather(*(run_source(source) for source in self.candidate_sources),
+                                       return_exceptions=True)
+
+        names = set()
+        succeeded = False
+        for source, result in zip(self.candidate_sources, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"Candidate source '{source.name}' exceeded its {source.timeout}s budget")
+            elif isinstance(result, Exception):
+                logger.warning(f"Candidate source '{source.name}' failed: {result}")
+            else:
+                succeeded = True
+                names.update(n for n in (normalize_place_name(name) for name in result) if n)
+
+        if succeeded:
+            self._candidate_cache.set(cache_key, sorted(names))
+        logger.debug("Found %s external candidate names from %s source(s)", len(names), len(self.candidate_sources))
+        return names
 
     async def gather_additional_data(self, place_name: str, location: str) -> Dict:
-        """Placeholder for future data gathering implementation."""
-        return {
-            'articles': [],
-            'reddit_posts': []
-        }
+        """
+        Fetch articles and discussions about a place from every insight source.
+
+        Sources run concurrently, each under its own timeout; a failing source
+        just contributes nothing. Results are grouped by source kind.
+        """
+        data = {'articles': [], 'reddit_posts': []}
+
+        async def run_source(source: InsightSource):
+            return await asyncio.wait_for(source.fetch(place_name, location), timeout=source.timeout)
+
+        results = await asyncio.gather(*(run_source(source) for source in self.insight_sources),
+                                       return_exceptions=True)
+        for source, result in zip(self.insight_sources, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Insight source '{source.name}' ({source.kind}) failed for {place_name}: {result!r}")
+                continue
+            data.setdefault(source.kind, []).extend(result)
+        return data
 
     def extract_relevant_insights(self, data: Dict, user_query: str) -> Dict:
-        """Placeholder for future insight extraction implementation."""
+        """
+        Pick the items most relevant to a query from gathered data.
+
+        Items are ranked by how many query words appear in their title and
+        snippet; with an empty query the first few items are kept.
+        """
+        query_tokens = set(re.findall(r'[a-z0-9]+', (user_query or '').lower())) - NAME_STOPWORDS
+
+        def top_items(items: List[Dict]) -> List[Dict]:
+            def relevance(item):
+                text = f"{item.get('title', '')} {item.get('snippet', '')}".lower()
+                return sum(1 for token in query_tokens if token in text)
+            ranked = sorted(items, key=relevance, reverse=True) if query_tokens else items
+            return [{'title': item.get('title', ''), 'snippet': item.get('snippet', ''), 'link': item.get('link', '')}
+                    for item in ranked[:INSIGHTS_PER_KIND]]
+
         return {
-            'recent_mentions': [],
-            'relevant_discussions': []
-        } 
\ No newline at end of file
+            'recent_mentions': top_items(data.get('articles', [])),
+            'relevant_discussions': top_items(data.get('reddit_posts', []))
+        }
@@ -0,0 +1,134 @@
+"""
+Background enrichment of places with articles and discussions.
+
+Fetching web mentions for every place inline would blow the search latency
+budget, so search() only enqueues the places it returned. A small pool of
+workers on the background loop gathers data through the DataSourceManager's
+insight sources and stores a per-place insight record with a TTL in shared
+state, so every worker process sees it. Later searches read those records
+with a single lookup.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from background import background_loop
+from data_sources import DataSourceManager, normalize_place_name
+from shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+INSIGHT_TTL = 60 * 60 * 24  # Mentions change slowly; refresh daily
+EMPTY_INSIGHT_TTL = 60 * 60 * 2  # Retry places with nothing found sooner
+ENRICHMENT_CLAIM_TTL = 60 * 5  # Stops two workers enriching the same place at once
+ENRICHMENT_WORKERS = 4
+ENRICHMENT_QUEUE_SIZE = 500
+
+
+class InsightStore:
+    """Per-place insight records with individual expiry times."""
+
+    def __init__(self, state: Optional[SharedState] = None):
+        self._records = (state or SharedState()).namespace('place_insights', ttl=INSIGHT_TTL, persist=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the fresh insight record for a place key, or None."""
+        return self._records.get(key)
+
+    def put(self, key: str, place_name: str, insights: Dict, ttl: float) -> Dict:
+        now = time.time()
+        record = {'place_name': place_name, 'insights': insights, 'fetched_at': now, 'expires_at': now + ttl}
+        self._records.set(key, record, ttl=ttl)
+        return record
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class EnrichmentPipeline:
+    """Queue of places to enrich, drained by bounded workers on the background loop."""
+
+    def __init__(self, data_manager: DataSourceManager, store: Optional[InsightStore] = None,
+                 workers: int = ENRICHMENT_WORKERS, queue_size: int = ENRICHMENT_QUEUE_SIZE):
+        self.data_manager = data_manager
+        self.store = store or InsightStore(data_manager.state)
+        self._claims = data_manager.state.namespace('enrichment_claims', ttl=ENRICHMENT_CLAIM_TTL)
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self.enriched = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @staticmethod
+    def _key(place_name: str, place_id: Optional[str]) -> str:
+        # Prefer the place ID: different venues can share a normalised name
+        return place_id or normalize_place_name(place_name)
+
+    def get_insights(self, place_name: str, place_id: Optional[str] = None) -> Optional[Dict]:
+        """O(1) read of precomputed insights for a place (None if not yet enriched)."""
+        record = self.store.get(self._key(place_name, place_id))
+        return record['insights'] if record else None
+
+    def enqueue(self, place_name: str, location: str, query: str = '', place_id: Optional[str] = None) -> bool:
+        """
+        Ask for a place to be enriched in the background. Safe to call from any thread.
+
+        Returns False if the place already has fresh insights, is already
+        queued (by any worker process), or there is nothing to enrich it with.
+        """
+        key = self._key(place_name, place_id)
+        if not key or not self.data_manager.insight_sources or self.store.get(key):
+            return False
+        with self._lock:
+            if key in self._pending:
+                return False
+            if not self._claims.try_lock(key, ttl=ENRICHMENT_CLAIM_TTL):
+                return False
+            self._pending.add(key)
+        background_loop.call_soon(self._put, key, (place_name, location, query))
+        return True
+
+    def _put(self, key: str, item):
+        """Runs on the background loop: start workers on first use and queue the item."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            for i in range(self.workers):
+                asyncio.ensure_future(self._worker(i))
+        try:
+            self._queue.put_nowait((key, item))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            with self._lock:
+                self._pending.discard(key)
+            self._claims.delete(key)
+            logger.warning(f"Enrichment queue full; dropped {item[0]}")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            key, (place_name, location, query) = await self._queue.get()
+            try:
+                data = await self.data_manager.gather_additional_data(place_name, location)
+                insights = self.data_manager.extract_relevant_insights(data, query)
+                found = any(insights.values())
+                self.store.put(key, place_name, insights, INSIGHT_TTL if found else EMPTY_INSIGHT_TTL)
+                self.enriched += 1
+                logger.debug("Enriched %s (%s insights, worker %s)", place_name, 'found' if found else 'no', worker_id)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Enrichment failed for {place_name}: {e}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {'stored': len(self.store), 'pending': pending, 'enriched': self.enriched,
+                'dropped': self.dropped, 'failed': self.failed}
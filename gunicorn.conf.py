@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for running CityPulse with several worker processes.
+
+    make serve WORKERS=4
+    # or: gunicorn -c gunicorn.conf.py app:app
+
+Each worker imports the app itself (no preload), so API clients, the
+background loop and the prefetch thread are per process. Caches and
+run-once jobs such as session cleanup go through the SQLite shared-state
+backend, so adding workers does not split the caches or repeat the jobs.
+Override SHARED_STATE_BACKEND / SHARED_STATE_PATH in the environment to
+change that.
+
+Every admitted or queued search holds one of a worker's threads, so the
+thread count follows the admission limits (ADMISSION_MAX_CONCURRENT +
+ADMISSION_MAX_QUEUE, plus a few to answer with 429 and serve /health).
+With fewer threads, excess requests would wait in gunicorn's own backlog,
+where admission control never sees them.
+"""
+
+import multiprocessing
+import os
+
+# Must be set before workers import the app
+os.environ.setdefault('SHARED_STATE_BACKEND', 'sqlite')
+os.environ.setdefault('SHARED_STATE_PATH', 'shared_state.db')
+# The app's defaults (admission.py), set here so the thread count below agrees with them
+os.environ.setdefault('ADMISSION_MAX_CONCURRENT', '16')
+os.environ.setdefault('ADMISSION_MAX_QUEUE', '32')
+
+SPARE_THREADS = 4  # Beyond admitted and queued searches: rejections, /health and other cheap endpoints
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', int(os.environ['ADMISSION_MAX_CONCURRENT'])
+                        + int(os.environ['ADMISSION_MAX_QUEUE']) + SPARE_THREADS))
+timeout = 120  # Searches can chain several slow upstream calls
+graceful_timeout = 30
+preload_app = False
+accesslog = '-'
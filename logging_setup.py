@@ -0,0 +1,200 @@
+"""
+Logging configuration that keeps log I/O off the request path.
+
+configure_logging() puts a single QueueHandler on the root logger and runs
+the real handlers (stderr, plus LOG_FILE if set) on a QueueListener thread.
+Records whose arguments are all immutable (strings, numbers, None) are
+handed over unformatted, so even %-formatting of the message happens on the
+listener thread; any other record is formatted before it is queued, so it
+logs the arguments as they were at the call. Per-stage logs in the request path are
+DEBUG with lazy %-style arguments, and with LOG_LEVEL=DEBUG only a sample
+of requests (LOG_DEBUG_SAMPLE_RATE) emit them, all or nothing per request.
+
+Each request instead gets one structured INFO line with its status, total
+time and the time spent in each stage, collected by @timed_stage and
+stage_timer():
+
+    request method=POST path=/chat status=200 duration_ms=812.4 extract_ms=640.1 geocode_ms=2.0 ...
+"""
+
+import asyncio
+import atexit
+import contextvars
+import copy
+import functools
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from tracing import span
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_QUEUE_SIZE = 10000
+DEFERRABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))  # Safe to format later on the listener thread
+
+summary_logger = logging.getLogger('citypulse.requests')
+
+# Per-request timing context; None outside a request
+_request: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar('request_log_context',
+                                                                                     default=None)
+_listener: Optional[QueueListener] = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread where it can.
+
+    The stock handler formats every message in the calling thread so records
+    can be pickled; ours never leave the process. Only a record with a
+    mutable argument (a list or dict that may change before the listener
+    gets to it) is merged with its arguments here, like the stock handler
+    does. Records are dropped, not waited on, if the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if not args or (isinstance(args, tuple) and all(isinstance(arg, DEFERRABLE_ARG_TYPES) for arg in args)):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Let DEBUG records through only for requests chosen for debug sampling."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.INFO:
+            return True
+        context = _request.get()
+        return context is None or context['sampled']
+
+
+def configure_logging(level: Optional[str] = None, log_file: Optional[str] = None) -> QueueListener:
+    """Route all logging through a background QueueListener (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    log_file = log_file or os.getenv('LOG_FILE')
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DeferredQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(DebugSamplingFilter())
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush whatever is still queued
+    return _listener
+
+
+def start_request(**fields) -> Dict[str, Any]:
+    """Begin timing a request in the current context."""
+    sample_rate = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.01'))
+    context = {'start': time.perf_counter(), 'stages': {}, 'fields': dict(fields),
+               'sampled': random.random() < sample_rate}
+    _request.set(context)
+    return context
+
+
+def annotate_request(**fields):
+    """Add key=value fields to the current request's summary line."""
+    context = _request.get()
+    if context is not None:
+        context['fields'].update(fields)
+
+
+def record_stage(name: str, seconds: float):
+    """Add time spent in a stage to the current request (no-op outside one)."""
+    context = _request.get()
+    if context is not None:
+        total, calls = context['stages'].get(name, (0.0, 0))
+        context['stages'][name] = (total + seconds, calls + 1)
+
+
+@contextmanager
+def stage_timer(name: str):
+    """Time a block as a request stage, in a trace span of the same name."""
+    start = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def timed_stage(name: str):
+    """Decorator timing every call of a sync or async function as a request stage."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage_timer(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run_in_executor_with_context(func, *args, executor=None):
+    """loop.run_in_executor that keeps the request context, so stages inside `func` are counted."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(contextvars.copy_context().run, func, *args))
+
+
+def _format_value(value: Any) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' ="'):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+def finish_request(**fields):
+    """Emit the request's summary line and clear the context."""
+    context = _request.get()
+    if context is None:
+        return
+    _request.set(None)
+    if not summary_logger.isEnabledFor(logging.INFO):
+        return
+    summary = dict(context['fields'])
+    summary.update(fields)
+    summary['duration_ms'] = round((time.perf_counter() - context['start']) * 1000, 1)
+    for name, (seconds, calls) in context['stages'].items():
+        summary[f'{name}_ms'] = round(seconds * 1000, 1)
+        if calls > 1:
+            summary[f'{name}_calls'] = calls
+    summary_logger.info('request %s', ' '.join(f'{key}={_format_value(value)}' for key, value in summary.items()))
@@ -0,0 +1,114 @@
+"""
+Lazy, paginated Google Nearby Search.
+
+Nearby Search returns at most 20 results per page and up to three pages,
+linked by a `next_page_token` that only becomes valid a couple of seconds
+after it is issued. NearbyPager exposes the pages as an async iterator and
+starts waiting for (and fetching) the next page in the background as soon
+as the current one arrives, so a consumer that needs more candidates gets
+them with the activation delay already partly elapsed, and a consumer that
+stops early simply cancels the pending fetch.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from googlemaps.exceptions import ApiError
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGES = 3
+PAGE_SIZE = 20  # Results on a full page
+NEXT_PAGE_TOKEN_DELAY = 2.0  # Seconds before Google accepts a fresh page token
+TOKEN_RETRY_DELAY = 1.0
+TOKEN_RETRIES = 3
+
+# A candidate counts as "high quality" when it is both well rated and
+# reviewed often enough for the rating to mean something
+QUALITY_MIN_RATING = 4.0
+QUALITY_MIN_REVIEWS = 20
+
+
+def is_quality_candidate(place: Dict) -> bool:
+    """True if a place is good enough to count towards stopping pagination early."""
+    return ((place.get('rating') or 0) >= QUALITY_MIN_RATING
+            and (place.get('user_ratings_total') or 0) >= QUALITY_MIN_REVIEWS)
+
+
+class NearbyPager:
+    """Async iterator over Nearby Search result pages with background prefetch."""
+
+    def __init__(self, client, location: Tuple[float, float], radius: int, keyword: str,
+                 max_pages: int = MAX_PAGES, upstream=None):
+        self.client = client
+        self.location = location
+        self.radius = radius
+        self.keyword = keyword
+        self.max_pages = max_pages
+        self.upstream = upstream  # UpstreamPool to fetch pages on; the loop's default executor without one
+        self.pages_fetched = 0
+        self.exhausted = False
+        self.complete = False  # The last page was short and had no next_page_token: every match was returned
+        self._next: Optional[asyncio.Task] = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> List[Dict]:
+        if self._next is None:
+            if self.pages_fetched > 0 or self.exhausted:
+                raise StopAsyncIteration
+            self._next = asyncio.ensure_future(self._fetch_page(None))
+
+        task, self._next = self._next, None
+        response = await task
+        self.pages_fetched += 1
+
+        token = response.get('next_page_token')
+        results = response.get('results', [])
+        if token and self.pages_fetched < self.max_pages:
+            # Start the token activation wait now, while the caller looks at this page
+            self._next = asyncio.ensure_future(self._fetch_page(token))
+        else:
+            self.exhausted = True
+            self.complete = not token and len(results) < PAGE_SIZE
+        return results
+
+    async def _run(self, func):
+        if self.upstream is not None:
+            return await self.upstream.run(func)
+        return await asyncio.get_running_loop().run_in_executor(None, func)
+
+    async def _fetch_page(self, page_token: Optional[str]) -> Dict:
+        if page_token:
+            await asyncio.sleep(NEXT_PAGE_TOKEN_DELAY)
+
+        for attempt in range(TOKEN_RETRIES):
+            try:
+                logger.debug("[Search] Fetching Nearby Search page %s - Keyword: '%s'", self.pages_fetched + 1, self.keyword)
+                with span('nearby.page', page=self.pages_fetched + 1, attempt=attempt + 1) as page_span:
+                    response = await self._run(
+                        lambda: self.client.places_nearby(location=self.location, radius=self.radius,
+                                                          keyword=self.keyword, page_token=page_token)
+                    )
+                    page_span.set(results=len(response.get('results', [])))
+                    return response
+            except ApiError as e:
+                # INVALID_REQUEST means the page token is not active yet
+                if not page_token or e.status != 'INVALID_REQUEST' or attempt == TOKEN_RETRIES - 1:
+                    raise
+                await asyncio.sleep(TOKEN_RETRY_DELAY)
+
+    async def aclose(self):
+        """Cancel any page still being prefetched."""
+        if self._next is not None:
+            self._next.cancel()
+            try:
+                await self._next
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._next = None
+        self.exhausted = True
@@ -0,0 +1,172 @@
+"""
+Speculative prefetch of "tell me more about X" answers.
+
+The most common follow-up to a search is a request for more detail about
+one of the places just listed. Once a search response has been sent, the
+ProfilePrefetcher generates a detailed profile for each of the top few
+places from the details and reviews already fetched, on a single
+low-priority worker thread. If the user then asks about one of them, chat()
+answers straight from this cache instead of classifying the message and
+calling the LLM with only the earlier answer to go on.
+
+Profiles live in shared state, so a follow-up served by a different worker
+process still hits. Hit rate and wasted work (profiles generated but never
+read) are tracked there too, so the prefetch depth can be tuned.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from data_sources import normalize_place_name
+from shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_TOP_N = 3
+PROFILE_TTL = 60 * 30  # Follow-ups come within minutes of the search
+MAX_PENDING_JOBS = 50
+PREFETCH_NICENESS = 10  # Added to the worker thread's nice value where supported
+
+
+def _profile_key(name: str) -> str:
+    """
+    A place name as matched against follow-up messages.
+
+    Stopwords stay, so "The Newtown Hotel" is not found in "cafes in
+    newtown"; only a leading "the" goes, which people often leave out.
+    """
+    key = normalize_place_name(name, keep_stopwords=True)
+    return key[4:] if key.startswith('the ') else key
+
+
+def _lower_thread_priority():
+    """Run the prefetch worker at a lower OS scheduling priority (Linux only)."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+    except (AttributeError, OSError, PermissionError):
+        pass
+
+
+class ProfilePrefetcher:
+    """Generates and caches per-session place profiles after a search."""
+
+    COUNTERS = ('scheduled', 'generated', 'superseded', 'dropped', 'failed', 'hits', 'misses', 'used',
+                'generation_ms', 'used_ms')
+
+    def __init__(self, generate_profile: Callable[[Dict], str], top_n: int = PREFETCH_TOP_N,
+                 ttl: float = PROFILE_TTL, state: Optional[SharedState] = None):
+        self.generate_profile = generate_profile
+        self.top_n = top_n
+        self.ttl = ttl
+        state = state or SharedState()
+        # {'search_id': n, 'profiles': {normalised name: record}} per session
+        self._sessions = state.namespace('prefetch_profiles', ttl=ttl, persist=True)
+        self._searches = state.namespace('prefetch_searches', ttl=ttl, persist=True)
+        self._counters = state.namespace('prefetch_stats')
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch',
+                                            initializer=_lower_thread_priority)
+
+    def _count(self, name: str, amount: int = 1):
+        try:
+            self._counters.incr(name, amount)
+        except Exception as e:
+            logger.error(f"Failed to update prefetch counter {name}: {e}")
+
+    def schedule(self, session_id: str, places: List[Dict]):
+        """Queue profile generation for the top places of a search. Never blocks."""
+        if not session_id or not places:
+            return
+        search_id = self._searches.incr(session_id)
+        for place in places[:self.top_n]:
+            with self._lock:
+                if self._pending >= MAX_PENDING_JOBS:
+                    self._count('dropped')
+                    continue
+                self._pending += 1
+            self._count('scheduled')
+            self._executor.submit(self._run, session_id, search_id, place)
+
+    def _run(self, session_id: str, search_id: int, place: Dict):
+        try:
+            # Skip work for a search the user has already moved on from
+            if self._searches.get(session_id) != search_id:
+                self._count('superseded')
+                return
+            name = place.get('name', '')
+            start = time.perf_counter()
+            profile = self.generate_profile(place)
+            cost_ms = int((time.perf_counter() - start) * 1000)
+            self._count('generated')
+            self._count('generation_ms', cost_ms)
+            with self._lock:
+                record = self._sessions.get(session_id)
+                if record is None or record['search_id'] < search_id:
+                    record = {'search_id': search_id, 'profiles': {}}
+                elif record['search_id'] > search_id:
+                    return
+                record['profiles'][_profile_key(name)] = {
+                    'place_name': name, 'profile': profile, 'cost_ms': cost_ms, 'used': False,
+                }
+                self._sessions.set(session_id, record)
+        except Exception as e:
+            self._count('failed')
+            logger.error(f"Prefetch failed for {place.get('name')}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def lookup(self, session_id: str, message: str) -> Optional[Dict]:
+        """
+        Return the cached profile for a place named in `message`, if any.
+
+        Only profiles from the session's most recent search are considered.
+        Counts a hit or a miss either way.
+        """
+        normalized_message = f" {normalize_place_name(message, keep_stopwords=True)} "
+        record = self._sessions.get(session_id) or {'profiles': {}}
+        # Prefer the longest matching name ("Bank Hotel" over "Bank")
+        matches = [name_key for name_key in record['profiles']
+                   if name_key and f" {name_key} " in normalized_message]
+        if not matches:
+            self._count('misses')
+            return None
+        name_key = max(matches, key=len)
+        profile = record['profiles'][name_key]
+        self._count('hits')
+        if not profile['used']:
+            # Re-read under the lock: the worker may have stored more profiles, or a newer search's, since
+            with self._lock:
+                current = self._sessions.get(session_id)
+                if current is None or current['search_id'] != record['search_id']:
+                    return profile
+                stored = current['profiles'].get(name_key)
+                if stored is None or stored['used']:
+                    return profile
+                stored['used'] = True
+                self._sessions.set(session_id, current)
+            self._count('used')
+            self._count('used_ms', profile['cost_ms'])
+        return profile
+
+    def stats(self) -> Dict:
+        """
+        Counters across all worker processes.
+
+        `wasted` is the number of generated profiles nobody has read (yet),
+        and `wasted_ms` the generation time spent on them.
+        """
+        stats = {name: self._counters.get(name, 0) for name in self.COUNTERS}
+        with self._lock:
+            stats['pending'] = self._pending
+        stats['wasted'] = stats['generated'] - stats['used']
+        stats['wasted_ms'] = stats['generation_ms'] - stats['used_ms']
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['waste_rate'] = round(stats['wasted'] / stats['generated'], 3) if stats['generated'] else None
+        return stats
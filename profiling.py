@@ -0,0 +1,179 @@
+"""
+Opt-in CPU profiling of individual requests.
+
+A request is profiled when it carries a valid signed X-Profile header, or
+is picked by PROFILE_SAMPLE_RATE (0 by default). The view then runs under
+cProfile. A stack sampler also runs on the same thread and records
+collapsed stacks. Two files are written to PROFILE_DIR:
+
+    <time>-<request id>.prof        pstats (python -m pstats, snakeviz)
+    <time>-<request id>.collapsed   "a;b;c count" lines (flamegraph.pl, speedscope)
+
+Async views run on their own event loop thread, so both profiles cover the
+handler and every task it awaits. Blocking calls handed to executor threads
+show up only as time spent waiting. One request per process is profiled at
+a time, and a request that arrives while another is being profiled runs
+normally. After each write the oldest files are deleted until the directory
+is under PROFILE_DIR_MAX_BYTES.
+
+The header is "<unix time>:<hex HMAC-SHA256 of '<unix time>:<METHOD>:<path>'>"
+keyed with PROFILE_SECRET, and is accepted for PROFILE_SIGNATURE_TTL
+seconds. Without a secret the header is ignored. To make one:
+
+    python profiling.py POST /chat
+
+When a request is not profiled the wrapper costs one header lookup.
+"""
+
+import cProfile
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from flask import request
+
+from logging_setup import annotate_request
+from tracing import current_request_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR_MAX_BYTES = int(os.getenv('PROFILE_DIR_MAX_BYTES', str(100 * 1024 * 1024)))
+PROFILE_SIGNATURE_TTL = 300
+STACK_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+MAX_STACK_DEPTH = 128
+
+
+def sign_profile_request(secret: str, method: str, path: str, timestamp: Optional[int] = None) -> str:
+    """Build an X-Profile header value for a request."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    message = f"{timestamp}:{method.upper()}:{path}".encode()
+    return f"{timestamp}:{hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = STACK_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Decides which requests to profile, runs them under the profilers and manages the output directory."""
+
+    def __init__(self, directory: str = PROFILE_DIR, secret: str = PROFILE_SECRET,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, max_bytes: int = PROFILE_DIR_MAX_BYTES):
+        self.directory = Path(directory)
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._active = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-writer')
+
+    def _signature_valid(self, value: str, method: str, path: str) -> bool:
+        timestamp, _, _ = value.partition(':')
+        try:
+            if abs(time.time() - int(timestamp)) > PROFILE_SIGNATURE_TTL:
+                return False
+        except ValueError:
+            return False
+        return hmac.compare_digest(value, sign_profile_request(self.secret, method, path, int(timestamp)))
+
+    def should_profile(self, method: str, path: str, headers) -> bool:
+        header = headers.get(PROFILE_HEADER)
+        if header and self.secret:
+            if self._signature_valid(header, method, path):
+                return True
+            logger.warning(f"Ignoring {PROFILE_HEADER} header with a bad or expired signature for {path}")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def profile_view(self, view):
+        """Wrap an async Flask view so that triggered requests run under the profilers."""
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            if not (request.headers.get(PROFILE_HEADER) or self.sample_rate):
+                return await view(*args, **kwargs)
+            if not self.should_profile(request.method, request.path, request.headers):
+                return await view(*args, **kwargs)
+            if not self._active.acquire(blocking=False):
+                return await view(*args, **kwargs)
+
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{current_request_id() or os.getpid()}"
+            profile = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            profile.enable()
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                profile.disable()
+                sampler.stop()
+                self._active.release()
+                annotate_request(profile=name)
+                self._writer.submit(self._write, name, profile, sampler.collapsed())
+        return wrapper
+
+    def _write(self, name: str, profile: cProfile.Profile, collapsed: str):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(str(self.directory / f"{name}.prof"))
+            (self.directory / f"{name}.collapsed").write_text(collapsed)
+            logger.info(f"Wrote request profile {self.directory / name}.prof")
+            self._enforce_retention()
+        except Exception as e:
+            logger.error(f"Failed to write request profile {name}: {str(e)}")
+
+    def _enforce_retention(self):
+        """Delete the oldest profile files until the directory fits in max_bytes."""
+        files = sorted((p for p in self.directory.iterdir() if p.suffix in ('.prof', '.collapsed')),
+                       key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or not PROFILE_SECRET:
+        sys.exit("Usage: PROFILE_SECRET=... python profiling.py METHOD PATH")
+    print(f"{PROFILE_HEADER}: {sign_profile_request(PROFILE_SECRET, sys.argv[1], sys.argv[2])}")
@@ -0,0 +1,132 @@
+"""
+Multi-signal re-ranking of Nearby Search candidates.
+
+Google returns candidates in its own prominence order, but search() only
+spends Place Details and LLM calls on the first MAX_PLACES_TO_ANALYZE. This
+module scores every candidate in a single NumPy pass so the expensive
+enrichment goes to the best candidates rather than simply the first ones.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from spatial_index import haversine_m, place_location
+
+# Relative importance of each signal. Scores are a weighted sum of signals
+# that are each normalised to [0, 1], so only the ratios matter.
+DEFAULT_RANKING_WEIGHTS = {
+    'rating': 0.30,
+    'popularity': 0.20,
+    'distance': 0.20,
+    'open_now': 0.10,
+    'keyword_match': 0.10,
+    'type_match': 0.10,
+    'external_mention': 0.10,
+    'review_evidence': 0.15,
+}
+
+# Ratings are shrunk towards this prior so a single 5-star review does not
+# outrank hundreds of 4.6s
+RATING_PRIOR = 4.0
+RATING_PRIOR_WEIGHT = 20
+POPULARITY_SATURATION = 2000  # user_ratings_total beyond this adds nothing
+
+# Words in a search keyword that say nothing about the kind of place
+KEYWORD_STOPWORDS = {'a', 'an', 'and', 'the', 'in', 'with', 'for', 'of', 'places', 'place', 'friendly'}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in KEYWORD_STOPWORDS]
+
+
+def _place_types(place: Dict) -> List[str]:
+    types = place.get('types') or place.get('type') or []
+    return types if isinstance(types, list) else [str(types)]
+
+
+def score_places(places: Sequence[Dict], location: Tuple[float, float], radius: float,
+                 keyword: str = '', requirements: str = '',
+                 weights: Optional[Dict[str, float]] = None,
+                 external_matches: Optional[Set[str]] = None,
+                 evidence: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Score every candidate place in one vectorised pass.
+
+    Returns an array of scores aligned with `places`; higher is better.
+    Missing signals (no rating, no geometry, unknown opening hours) score
+    as neutral rather than as zero. `external_matches` holds place_ids that
+    external sources (web search etc.) also recommended. `evidence` holds
+    per-place review evidence for the requirements in [-1, 1], as computed
+    by review_signals.ReviewSignalIndex.
+    """
+    weights = {**DEFAULT_RANKING_WEIGHTS, **(weights or {})}
+    count = len(places)
+    if count == 0:
+        return np.zeros(0)
+
+    ratings = np.array([p.get('rating') or np.nan for p in places], dtype=np.float64)
+    totals = np.array([p.get('user_ratings_total') or 0 for p in places], dtype=np.float64)
+    coords = np.array([place_location(p) or (math.nan, math.nan) for p in places], dtype=np.float64)
+    open_now = np.array([(p.get('opening_hours') or {}).get('open_now') for p in places], dtype=object)
+
+    # Bayesian-smoothed rating on a 1-5 scale, mapped to [0, 1]
+    has_rating = ~np.isnan(ratings)
+    smoothed = np.where(
+        has_rating,
+        (np.nan_to_num(ratings) * totals + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (totals + RATING_PRIOR_WEIGHT),
+        RATING_PRIOR,
+    )
+    rating_signal = np.clip((smoothed - 1.0) / 4.0, 0.0, 1.0)
+
+    popularity_signal = np.log1p(np.minimum(totals, POPULARITY_SATURATION)) / math.log1p(POPULARITY_SATURATION)
+
+    distances = haversine_m(location[0], location[1], coords[:, 0], coords[:, 1])
+    distance_signal = np.where(np.isnan(distances), 0.5,
+                               1.0 - np.clip(np.nan_to_num(distances) / max(radius, 1.0), 0.0, 1.0))
+
+    open_signal = np.where(open_now == True, 1.0, np.where(open_now == False, 0.0, 0.5)).astype(np.float64)  # noqa: E712
+
+    # Keyword and type matching need per-place string work; keep it to set lookups
+    query_tokens = set(_tokens(f"{keyword} {requirements}"))
+    keyword_signal = np.zeros(count)
+    type_signal = np.zeros(count)
+    if query_tokens:
+        for i, place in enumerate(places):
+            types = _place_types(place)
+            type_tokens = set(_tokens(' '.join(types).replace('_', ' ')))
+            name_tokens = set(_tokens(place.get('name', '')))
+            keyword_signal[i] = len(query_tokens & (name_tokens | type_tokens)) / len(query_tokens)
+            type_signal[i] = 1.0 if query_tokens & type_tokens else 0.0
+
+    external_matches = external_matches or set()
+    external_signal = np.array([1.0 if p.get('place_id') in external_matches else 0.0 for p in places])
+
+    # No evidence either way is neutral
+    evidence_signal = (np.asarray(evidence, dtype=np.float64) + 1.0) / 2.0 if evidence is not None else np.full(count, 0.5)
+
+    return (weights['rating'] * rating_signal
+            + weights['popularity'] * popularity_signal
+            + weights['distance'] * distance_signal
+            + weights['open_now'] * open_signal
+            + weights['keyword_match'] * keyword_signal
+            + weights['type_match'] * type_signal
+            + weights['external_mention'] * external_signal
+            + weights['review_evidence'] * evidence_signal)
+
+
+def rank_places(places: Sequence[Dict], location: Tuple[float, float], radius: float,
+                keyword: str = '', requirements: str = '',
+                weights: Optional[Dict[str, float]] = None,
+                external_matches: Optional[Set[str]] = None,
+                evidence: Optional[np.ndarray] = None) -> List[Dict]:
+    """Return `places` ordered best first. Ties keep Google's original order."""
+    if not places:
+        return []
+    scores = score_places(places, location, radius, keyword, requirements, weights, external_matches, evidence)
+    order = np.argsort(-scores, kind='stable')
+    return [places[i] for i in order]
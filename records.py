@@ -0,0 +1,204 @@
+"""
+Compact in-memory records for places, reviews and conversation messages.
+
+Google place results are dicts with a dozen or more nested dicts and lists
+each, and a worker keeps tens of thousands of them in the spatial index.
+Conversations are lists of {"role", "content"} dicts. The classes here hold
+the same data in __slots__ objects:
+
+- coordinates and viewports become floats and tuples;
+- lists become tuples;
+- short, repetitive strings are interned (place types, roles, review
+  languages, "a month ago", icon URLs), so there is one copy per process.
+
+Conversion happens only at the edges: from_google()/from_dict() when data
+is stored, and to_dict() when it is handed to code or clients that expect
+the Google/OpenAI shapes. Keys a record does not model are kept as they
+are in `extra`, as are known keys whose value has an unexpected shape, so
+the round trip never loses data.
+"""
+
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAX_INTERNED_LENGTH = 128  # Longer strings are rarely repeated, so not worth interning
+PHOTO_KEYS = frozenset(('photo_reference', 'width', 'height', 'html_attributions'))
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _intern_all(values: Iterable) -> Tuple:
+    return tuple(_intern(v) for v in values)
+
+
+def _set(target: Dict, key: str, value: Any):
+    if value is not None:
+        target[key] = value
+
+
+class ReviewRecord:
+    """One Google review."""
+
+    __slots__ = ('author_name', 'author_url', 'profile_photo_url', 'language', 'original_language',
+                 'rating', 'relative_time_description', 'text', 'time', 'translated', 'extra')
+
+    FIELDS = ('author_name', 'author_url', 'profile_photo_url', 'language', 'original_language', 'rating',
+              'relative_time_description', 'text', 'time', 'translated')
+    INTERNED = frozenset(('language', 'original_language', 'relative_time_description'))
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_google(cls, review: Dict) -> 'ReviewRecord':
+        record = cls(**{name: _intern(review[name]) if name in cls.INTERNED and name in review else review.get(name)
+                        for name in cls.FIELDS})
+        extra = {k: v for k, v in review.items() if k not in cls.FIELDS}
+        record.extra = extra or None
+        return record
+
+    def to_dict(self) -> Dict:
+        review = {}
+        for name in self.FIELDS:
+            _set(review, name, getattr(self, name))
+        if self.extra:
+            review.update(self.extra)
+        return review
+
+
+class PlaceRecord:
+    """A Google place (Nearby Search or Place Details result)."""
+
+    __slots__ = ('place_id', 'name', 'vicinity', 'formatted_address', 'lat', 'lng', 'viewport', 'rating',
+                 'user_ratings_total', 'price_level', 'types', 'business_status', 'open_now', 'weekday_text',
+                 'photos', 'reviews', 'website', 'formatted_phone_number', 'icon', 'extra')
+
+    SCALARS = ('place_id', 'name', 'vicinity', 'formatted_address', 'rating', 'user_ratings_total',
+               'price_level', 'website', 'formatted_phone_number')
+    MODELLED = frozenset(SCALARS + ('geometry', 'types', 'business_status', 'opening_hours', 'photos', 'reviews',
+                                    'icon'))
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    @classmethod
+    def from_google(cls, place: Dict) -> 'PlaceRecord':
+        record = cls()
+        extra = {k: _intern(v) if isinstance(v, str) and len(v) <= MAX_INTERNED_LENGTH else v
+                 for k, v in place.items() if k not in cls.MODELLED}
+        for name in cls.SCALARS:
+            setattr(record, name, place.get(name))
+        record.business_status = _intern(place.get('business_status'))
+        record.icon = _intern(place.get('icon'))
+
+        geometry = place.get('geometry')
+        try:
+            if set(geometry) - {'location', 'viewport'}:
+                raise ValueError
+            record.lat, record.lng = float(geometry['location']['lat']), float(geometry['location']['lng'])
+            viewport = geometry.get('viewport')
+            if viewport is not None:
+                record.viewport = (float(viewport['northeast']['lat']), float(viewport['northeast']['lng']),
+                                   float(viewport['southwest']['lat']), float(viewport['southwest']['lng']))
+        except (KeyError, TypeError, ValueError):
+            record.lat = record.lng = record.viewport = None
+            if geometry is not None:
+                extra['geometry'] = geometry
+
+        types = place.get('types')
+        if isinstance(types, list):
+            record.types = _intern_all(types)
+        elif types is not None:
+            extra['types'] = types
+
+        hours = place.get('opening_hours')
+        if (isinstance(hours, dict) and hours and not set(hours) - {'open_now', 'weekday_text'}
+                and isinstance(hours.get('open_now', False), bool)
+                and isinstance(hours.get('weekday_text', []), list)):
+            record.open_now = hours.get('open_now')
+            if 'weekday_text' in hours:
+                record.weekday_text = tuple(hours['weekday_text'])
+        elif hours is not None:
+            extra['opening_hours'] = hours
+
+        photos = place.get('photos')
+        if isinstance(photos, list) and all(isinstance(p, dict) and set(p) == PHOTO_KEYS for p in photos):
+            record.photos = tuple((p['photo_reference'], p['width'], p['height'], _intern_all(p['html_attributions']))
+                                  for p in photos)
+        elif photos is not None:
+            extra['photos'] = photos
+
+        reviews = place.get('reviews')
+        if isinstance(reviews, list) and all(isinstance(r, dict) for r in reviews):
+            record.reviews = tuple(ReviewRecord.from_google(r) for r in reviews)
+        elif reviews is not None:
+            extra['reviews'] = reviews
+
+        record.extra = extra or None
+        return record
+
+    @property
+    def location(self) -> Optional[Tuple[float, float]]:
+        return (self.lat, self.lng) if self.lat is not None else None
+
+    def to_dict(self) -> Dict:
+        place = {}
+        for name in self.SCALARS:
+            _set(place, name, getattr(self, name))
+        _set(place, 'business_status', self.business_status)
+        _set(place, 'icon', self.icon)
+        if self.lat is not None:
+            place['geometry'] = {'location': {'lat': self.lat, 'lng': self.lng}}
+            if self.viewport is not None:
+                ne_lat, ne_lng, sw_lat, sw_lng = self.viewport
+                place['geometry']['viewport'] = {'northeast': {'lat': ne_lat, 'lng': ne_lng},
+                                                 'southwest': {'lat': sw_lat, 'lng': sw_lng}}
+        if self.types is not None:
+            place['types'] = list(self.types)
+        if self.open_now is not None or self.weekday_text is not None:
+            hours = place['opening_hours'] = {}
+            _set(hours, 'open_now', self.open_now)
+            if self.weekday_text is not None:
+                hours['weekday_text'] = list(self.weekday_text)
+        if self.photos is not None:
+            place['photos'] = [{'photo_reference': ref, 'width': width, 'height': height,
+                                'html_attributions': list(attributions)}
+                               for ref, width, height, attributions in self.photos]
+        if self.reviews is not None:
+            place['reviews'] = [review.to_dict() for review in self.reviews]
+        if self.extra:
+            place.update(self.extra)
+        return place
+
+    def merged(self, place: Dict) -> 'PlaceRecord':
+        """A new record with `place`'s keys layered over this one (details enriching a nearby result)."""
+        return PlaceRecord.from_google({**self.to_dict(), **place})
+
+
+class MessageRecord:
+    """One conversation message."""
+
+    __slots__ = ('role', 'content')
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+
+    @classmethod
+    def from_dict(cls, message: Dict) -> 'MessageRecord':
+        return cls(message['role'], message['content'])
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'role': self.role, 'content': self.content}
+
+
+def messages_from_dicts(messages: Iterable[Dict]) -> Tuple[MessageRecord, ...]:
+    return tuple(MessageRecord.from_dict(m) for m in messages)
+
+
+def messages_to_dicts(messages: Iterable[MessageRecord]) -> List[Dict[str, str]]:
+    return [m.to_dict() for m in messages]
@@ -0,0 +1,137 @@
+"""
+Response shaping for search results.
+
+Search responses used to carry every Place Details field (all reviews, photo
+references, opening_hours periods) plus the raw analysis object, although
+the web client only reads a handful of fields. This module projects payloads
+down to a compact default set, lets API clients opt into more with a
+`fields` parameter, and compresses JSON bodies for clients that accept it.
+"""
+
+import gzip
+import json
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Place fields read by static/script.js
+DEFAULT_PLACE_FIELDS = (
+    'place_id',
+    'name',
+    'formatted_address',
+    'rating',
+    'geometry.location',
+    'opening_hours.open_now',
+    'opening_hours.weekday_text',
+    'ai_description',
+)
+# Top-level keys returned unless the client asks for others
+DEFAULT_TOP_LEVEL_FIELDS = ('response', 'places', 'query')
+# Keys that are always returned because clients rely on them to render anything
+ALWAYS_INCLUDED_FIELDS = ('response', 'error')
+ALL_FIELDS = '*'
+
+MIN_COMPRESS_SIZE = 1024  # Bytes; below this compression costs more than it saves
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Dynamic content: favour speed over ratio
+
+
+def parse_fields(raw: Union[str, Iterable[str], None]) -> Optional[Set[str]]:
+    """
+    Parse a `fields` parameter into a set of dotted paths.
+
+    Accepts a comma-separated string ("places.name,places.review,analysis")
+    or a list of paths. Returns None when no fields were requested.
+    """
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    fields = {str(f).strip() for f in raw if str(f).strip()}
+    return fields or None
+
+
+def _copy_path(source: Dict, target: Dict, path: List[str]):
+    """Copy a single dotted path from source into target, creating parents."""
+    key = path[0]
+    if not isinstance(source, dict) or key not in source:
+        return
+    if len(path) == 1:
+        target[key] = source[key]
+        return
+    child = target.setdefault(key, {})
+    if isinstance(child, dict):
+        _copy_path(source[key], child, path[1:])
+
+
+def project(item: Dict, paths: Iterable[str]) -> Dict:
+    """Return a new dict containing only the given dotted paths of `item`."""
+    projected = {}
+    for path in paths:
+        _copy_path(item, projected, path.split('.'))
+    return projected
+
+
+def shape_search_payload(payload: Dict, fields: Optional[Set[str]] = None) -> Dict:
+    """
+    Project a search payload to the requested (or default) fields.
+
+    Paths prefixed with "places." select fields of each place; anything else
+    names a top-level key such as "analysis" or "query". "*" returns the
+    payload untouched and "places.*" returns full place objects.
+    """
+    if fields and ALL_FIELDS in fields:
+        return payload
+
+    if fields:
+        place_fields = {f.split('.', 1)[1] for f in fields if f.startswith('places.')}
+        top_level = {f for f in fields if not f.startswith('places.')}
+        if place_fields:
+            top_level.add('places')
+    else:
+        place_fields = set()
+        top_level = set(DEFAULT_TOP_LEVEL_FIELDS)
+    top_level.update(ALWAYS_INCLUDED_FIELDS)
+
+    shaped = {key: value for key, value in payload.items() if key in top_level}
+    if 'places' in shaped and ALL_FIELDS not in place_fields:
+        paths = place_fields or DEFAULT_PLACE_FIELDS
+        shaped['places'] = [project(place, paths) for place in shaped['places']]
+    return shaped
+
+
+def _negotiate_encoding() -> str:
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return 'identity'
+
+
+def json_response(payload: Dict, status: int = 200) -> Response:
+    """Serialise compactly and compress if the client accepts it and it is worth it."""
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    response = Response(mimetype='application/json', status=status)
+
+    encoding = _negotiate_encoding() if len(body) >= MIN_COMPRESS_SIZE else 'identity'
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+
+    response.set_data(body)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def ndjson_line(payload: Dict) -> bytes:
+    """One compact JSON document terminated by a newline, for streamed NDJSON responses."""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
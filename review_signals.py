@@ -0,0 +1,227 @@
+"""
+Requirement evidence from place reviews and types.
+
+Requirements such as "dog-friendly", "outdoor seating" or "wifi" used to be
+appended to the Nearby Search keyword, leaving the analysis LLM to weed out
+places that don't qualify after Place Details had already been paid for.
+ReviewSignalIndex keeps per-place evidence for every requirement in
+REQUIREMENT_CUES, so candidates can be prefiltered and boosted before any
+details are fetched:
+
+- each review is split into clauses, and a cue phrase in a clause counts
+  for its requirement ("water bowls for the dogs" -> dog-friendly). A
+  negation a few words either side of the cue ("no dogs allowed",
+  "wifi doesn't work") or an opposite cue ("too noisy" for quiet) counts
+  against it. Each review counts at most once per requirement, one way;
+- counts accumulate in a shared-state record per place_id. Every review
+  has a fingerprint, so a review is counted once however often the
+  details are refetched, and new reviews add to the counts as they arrive;
+- place types add weak evidence on the fly (a park is somewhere to take
+  the dog).
+
+evidence() turns the counts into a score in [-1, 1] per place for a
+requirements string: positive when reviews back the requirement, negative
+when they contradict it, 0 when nothing is known.
+"""
+
+import logging
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shared_state import SharedState
+from slot_extractor import match_phrases, tokenize
+
+logger = logging.getLogger(__name__)
+
+REVIEW_SIGNAL_TTL = 60 * 60 * 24 * 30  # Evidence from reviews stays relevant for a while
+NEGATION_WINDOW_BEFORE = 3  # Words before a cue that can negate it ("no dogs", "didn't have wifi")
+NEGATION_WINDOW_AFTER = 2  # Words after it ("dogs not allowed", "wifi doesn't work")
+TYPE_EVIDENCE = 0.5  # A matching place type counts as half a review
+EVIDENCE_PRIOR = 1.0  # Pulls scores from few reviews towards 0
+MAX_FINGERPRINTS = 200  # Reviews remembered per place to avoid double counting
+
+# Canonical requirement (as slot_extractor names them) -> cue phrases in reviews. Single words only
+# where they can't mean anything else: "hot dog", "arrived late", "family run", "a date" and "the band
+# was booked out" would otherwise count, and negative evidence drops candidates before details.
+REQUIREMENT_CUES = {
+    'dog-friendly': ('dog friendly', 'dogs allowed', 'dogs welcome', 'my dog', 'our dog', 'our dogs',
+                     'the dogs', 'pooch', 'puppy', 'puppies', 'water bowl', 'water bowls', 'dog bowl',
+                     'pet friendly', 'doggo', 'furry friend'),
+    'family-friendly': ('family friendly', 'kid friendly', 'kids friendly', 'child friendly', 'kids menu',
+                        'with kids', 'with the kids', 'with children', 'for kids', 'for families',
+                        'high chair', 'high chairs', 'playground', 'pram', 'prams', 'toddler', 'toddlers',
+                        'little ones'),
+    'wifi': ('wifi', 'wi fi', 'free internet', 'power outlets', 'power points'),
+    'outdoor seating': ('outdoor seating', 'outdoor area', 'outdoor tables', 'sit outside', 'seating outside',
+                        'beer garden', 'courtyard', 'terrace', 'alfresco', 'al fresco', 'balcony', 'patio',
+                        'footpath seating'),
+    'live music': ('live music', 'live band', 'live bands', 'live acts', 'gigs', 'acoustic set'),
+    'vegan': ('vegan', 'plant based'),
+    'vegetarian': ('vegetarian', 'veggie', 'vego', 'vegan', 'plant based'),
+    'gluten-free': ('gluten free', 'coeliac', 'celiac'),
+    'cheap': ('cheap', 'affordable', 'good value', 'great value', 'value for money', 'reasonably priced',
+              'inexpensive', 'bargain'),
+    'quiet': ('quiet', 'peaceful', 'relaxed atmosphere', 'relaxed vibe', 'chilled vibe', 'laid back'),
+    'views': ('views', 'great view', 'amazing view', 'harbour view', 'water view', 'water views'),
+    'rooftop': ('rooftop', 'roof top', 'roof terrace'),
+    'open late': ('open late', 'late night', 'late nights', 'till late', 'until late', 'after midnight',
+                  'open till midnight', 'open until midnight'),
+    'wheelchair accessible': ('wheelchair', 'step free', 'disabled access', 'accessible toilet', 'ramp access'),
+    'parking': ('parking', 'car park', 'carpark'),
+    'laptop-friendly': ('laptop', 'laptops', 'wifi', 'wi fi', 'power outlets', 'power points', 'study spot',
+                        'studying', 'work from'),
+    'romantic': ('romantic', 'date night', 'date spot', 'first date', 'intimate', 'candle lit', 'candlelit'),
+    'good for groups': ('large groups', 'large group', 'big groups', 'big group', 'big table', 'large table',
+                        'function room', 'group booking'),
+    'happy hour': ('happy hour', 'drink specials', 'drinks specials'),
+    'trivia': ('trivia', 'quiz', 'quiz night', 'trivia night'),
+}
+# Cues that count against a requirement without a negation
+OPPOSITE_CUES = {
+    'dog-friendly': ('no dogs', 'dogs not allowed'),
+    'cheap': ('expensive', 'pricey', 'overpriced', 'over priced', 'rip off'),
+    'quiet': ('loud', 'noisy', 'deafening', 'rowdy'),
+}
+# Google place types that suggest a requirement
+TYPE_CUES = {
+    'dog-friendly': ('park', 'dog_park', 'pet_store'),
+    'family-friendly': ('park', 'amusement_park', 'zoo', 'aquarium', 'museum', 'library'),
+    'outdoor seating': ('park', 'campground'),
+    'wifi': ('library',),
+    'laptop-friendly': ('library',),
+}
+NEGATIONS = frozenset(('no', 'not', 'never', 'dont', 'doesnt', 'didnt', 'isnt', 'arent', 'wasnt', 'werent',
+                       'cant', 'cannot', 'wont', 'without', 'lack', 'lacks', 'lacking', 'nor', 'neither',
+                       'zero', 'nothing', 'banned', 'prohibited'))
+
+_CLAUSE_RE = re.compile(r"[.!?;,:()\n]|\bbut\b|\bhowever\b|\balthough\b|\bthough\b")
+
+
+def _cue_table() -> Tuple[Dict[Tuple[str, ...], List[Tuple[str, int]]], int]:
+    """Cue token tuple -> [(requirement, +1 or -1)]."""
+    table: Dict[Tuple[str, ...], List[Tuple[str, int]]] = {}
+    for requirement, cues in REQUIREMENT_CUES.items():
+        for cue in cues:
+            table.setdefault(tuple(tokenize(cue)), []).append((requirement, 1))
+    for requirement, cues in OPPOSITE_CUES.items():
+        for cue in cues:
+            table.setdefault(tuple(tokenize(cue)), []).append((requirement, -1))
+    return table, max(len(key) for key in table)
+
+
+_CUES, _MAX_CUE_WORDS = _cue_table()
+
+
+def place_reviews(place: Dict) -> List[Dict]:
+    """Reviews of a Google place; Place Details returns 'reviews', some callers use 'review'."""
+    reviews = place.get('reviews') or place.get('review') or []
+    return [review for review in reviews if isinstance(review, dict)]
+
+
+def requirement_signals(requirements: str) -> List[str]:
+    """Canonical requirements in a requirements string that this module has cues for."""
+    found = []
+    for kind, value, _ in match_phrases(tokenize(requirements or '')):
+        if kind == 'requirement' and value in REQUIREMENT_CUES and value not in found:
+            found.append(value)
+    return found
+
+
+def review_evidence(text: str) -> Dict[str, int]:
+    """Requirement -> +1 (supported) or -1 (contradicted) for one review's text."""
+    evidence: Dict[str, int] = {}
+    for clause in _CLAUSE_RE.split((text or '').lower()):
+        tokens = tokenize(clause)
+        i = 0
+        while i < len(tokens):
+            for n in range(min(_MAX_CUE_WORDS, len(tokens) - i), 0, -1):
+                matches = _CUES.get(tuple(tokens[i:i + n]))
+                if matches is None:
+                    continue
+                window = tokens[max(0, i - NEGATION_WINDOW_BEFORE):i] + tokens[i + n:i + n + NEGATION_WINDOW_AFTER]
+                negated = any(token in NEGATIONS for token in window)
+                for requirement, polarity in matches:
+                    vote = -polarity if negated else polarity
+                    # A contradiction anywhere in the review outweighs a passing mention
+                    evidence[requirement] = min(evidence.get(requirement, vote), vote)
+                i += n
+                break
+            else:
+                i += 1
+    return evidence
+
+
+def _fingerprint(review: Dict) -> str:
+    material = f"{review.get('author_name', '')}|{review.get('time', '')}|{(review.get('text') or '')[:200]}"
+    return format(zlib.crc32(material.encode('utf-8')), '08x')
+
+
+class ReviewSignalIndex:
+    """Per-place requirement evidence counts, updated incrementally as reviews arrive."""
+
+    def __init__(self, state: SharedState, ttl: float = REVIEW_SIGNAL_TTL):
+        self._records = state.namespace('review_signals', ttl=ttl, persist=True)
+        self.updates = 0
+        self.reviews_counted = 0
+
+    def update(self, place: Dict) -> int:
+        """Count reviews of a place not seen before. Returns how many were new."""
+        place_id = place.get('place_id')
+        reviews = place_reviews(place)
+        if not place_id or not reviews:
+            return 0
+        record = self._records.get(place_id) or {'counts': {}, 'seen': []}
+        seen = set(record['seen'])
+        new = 0
+        for review in reviews:
+            fingerprint = _fingerprint(review)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            record['seen'].append(fingerprint)
+            new += 1
+            for requirement, vote in review_evidence(review.get('text', '')).items():
+                counts = record['counts'].setdefault(requirement, [0, 0])
+                counts[0 if vote > 0 else 1] += 1
+        if not new:
+            return 0
+        record['seen'] = record['seen'][-MAX_FINGERPRINTS:]
+        self._records.set(place_id, record)
+        self.updates += 1
+        self.reviews_counted += new
+        logger.debug("Counted %s new reviews for %s", new, place_id)
+        return new
+
+    def counts(self, place_id: str) -> Dict[str, List[int]]:
+        record = self._records.get(place_id)
+        return record['counts'] if record else {}
+
+    def evidence(self, places: Sequence[Dict], requirements: str) -> Optional[np.ndarray]:
+        """
+        Evidence score in [-1, 1] per place for the requirements, averaged over them.
+
+        Returns None when the requirements include nothing this index has
+        cues for, so callers can skip the signal entirely.
+        """
+        wanted = requirement_signals(requirements)
+        if not wanted:
+            return None
+        scores = np.zeros(len(places))
+        for i, place in enumerate(places):
+            counts = self.counts(place['place_id']) if place.get('place_id') else {}
+            types = place.get('types') or place.get('type') or []
+            types = set(types if isinstance(types, list) else [types])
+            total = 0.0
+            for requirement in wanted:
+                positive, negative = counts.get(requirement, (0, 0))
+                if types.intersection(TYPE_CUES.get(requirement, ())):
+                    positive += TYPE_EVIDENCE
+                total += (positive - negative) / (positive + negative + EVIDENCE_PRIOR)
+            scores[i] = total / len(wanted)
+        return scores
+
+    def stats(self) -> Dict:
+        return {'places': len(self._records), 'updates': self.updates, 'reviews_counted': self.reviews_counted}
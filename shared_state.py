@@ -0,0 +1,365 @@
+"""
+Process-shared state for caches and coordination.
+
+Module-level dicts only work with a single process: under gunicorn with N
+workers every cache is fragmented N ways and periodic jobs run N times.
+Everything that caches or coordinates goes through a SharedState instead,
+split into namespaces with their own default TTL:
+
+    contexts = shared_state.namespace('search_context', ttl=1800)
+    contexts.set(session_id, {...})
+    if maintenance.try_lock('session_cleanup', ttl=86400): ...
+
+Two backends are available, chosen with SHARED_STATE_BACKEND:
+
+- ``memory`` (default): per-process dictionaries, for the development
+  server and single-worker deployments.
+- ``sqlite``: one WAL-mode SQLite file (SHARED_STATE_PATH) shared by every
+  worker on the box, with no external service to run.
+
+Values must be JSON-serialisable. Expiry times are wall-clock timestamps so
+they mean the same thing in every process.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'memory'
+DEFAULT_SQLITE_PATH = 'shared_state.db'
+DEFAULT_NAMESPACE_SIZE = 10000  # Per namespace, memory backend only
+SQLITE_PURGE_EVERY = 500  # Writes between sweeps of expired rows
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+class MemoryBackend:
+    """
+    Per-process backend: an LRU dict with expiry times per namespace.
+
+    If `fallback` is set (a snapshots.SnapshotReader), a key missing from
+    one of the fallback's namespaces is looked up there first, so a
+    restarted worker warms up from the last snapshot one key at a time.
+    Deleted keys are remembered so the snapshot cannot bring them back.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_NAMESPACE_SIZE):
+        self.maxsize = maxsize
+        self._data: Dict[str, 'OrderedDict[str, Tuple[str, Optional[float]]]'] = {}
+        self._lock = threading.Lock()
+        self.fallback = None
+        self._deleted: set = set()
+
+    def _table(self, namespace: str) -> 'OrderedDict[str, Tuple[str, Optional[float]]]':
+        return self._data.setdefault(namespace, OrderedDict())
+
+    def _live(self, table, key: str, now: float) -> Optional[Tuple[str, Optional[float]]]:
+        entry = table.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del table[key]
+            return None
+        table.move_to_end(key)
+        return entry
+
+    def _store(self, table, key: str, value: str, expires_at: Optional[float]):
+        table[key] = (value, expires_at)
+        table.move_to_end(key)
+        while len(table) > self.maxsize:
+            table.popitem(last=False)
+
+    def _warm(self, namespace: str, key: str):
+        """Copy a key into memory from the fallback snapshot if that is the only place it is."""
+        fallback = self.fallback
+        if fallback is None or namespace not in fallback.namespaces or (namespace, key) in self._deleted:
+            return
+        with self._lock:
+            if self._live(self._table(namespace), key, time.time()):
+                return
+        entry = fallback.get(namespace, key)  # Outside the lock: this reads the snapshot file
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return
+        with self._lock:
+            table = self._table(namespace)
+            if key not in table and (namespace, key) not in self._deleted:
+                self._store(table, key, entry[0], entry[1])
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        self._warm(namespace, key)
+        with self._lock:
+            entry = self._live(self._table(namespace), key, time.time())
+            return entry[0] if entry else None
+
+    def set(self, namespace: str, key: str, value: str, expires_at: Optional[float]):
+        with self._lock:
+            self._store(self._table(namespace), key, value, expires_at)
+            self._deleted.discard((namespace, key))
+
+    def add(self, namespace: str, key: str, value: str, expires_at: Optional[float]) -> bool:
+        self._warm(namespace, key)
+        with self._lock:
+            table = self._table(namespace)
+            if self._live(table, key, time.time()):
+                return False
+            self._store(table, key, value, expires_at)
+            return True
+
+    def incr(self, namespace: str, key: str, amount: int, expires_at: Optional[float]) -> int:
+        self._warm(namespace, key)
+        with self._lock:
+            table = self._table(namespace)
+            entry = self._live(table, key, time.time())
+            value = (int(entry[0]) if entry else 0) + amount
+            self._store(table, key, str(value), entry[1] if entry else expires_at)
+            return value
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._table(namespace).pop(key, None)
+            if self.fallback is not None and namespace in self.fallback.namespaces:
+                self._deleted.add((namespace, key))
+
+    def items(self, namespace: str) -> List[Tuple[str, str, Optional[float]]]:
+        """Live (key, value, expires_at) entries of a namespace, for snapshots."""
+        now = time.time()
+        with self._lock:
+            return [(key, value, expires_at) for key, (value, expires_at) in self._table(namespace).items()
+                    if expires_at is None or expires_at > now]
+
+    def is_deleted(self, namespace: str, key: str) -> bool:
+        return (namespace, key) in self._deleted
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            return len(self._table(namespace))
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for table in self._data.values():
+                for key in [k for k, (_, expires_at) in table.items() if expires_at is not None and expires_at <= now]:
+                    del table[key]
+                    removed += 1
+        return removed
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """Backend shared by every process on the box through one SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS shared_state (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            'SELECT value FROM shared_state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (namespace, key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str, expires_at: Optional[float]):
+        self._connect().execute('INSERT OR REPLACE INTO shared_state VALUES (?, ?, ?, ?)',
+                                (namespace, key, value, expires_at))
+        self._after_write()
+
+    def add(self, namespace: str, key: str, value: str, expires_at: Optional[float]) -> bool:
+        # A single upsert, so two processes can never both win
+        cursor = self._connect().execute('''
+        INSERT INTO shared_state VALUES (?, ?, ?, ?)
+        ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+        WHERE shared_state.expires_at IS NOT NULL AND shared_state.expires_at <= ?
+        ''', (namespace, key, value, expires_at, time.time()))
+        self._after_write()
+        return cursor.rowcount == 1
+
+    def incr(self, namespace: str, key: str, amount: int, expires_at: Optional[float]) -> int:
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value, expires_at FROM shared_state WHERE namespace = ? AND key = ? '
+                'AND (expires_at IS NULL OR expires_at > ?)', (namespace, key, now)).fetchone()
+            value = (int(row[0]) if row else 0) + amount
+            conn.execute('INSERT OR REPLACE INTO shared_state VALUES (?, ?, ?, ?)',
+                         (namespace, key, str(value), row[1] if row else expires_at))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._after_write()
+        return value
+
+    def delete(self, namespace: str, key: str):
+        self._connect().execute('DELETE FROM shared_state WHERE namespace = ? AND key = ?', (namespace, key))
+
+    def count(self, namespace: str) -> int:
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM shared_state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (namespace, time.time())).fetchone()[0]
+
+    def purge_expired(self) -> int:
+        cursor = self._connect().execute('DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                                         (time.time(),))
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+class Namespace:
+    """
+    A named slice of shared state with a default TTL and hit/miss counters.
+
+    `persist` marks caches worth carrying over a restart; with the memory
+    backend they are written to cache snapshots (see snapshots.py).
+    """
+
+    def __init__(self, backend, name: str, ttl: Optional[float] = None, persist: bool = False):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.persist = persist
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            raw = self.backend.get(self.name, key)
+        except Exception as e:
+            logger.error(f"Shared state read failed ({self.name}/{key}): {str(e)}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            self.backend.set(self.name, key, json.dumps(value), self._expires_at(ttl))
+        except Exception as e:
+            logger.error(f"Shared state write failed ({self.name}/{key}): {str(e)}")
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set the key only if it is absent or expired. Returns True if this call set it."""
+        return self.backend.add(self.name, key, json.dumps(value), self._expires_at(ttl))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to an integer counter (created at 0) and return the new value."""
+        return self.backend.incr(self.name, key, amount, self._expires_at(ttl))
+
+    def delete(self, key: str):
+        self.backend.delete(self.name, key)
+
+    def try_lock(self, key: str, ttl: float) -> bool:
+        """
+        Claim `key` for `ttl` seconds. Only one caller across all processes succeeds.
+
+        Used for run-once-per-interval jobs: the lock is never released, it
+        simply expires when the job is due again.
+        """
+        try:
+            return self.add(key, {'pid': os.getpid(), 'at': time.time()}, ttl=ttl)
+        except Exception as e:
+            logger.error(f"Shared state lock failed ({self.name}/{key}): {str(e)}")
+            return False
+
+    def __len__(self) -> int:
+        return self.backend.count(self.name)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None}
+
+
+class SharedState:
+    """Entry point to the configured backend, handing out namespaces."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self._namespaces: Dict[str, Namespace] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def kind(self) -> str:
+        return 'sqlite' if isinstance(self.backend, SQLiteBackend) else 'memory'
+
+    def namespace(self, name: str, ttl: Optional[float] = None, persist: bool = False) -> Namespace:
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = Namespace(self.backend, name, ttl, persist)
+            return self._namespaces[name]
+
+    def persistent_namespaces(self) -> List[str]:
+        with self._lock:
+            return [ns.name for ns in self._namespaces.values() if ns.persist]
+
+    def purge_expired(self) -> int:
+        return self.backend.purge_expired()
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self) -> Dict:
+        """Per-namespace sizes and this process's hit rates."""
+        with self._lock:
+            namespaces = list(self._namespaces.values())
+        return {'backend': self.kind, 'pid': os.getpid(),
+                'namespaces': {ns.name: ns.stats() for ns in namespaces}}
+
+
+def create_shared_state(backend: Optional[str] = None, path: Optional[str] = None) -> SharedState:
+    """Build the SharedState selected by SHARED_STATE_BACKEND / SHARED_STATE_PATH."""
+    backend = (backend or os.getenv('SHARED_STATE_BACKEND', DEFAULT_BACKEND)).lower()
+    if backend == 'sqlite':
+        path = path or os.getenv('SHARED_STATE_PATH', DEFAULT_SQLITE_PATH)
+        logger.info(f"Using SQLite shared state at {path}")
+        return SharedState(SQLiteBackend(path))
+    if backend != 'memory':
+        logger.warning(f"Unknown SHARED_STATE_BACKEND '{backend}', using memory")
+    return SharedState(MemoryBackend())
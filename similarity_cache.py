@@ -0,0 +1,237 @@
+"""
+Response cache that matches near-duplicate searches by similarity.
+
+"dog-friendly pubs newtown" and "pubs in newtown that allow dogs" resolve
+to the same places, but an exact-key cache sees two different queries.
+SimilarityCache keys entries by a scope (the resolved location cell and
+radius) and a query text, and get() returns the freshest entry in the same
+scope whose text is similar enough:
+
+- each text becomes a hashed feature vector (VECTOR_DIM floats, L2
+  normalised). Phrases the slot extractor's lexicons recognise count as
+  their canonical slot ("allow dogs" and "dog friendly" are both
+  requirement=dog-friendly) with a high weight. Other words count as
+  themselves, and their character n-grams add a little weight so
+  "vibe"/"vibes" still overlap. Filler words and place names are dropped,
+  as the scope already pins the location;
+- cosine similarity against every live entry in the scope is one NumPy
+  matrix-vector product, and a match needs SIMILARITY_THRESHOLD or more.
+
+Payloads live in a shared-state namespace, with its TTL deciding
+freshness, so an exact repeat hits in any worker and survives restarts in
+cache snapshots. The vectors are per process: each worker indexes the
+entries it stored or looked up, capped at max_entries, evicting the least
+recently used scope first. benchmarks/bench_similarity_cache.py measures
+precision and recall on labelled paraphrases and lookup latency at 100k
+entries.
+"""
+
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared_state import SharedState
+from slot_extractor import match_phrases, tokenize
+
+VECTOR_DIM = 256
+NGRAM_SIZE = 3
+SLOT_WEIGHT = 3.0  # Canonical amenity and requirement phrases
+WORD_WEIGHT = 1.0  # Words the lexicons don't know, and negations
+NGRAM_WEIGHT = 0.3  # Character n-grams of those words
+SIMILARITY_THRESHOLD = 0.9
+DEFAULT_TTL = 60 * 15  # Ratings and opening hours drift; keep cached responses short-lived
+DEFAULT_MAX_ENTRIES = 20000  # Vectors indexed per process (VECTOR_DIM * 4 bytes each)
+INITIAL_SCOPE_CAPACITY = 16
+IGNORED_KINDS = frozenset(('filler', 'preposition', 'location'))  # The scope already pins the location
+
+
+def query_features(text: str) -> Dict[str, float]:
+    """Weighted features of a query: canonical amenity and requirements, other words and their n-grams."""
+    features: Dict[str, float] = {}
+    for kind, value, phrase in match_phrases(tokenize(text)):
+        if kind in IGNORED_KINDS:
+            continue
+        if kind in ('amenity', 'requirement'):
+            feature, weight = f"{kind}={value}", SLOT_WEIGHT
+        else:
+            feature, weight = f"word={phrase}", WORD_WEIGHT
+            padded = f" {phrase} "
+            for i in range(len(padded) - NGRAM_SIZE + 1):
+                gram = f"gram={padded[i:i + NGRAM_SIZE]}"
+                features[gram] = features.get(gram, 0.0) + NGRAM_WEIGHT
+        features[feature] = features.get(feature, 0.0) + weight
+    # As in extract_slots(), "pub with a beer garden" is a search for the beer garden
+    if 'amenity=beer garden' in features:
+        features.pop('amenity=pub', None)
+    return features
+
+
+def vectorize(text: str) -> np.ndarray:
+    """L2-normalised hashed feature vector. crc32 keeps buckets stable across processes."""
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature, weight in query_features(text).items():
+        vector[zlib.crc32(feature.encode('utf-8')) % VECTOR_DIM] += weight
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(tokenize(text))
+
+
+class _ScopeIndex:
+    """Vectors of one scope's entries, in insertion-ordered rows of a growing matrix."""
+
+    __slots__ = ('vectors', 'expires', 'keys', 'rows', 'oldest')
+
+    def __init__(self):
+        self.vectors = np.zeros((INITIAL_SCOPE_CAPACITY, VECTOR_DIM), dtype=np.float32)
+        self.expires = np.zeros(INITIAL_SCOPE_CAPACITY, dtype=np.float64)
+        self.keys: List[Optional[str]] = []  # None marks a removed row
+        self.rows: Dict[str, int] = {}
+        self.oldest = 0  # No live row before this one
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, key: str, vector: np.ndarray, expires_at: float) -> bool:
+        """Index a vector. Returns False if the key was already indexed (its row is refreshed)."""
+        row = self.rows.get(key)
+        is_new = row is None
+        if is_new:
+            row = len(self.keys)
+            if row == len(self.vectors):
+                self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+                self.expires = np.concatenate([self.expires, np.zeros_like(self.expires)])
+            self.keys.append(key)
+            self.rows[key] = row
+        self.vectors[row] = vector
+        self.expires[row] = expires_at
+        return is_new
+
+    def remove(self, key: str) -> bool:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return False
+        self.keys[row] = None
+        self.expires[row] = 0.0  # Never matches again; the row is reclaimed by compact()
+        return True
+
+    def remove_oldest(self):
+        while self.keys[self.oldest] is None:
+            self.oldest += 1
+        self.remove(self.keys[self.oldest])
+
+    def compact(self, now: float) -> int:
+        """Reclaim removed rows and drop expired ones. Returns how many live entries were dropped."""
+        live = [row for row, key in enumerate(self.keys) if key is not None and self.expires[row] > now]
+        dropped = len(self.rows) - len(live)
+        capacity = max(INITIAL_SCOPE_CAPACITY, len(live) * 2)
+        vectors = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+        expires = np.zeros(capacity, dtype=np.float64)
+        vectors[:len(live)] = self.vectors[live]
+        expires[:len(live)] = self.expires[live]
+        self.vectors, self.expires = vectors, expires
+        self.keys = [self.keys[row] for row in live]
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        self.oldest = 0
+        return dropped
+
+    def best(self, vector: np.ndarray, now: float) -> Tuple[Optional[str], float]:
+        n = len(self.keys)
+        if not n:
+            return None, 0.0
+        similarities = self.vectors[:n] @ vector
+        similarities[self.expires[:n] <= now] = -1.0
+        row = int(np.argmax(similarities))
+        return self.keys[row], float(similarities[row])
+
+
+class SimilarityCache:
+    """Cached values looked up by scope and the most similar text within it."""
+
+    def __init__(self, state: SharedState, name: str = 'similar_responses', ttl: float = DEFAULT_TTL,
+                 threshold: float = SIMILARITY_THRESHOLD, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._values = state.namespace(name, ttl=ttl, persist=True)
+        self._scopes: 'OrderedDict[str, _ScopeIndex]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(scope: str, text: str) -> str:
+        return hashlib.sha1(f"{scope}|{normalize_text(text)}".encode('utf-8')).hexdigest()[:24]
+
+    def _index(self, scope: str, key: str, vector: np.ndarray, expires_at: float):
+        """Add to the scope's index, evicting beyond max_entries: least recently used scopes first. Needs _lock."""
+        index = self._scopes.get(scope)
+        if index is None:
+            index = self._scopes[scope] = _ScopeIndex()
+        self._scopes.move_to_end(scope)
+        if index.add(key, vector, expires_at):
+            self._size += 1
+        while self._size > self.max_entries:
+            if len(self._scopes) > 1:
+                _, evicted = self._scopes.popitem(last=False)
+                self._size -= len(evicted)
+            else:
+                index.remove_oldest()
+                self._size -= 1
+        if len(index.keys) > 2 * len(index) + INITIAL_SCOPE_CAPACITY:
+            self._size -= index.compact(time.time())
+
+    def get(self, scope: str, text: str) -> Tuple[Optional[Any], float]:
+        """The cached value for the most similar fresh text in the scope, and its similarity; (None, best) on a miss."""
+        key = self._key(scope, text)
+        value = self._values.get(key)
+        if value is not None:
+            self.exact_hits += 1
+            with self._lock:  # Possibly stored by another worker: index it for later paraphrases
+                index = self._scopes.get(scope)
+                if index is None or key not in index.rows:
+                    self._index(scope, key, vectorize(value['text']), time.time() + self.ttl)
+            return value['value'], 1.0
+
+        vector = vectorize(text)
+        now = time.time()
+        with self._lock:
+            index = self._scopes.get(scope)
+            best_key, similarity = index.best(vector, now) if index is not None else (None, 0.0)
+            if index is not None:
+                self._scopes.move_to_end(scope)
+        if best_key is not None and similarity >= self.threshold:
+            value = self._values.get(best_key)
+            if value is not None:
+                self.hits += 1
+                return value['value'], similarity
+            with self._lock:  # Expired or evicted from shared state
+                if self._scopes.get(scope) is index and index.remove(best_key):
+                    self._size -= 1
+        self.misses += 1
+        return None, similarity
+
+    def put(self, scope: str, text: str, value: Any):
+        key = self._key(scope, text)
+        self._values.set(key, {'scope': scope, 'text': text, 'value': value})
+        with self._lock:
+            self._index(scope, key, vectorize(text), time.time() + self.ttl)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.exact_hits + self.misses
+        with self._lock:
+            indexed, scopes = self._size, len(self._scopes)
+        return {'indexed': indexed, 'scopes': scopes, 'hits': self.hits, 'exact_hits': self.exact_hits,
+                'misses': self.misses, 'threshold': self.threshold,
+                'hit_rate': round((self.hits + self.exact_hits) / lookups, 3) if lookups else None}
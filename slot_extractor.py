@@ -0,0 +1,273 @@
+"""
+Local slot extraction for formulaic search queries.
+
+Most queries look like "dog friendly cafes in Newtown" or "best pubs near
+Surry Hills", and sending each one to OpenAI just to split it into amenity,
+requirements and location costs a network round trip and a model call.
+extract_slots() handles them locally in a few microseconds:
+
+- the query is lower-cased and split into tokens, and the longest phrases
+  are matched first against the amenity and requirement lexicons, a list of
+  Sydney suburbs, and small sets of filler words, prepositions, follow-up
+  markers and negations;
+- a simple grammar reads the matched phrases: one amenity, any number of
+  requirements, and a location that is either a known suburb or follows a
+  preposition ("in", "near", ...);
+- a confidence score falls with every unexplained word, with more than one
+  amenity, with a preposition not followed by a known place, and with any
+  negation ("not", "without", ...), which the lexicons cannot express.
+
+Callers use the local slots when the confidence is at least
+SLOT_CONFIDENCE_THRESHOLD and ask the LLM otherwise. The slots use the same
+shape the LLM extraction produces: amenity, requirements, location and
+follow_up, with '' for missing values and 'default' for no location.
+benchmarks/bench_slot_extractor.py measures accuracy and latency against a
+labelled query set.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+SLOT_CONFIDENCE_THRESHOLD = 0.8
+UNKNOWN_WORD_PENALTY = 0.7  # Confidence multiplier per word no lexicon explains
+AMBIGUOUS_CONFIDENCE = 0.4
+FOLLOW_UP_CONFIDENCE = 0.9
+NEGATION_CONFIDENCE = 0.3
+UNRESOLVED_LOCATION_PENALTY = 0.5
+
+# Surface phrase -> amenity as the LLM extraction names it. Plurals are added automatically.
+AMENITIES = {
+    'beer garden': 'beer garden', 'pub': 'pub', 'bar': 'bar', 'wine bar': 'wine bar',
+    'cocktail bar': 'cocktail bar', 'rooftop bar': 'rooftop bar', 'brewery': 'brewery',
+    'nightclub': 'nightclub', 'club': 'nightclub', 'bottle shop': 'bottle shop',
+    'cafe': 'cafe', 'coffee': 'cafe', 'coffee shop': 'coffee shop', 'bakery': 'bakery',
+    'brunch': 'brunch spot', 'brunch spot': 'brunch spot', 'breakfast': 'brunch spot',
+    'restaurant': 'restaurant', 'food': 'restaurant', 'eatery': 'restaurant',
+    'pizza': 'pizza place', 'pizzeria': 'pizza place', 'pizza place': 'pizza place',
+    'burger': 'burger place', 'burger place': 'burger place', 'burger joint': 'burger place',
+    'sushi': 'sushi restaurant', 'ramen': 'ramen restaurant', 'dumpling': 'dumpling restaurant',
+    'dessert': 'dessert place', 'dessert place': 'dessert place', 'ice cream': 'ice cream shop',
+    'gelato': 'ice cream shop', 'gelato shop': 'ice cream shop', 'ice cream shop': 'ice cream shop',
+    'to eat': 'restaurant', 'takeaway': 'takeaway', 'park': 'park', 'dog park': 'dog park',
+    'playground': 'playground', 'beach': 'beach', 'gym': 'gym', 'swimming pool': 'swimming pool', 'pool': 'swimming pool',
+    'library': 'library', 'market': 'market', 'farmers market': 'farmers market', 'museum': 'museum',
+    'gallery': 'art gallery', 'art gallery': 'art gallery', 'cinema': 'cinema', 'bookshop': 'bookshop',
+    'bookstore': 'bookshop', 'supermarket': 'supermarket', 'pharmacy': 'pharmacy',
+    'live music venue': 'live music venue', 'music venue': 'live music venue',
+}
+CUISINES = ('thai', 'italian', 'chinese', 'indian', 'japanese', 'vietnamese', 'korean', 'mexican', 'greek',
+            'lebanese', 'turkish', 'french', 'spanish', 'malaysian', 'nepalese', 'ethiopian', 'seafood')
+for _cuisine in CUISINES:
+    for _suffix in ('', ' restaurant', ' food', ' place', ' takeaway'):
+        AMENITIES[f'{_cuisine}{_suffix}'] = f'{_cuisine} restaurant'
+
+REQUIREMENTS = {
+    'dog friendly': 'dog-friendly', 'dogs friendly': 'dog-friendly', 'pet friendly': 'dog-friendly',
+    'dogs allowed': 'dog-friendly', 'dogs welcome': 'dog-friendly', 'with my dog': 'dog-friendly',
+    'with a dog': 'dog-friendly', 'with dogs': 'dog-friendly', 'for dogs': 'dog-friendly',
+    'allow dogs': 'dog-friendly', 'allows dogs': 'dog-friendly', 'dogs are allowed': 'dog-friendly',
+    'dogs are welcome': 'dog-friendly', 'bring my dog': 'dog-friendly', 'bring the dog': 'dog-friendly',
+    'family friendly': 'family-friendly', 'family': 'family-friendly', 'kid friendly': 'family-friendly',
+    'kids friendly': 'family-friendly', 'child friendly': 'family-friendly', 'with kids': 'family-friendly',
+    'with the kids': 'family-friendly', 'for kids': 'family-friendly', 'for families': 'family-friendly',
+    'for the family': 'family-friendly', 'with children': 'family-friendly', 'for children': 'family-friendly',
+    'good for kids': 'family-friendly', 'good for families': 'family-friendly', 'kids welcome': 'family-friendly',
+    'wifi': 'wifi', 'wi fi': 'wifi', 'free wifi': 'wifi', 'internet': 'wifi',
+    'outdoor seating': 'outdoor seating', 'outdoor': 'outdoor seating', 'outside seating': 'outdoor seating',
+    'alfresco': 'outdoor seating', 'al fresco': 'outdoor seating', 'outdoor area': 'outdoor seating',
+    'live music': 'live music', 'vegan': 'vegan', 'vegan options': 'vegan', 'vegetarian': 'vegetarian',
+    'gluten free': 'gluten-free', 'cheap': 'cheap', 'affordable': 'cheap', 'budget': 'cheap',
+    'quiet': 'quiet', 'views': 'views', 'a view': 'views', 'harbour views': 'views', 'water views': 'views',
+    'rooftop': 'rooftop', 'open late': 'open late', 'late night': 'open late', 'open now': 'open now',
+    'wheelchair accessible': 'wheelchair accessible', 'accessible': 'wheelchair accessible',
+    'parking': 'parking', 'laptop friendly': 'laptop-friendly', 'to work from': 'laptop-friendly',
+    'to study': 'laptop-friendly', 'for studying': 'laptop-friendly', 'romantic': 'romantic',
+    'date night': 'romantic', 'for a date': 'romantic', 'for groups': 'good for groups',
+    'good for groups': 'good for groups', 'happy hour': 'happy hour', 'trivia': 'trivia',
+}
+
+SUBURBS = (
+    'Sydney', 'Sydney CBD', 'Newtown', 'Enmore', 'Erskineville', 'Marrickville', 'Dulwich Hill', 'Petersham',
+    'Stanmore', 'Camperdown', 'Annandale', 'Leichhardt', 'Lilyfield', 'Rozelle', 'Balmain', 'Birchgrove',
+    'Glebe', 'Forest Lodge', 'Ultimo', 'Pyrmont', 'Haymarket', 'Chinatown', 'Darling Harbour', 'Barangaroo',
+    'The Rocks', 'Circular Quay', 'Millers Point', 'Surry Hills', 'Darlinghurst', 'Potts Point', 'Kings Cross',
+    'Elizabeth Bay', 'Rushcutters Bay', 'Woolloomooloo', 'Paddington', 'Woollahra', 'Edgecliff',
+    'Double Bay', 'Rose Bay', 'Bellevue Hill', 'Vaucluse', 'Watsons Bay', 'Bondi', 'Bondi Beach',
+    'Bondi Junction', 'North Bondi', 'Tamarama', 'Bronte', 'Clovelly', 'Coogee', 'Randwick', 'Kensington',
+    'Kingsford', 'Maroubra', 'Redfern', 'Waterloo', 'Zetland', 'Alexandria', 'Rosebery', 'Chippendale',
+    'Darlington', 'Eveleigh', 'St Peters', 'Sydenham', 'Tempe', 'Mascot', 'Botany', 'Moore Park',
+    'Centennial Park', 'Ashfield', 'Summer Hill', 'Haberfield', 'Five Dock', 'Drummoyne', 'Concord',
+    'Burwood', 'Strathfield', 'Homebush', 'Rhodes', 'Canterbury', 'Campsie', 'Earlwood', 'Rockdale',
+    'Kogarah', 'Hurstville', 'Cronulla', 'Sutherland', 'Miranda', 'North Sydney', 'Milsons Point',
+    'Kirribilli', 'Neutral Bay', 'Cremorne', 'Mosman', 'Crows Nest', 'St Leonards', 'Wollstonecraft',
+    'Waverton', 'McMahons Point', 'Lane Cove', 'Artarmon', 'Chatswood', 'Willoughby', 'Naremburn',
+    'Cammeray', 'Manly', 'Fairlight', 'Balgowlah', 'Dee Why', 'Freshwater', 'Curl Curl', 'Collaroy',
+    'Narrabeen', 'Mona Vale', 'Newport', 'Avalon', 'Palm Beach', 'Brookvale', 'Ryde', 'Gladesville',
+    'Hunters Hill', 'Epping', 'Macquarie Park', 'Eastwood', 'Hornsby', 'Parramatta', 'Harris Park',
+    'Westmead', 'Auburn', 'Lidcombe', 'Granville', 'Blacktown', 'Penrith', 'Liverpool', 'Cabramatta',
+    'Fairfield', 'Bankstown', 'Castle Hill', 'Baulkham Hills', 'Olympic Park', 'Sydney Olympic Park',
+)
+# Other ways of saying a place; None means the user's own location ('default')
+LOCATION_ALIASES = {
+    'cbd': 'Sydney CBD', 'the cbd': 'Sydney CBD', 'the city': 'Sydney CBD', 'city': 'Sydney CBD',
+    'sydney cbd': 'Sydney CBD', 'inner west': 'Inner West', 'the inner west': 'Inner West',
+    'eastern suburbs': 'Eastern Suburbs', 'the eastern suburbs': 'Eastern Suburbs',
+    'northern beaches': 'Northern Beaches', 'the northern beaches': 'Northern Beaches',
+    'lower north shore': 'Lower North Shore', 'north shore': 'North Shore', 'the north shore': 'North Shore',
+    'kings x': 'Kings Cross', 'darlo': 'Darlinghurst', 'paddo': 'Paddington', 'mcmahons point': 'McMahons Point',
+    'st peters': 'St Peters', 'saint peters': 'St Peters',
+    'me': None, 'here': None, 'nearby': None, 'around here': None, 'near me': None, 'close by': None,
+}
+
+PREPOSITIONS = ('in', 'near', 'around', 'at', 'by', 'close to', 'next to', 'within', 'from')
+FOLLOW_UP_MARKERS = ('what about', 'how about', 'any in', 'similar', 'same', 'those', 'them', 'these',
+                     'more like', 'instead', 'also', 'another', 'else', 'other', 'anything', 'any others')
+NEGATIONS = ('not', 'no', 'without', 'except', 'avoid', 'dont', 'isnt', 'arent', 'non', 'never', 'but not')
+FILLERS = (
+    'a', 'an', 'the', 'some', 'any', 'good', 'best', 'great', 'nice', 'top', 'decent', 'lovely', 'cool',
+    'really', 'very', 'local', 'popular', 'find', 'me', 'show', 'get', 'give', 'list', 'where', 'can', 'could',
+    'i', 'we', 'is', 'are', 'there', 'that', 'which', 'with', 'has', 'have', 'having', 'what', 'whats', 'to',
+    'go', 'and', 'or', 'of', 'for', 'do', 'does', 'you', 'know', 'looking', 'look', 'want', 'need', 'would',
+    'like', 'recommend', 'recommendations', 'suggest', 'suggestions', 'place', 'places', 'spot', 'spots',
+    'somewhere', 'venue', 'venues', 'options', 'please', 'hey', 'hi', 'thanks', 'im', 'id', 'ideas', 'serve',
+    'serves', 'serving', 'sells', 'selling', 'one', 'ones', 'area', 'suburb', 'sydney australia', 'your', 'my', 'our', 'out',
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _plural(phrase: str) -> str:
+    words = phrase.split()
+    last = words[-1]
+    if last.endswith('y') and last[-2:-1] not in 'aeiou':
+        last = last[:-1] + 'ies'
+    elif last.endswith(('s', 'sh', 'ch', 'x')):
+        last += 'es'
+    else:
+        last += 's'
+    return ' '.join(words[:-1] + [last])
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return _TOKEN_RE.findall(text.replace("'", ''))
+
+
+def _build_phrase_table() -> Tuple[Dict[Tuple[str, ...], Tuple[str, Optional[str]]], int]:
+    """Token tuple -> (kind, canonical value), with kinds added in increasing precedence."""
+    table = {}
+
+    def add(phrase, kind, value=None):
+        table[tuple(tokenize(phrase))] = (kind, value)
+
+    for phrase in FILLERS:
+        add(phrase, 'filler')
+    for phrase in PREPOSITIONS:
+        add(phrase, 'preposition')
+    for phrase in NEGATIONS:
+        add(phrase, 'negation')
+    for phrase in FOLLOW_UP_MARKERS:
+        add(phrase, 'follow_up')
+    for suburb in SUBURBS:
+        add(suburb, 'location', suburb)
+    for phrase, location in LOCATION_ALIASES.items():
+        add(phrase, 'location', location)
+    for phrase, requirement in REQUIREMENTS.items():
+        add(phrase, 'requirement', requirement)
+    for phrase, amenity in AMENITIES.items():
+        add(phrase, 'amenity', amenity)
+        add(_plural(phrase), 'amenity', amenity)
+    return table, max(len(key) for key in table)
+
+
+_PHRASES, _MAX_PHRASE_WORDS = _build_phrase_table()
+
+
+class SlotExtraction:
+    """Slots read from a query, with how sure the extractor is about them."""
+
+    __slots__ = ('amenity', 'requirements', 'location', 'follow_up', 'confidence', 'unknown')
+
+    def __init__(self, amenity: str, requirements: str, location: str, follow_up: bool, confidence: float,
+                 unknown: Tuple[str, ...]):
+        self.amenity = amenity
+        self.requirements = requirements
+        self.location = location
+        self.follow_up = follow_up
+        self.confidence = confidence
+        self.unknown = unknown
+
+    def to_dict(self) -> Dict[str, str]:
+        """The slots in the shape the LLM extraction returns."""
+        return {'amenity': self.amenity, 'requirements': self.requirements, 'location': self.location,
+                'follow_up': 'yes' if self.follow_up else 'no'}
+
+
+def match_phrases(tokens: List[str]) -> List[Tuple[str, Optional[str], str]]:
+    """Greedy longest-phrase match: [(kind, value, text)], with kind 'unknown' for unmatched words."""
+    matched = []
+    i = 0
+    while i < len(tokens):
+        for n in range(min(_MAX_PHRASE_WORDS, len(tokens) - i), 0, -1):
+            entry = _PHRASES.get(tuple(tokens[i:i + n]))
+            if entry is not None:
+                matched.append((entry[0], entry[1], ' '.join(tokens[i:i + n])))
+                i += n
+                break
+        else:
+            matched.append(('unknown', None, tokens[i]))
+            i += 1
+    return matched
+
+
+def extract_slots(query: str) -> SlotExtraction:
+    """Read amenity, requirements and location from a query without calling a model."""
+    matched = match_phrases(tokenize(query))
+    amenities: List[str] = []
+    requirements: List[str] = []
+    locations: List[Optional[str]] = []
+    unknown: List[str] = []
+    follow_up = negated = unresolved_location = False
+
+    for i, (kind, value, text) in enumerate(matched):
+        if kind == 'amenity' and value not in amenities:
+            amenities.append(value)
+        elif kind == 'requirement' and value not in requirements:
+            requirements.append(value)
+        elif kind == 'location':
+            locations.append(value)
+        elif kind == 'follow_up':
+            follow_up = True
+        elif kind == 'negation':
+            negated = True
+        elif kind == 'unknown':
+            unknown.append(text)
+            # Words right after a preposition are probably a place we don't know
+            if i and matched[i - 1][0] == 'preposition':
+                unresolved_location = True
+
+    # "pub with a beer garden" is a search for the beer garden
+    if set(amenities) == {'pub', 'beer garden'}:
+        amenities = ['beer garden']
+    # A named place beats "near me"
+    named = [location for location in locations if location]
+    location = named[0] if named else 'default'
+
+    if len(amenities) > 1 or len(set(named)) > 1:
+        confidence = AMBIGUOUS_CONFIDENCE
+    elif amenities:
+        confidence = 1.0
+    elif follow_up and (named or requirements):
+        confidence = FOLLOW_UP_CONFIDENCE
+    else:
+        confidence = 0.0
+    if negated:
+        confidence = min(confidence, NEGATION_CONFIDENCE)
+    if unresolved_location:
+        confidence *= UNRESOLVED_LOCATION_PENALTY
+    confidence *= UNKNOWN_WORD_PENALTY ** len(unknown)
+
+    return SlotExtraction(amenity=amenities[0] if amenities else '', requirements=', '.join(requirements),
+                          location=location, follow_up=follow_up, confidence=round(confidence, 3),
+                          unknown=tuple(unknown))
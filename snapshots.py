@@ -0,0 +1,236 @@
+"""
+Cache snapshots for warm restarts.
+
+A deploy or worker recycle used to throw away every in-process cache, so
+the first hour after a release ran at full upstream cost. The
+CacheSnapshotter writes these caches to one SQLite file
+(CACHE_SNAPSHOT_PATH) every CACHE_SNAPSHOT_INTERVAL seconds and at exit:
+
+- the persistent shared-state namespaces: place details, geocodes, search
+  contexts, per-place analyses, similar-search responses, review
+  evidence, external candidates, web insights and prefetched profiles
+  (memory backend only; the SQLite backend already survives restarts);
+- the spatial index: places with their Nearby Search keyword tags, and the
+  coverage records that let it answer Nearby Searches locally.
+
+Values are zlib-compressed JSON. The file is written to a temporary path
+and renamed into place, so readers never see a half-written snapshot.
+
+Nothing is loaded eagerly at startup. The snapshot is opened read-only
+and memory-mapped, and the memory backend looks up a key there when it
+misses (see MemoryBackend.fallback). The spatial index needs every point
+to answer radius queries, so it is reloaded on a background thread in
+batches: places first, then coverage, so the index never claims to cover
+an area before its places are back.
+
+Expiry times are absolute wall-clock timestamps, and expired entries are
+skipped when loading and when writing. A TTL therefore keeps counting
+while the process is down. Each worker process keeps its own snapshot
+reader. With several memory-backend workers the last writer wins, and
+each write carries forward snapshot entries that worker has not loaded.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from shared_state import MemoryBackend, SharedState
+from spatial_index import PlaceSpatialIndex
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 2
+DEFAULT_SNAPSHOT_PATH = 'cache_snapshot.db'
+DEFAULT_SNAPSHOT_INTERVAL = 300
+SNAPSHOT_MMAP_BYTES = 256 * 1024 * 1024
+RESTORE_BATCH_SIZE = 500  # Places per spatial index lock hold while restoring
+MAX_CARRIED_ENTRIES = 50000  # Per namespace, from the previous snapshot into the next
+
+
+def _pack(value: str) -> bytes:
+    return zlib.compress(value.encode('utf-8'), 6)
+
+
+def _unpack(blob: bytes) -> str:
+    return zlib.decompress(blob).decode('utf-8')
+
+
+class SnapshotReader:
+    """Read-only, memory-mapped view of a snapshot file, for lazy per-key loads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.execute(f'PRAGMA mmap_size={SNAPSHOT_MMAP_BYTES}')
+        self._lock = threading.Lock()
+        meta = dict(self._conn.execute('SELECT name, value FROM meta'))
+        if int(meta.get('version', 0)) != SNAPSHOT_FORMAT_VERSION:
+            self._conn.close()
+            raise ValueError(f"Unsupported snapshot version {meta.get('version')}")
+        self.written_at = float(meta.get('written_at', 0))
+        self.namespaces = frozenset(json.loads(meta.get('namespaces', '[]')))
+        self.loaded = 0
+        self._closed = False
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        with self._lock:
+            if self._closed:  # Replaced by a newer snapshot while this lookup was starting
+                return None
+            row = self._conn.execute('SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?',
+                                     (namespace, key)).fetchone()
+        if row is None:
+            return None
+        self.loaded += 1
+        return _unpack(row[0]), row[1]
+
+    def entries(self, namespace: str, limit: int = MAX_CARRIED_ENTRIES) -> List[Tuple[str, str, Optional[float]]]:
+        """Unexpired entries of a namespace, latest-expiring first."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, value, expires_at FROM entries WHERE namespace = ? '
+                'AND (expires_at IS NULL OR expires_at > ?) ORDER BY expires_at IS NULL DESC, expires_at DESC LIMIT ?',
+                (namespace, time.time(), limit)).fetchall()
+        return [(key, _unpack(value), expires_at) for key, value, expires_at in rows]
+
+    def places(self, batch_size: int = RESTORE_BATCH_SIZE) -> Iterator[List[Tuple[Dict, List[str]]]]:
+        offset = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute('SELECT value, keywords FROM places ORDER BY rowid LIMIT ? OFFSET ?',
+                                          (batch_size, offset)).fetchall()
+            if not rows:
+                return
+            offset += len(rows)
+            yield [(json.loads(_unpack(value)), json.loads(keywords)) for value, keywords in rows]
+
+    def coverage(self) -> List[Tuple[float, float, float, str, float, bool]]:
+        with self._lock:
+            return self._conn.execute('SELECT lat, lng, radius, keyword, expires_at, complete FROM coverage').fetchall()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+class CacheSnapshotter:
+    """Writes and restores snapshots of a SharedState's memory caches and the spatial index."""
+
+    def __init__(self, state: SharedState, place_index: PlaceSpatialIndex, path: Optional[str] = None):
+        self.state = state
+        self.place_index = place_index
+        self.path = path or os.getenv('CACHE_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+        self.reader: Optional[SnapshotReader] = None
+        self._write_lock = threading.Lock()
+        self.index_restored = threading.Event()
+        self.last_written_at: Optional[float] = None
+
+    @property
+    def _memory_backend(self) -> Optional[MemoryBackend]:
+        return self.state.backend if isinstance(self.state.backend, MemoryBackend) else None
+
+    def restore(self):
+        """Attach the last snapshot for lazy loading and start reloading the spatial index. Never blocks."""
+        if not os.path.exists(self.path):
+            self.index_restored.set()
+            return
+        try:
+            self.reader = SnapshotReader(self.path)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache snapshot {self.path}: {str(e)}")
+            self.index_restored.set()
+            return
+        if self._memory_backend is not None:
+            self._memory_backend.fallback = self.reader
+        logger.info(f"Warm start from cache snapshot written {time.time() - self.reader.written_at:.0f}s ago")
+        threading.Thread(target=self._restore_index, name='snapshot-restore', daemon=True).start()
+
+    def _restore_index(self):
+        start = time.perf_counter()
+        try:
+            restored = sum(self.place_index.restore_places(batch) for batch in self.reader.places())
+            self.place_index.restore_coverage(self.reader.coverage())
+            logger.info(f"Restored {restored} places into the spatial index in "
+                        f"{(time.perf_counter() - start) * 1000:.0f}ms")
+        except Exception as e:
+            logger.error(f"Failed to restore spatial index from snapshot: {str(e)}")
+        finally:
+            self.index_restored.set()
+
+    def _namespace_entries(self, namespace: str) -> Iterator[Tuple[str, str, Optional[float]]]:
+        """Live in-memory entries, plus snapshot entries this process never loaded or deleted."""
+        backend = self._memory_backend
+        entries = backend.items(namespace)
+        yield from entries
+        if self.reader is not None and namespace in self.reader.namespaces:
+            seen = {key for key, _, _ in entries}
+            for key, value, expires_at in self.reader.entries(namespace):
+                if key not in seen and not backend.is_deleted(namespace, key):
+                    yield key, value, expires_at
+
+    def write(self) -> Optional[Dict]:
+        """Write a new snapshot. Returns counts, or None if another write is in progress."""
+        if not self._write_lock.acquire(blocking=False):
+            return None
+        start = time.perf_counter()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            # Before the new file replaces it, the index may still be loading from the old one
+            if self.reader is not None and not self.index_restored.is_set():
+                logger.info("Skipping cache snapshot until the spatial index has been restored")
+                return None
+            namespaces = self.state.persistent_namespaces() if self._memory_backend is not None else []
+            places, coverage = self.place_index.snapshot()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            conn = sqlite3.connect(tmp_path)
+            conn.executescript('''
+            CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE entries (namespace TEXT, key TEXT, value BLOB, expires_at REAL,
+                                  PRIMARY KEY (namespace, key)) WITHOUT ROWID;
+            CREATE TABLE places (value BLOB, keywords TEXT);
+            CREATE TABLE coverage (lat REAL, lng REAL, radius REAL, keyword TEXT, expires_at REAL, complete INTEGER);
+            ''')
+            counts = {'places': len(places), 'coverage': len(coverage)}
+            for namespace in namespaces:
+                rows = [(namespace, key, _pack(value), expires_at)
+                        for key, value, expires_at in self._namespace_entries(namespace)]
+                conn.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', rows)
+                counts[namespace] = len(rows)
+            conn.executemany('INSERT INTO places VALUES (?, ?)',
+                             ((_pack(json.dumps(place)), json.dumps(keywords)) for place, keywords in places))
+            conn.executemany('INSERT INTO coverage VALUES (?, ?, ?, ?, ?, ?)', coverage)
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('version', str(SNAPSHOT_FORMAT_VERSION)), ('written_at', str(time.time())),
+                ('namespaces', json.dumps(namespaces)), ('pid', str(os.getpid())),
+            ])
+            conn.commit()
+            conn.close()
+            os.replace(tmp_path, self.path)
+
+            # Later misses read the new file; the old one is gone once its reader closes
+            old_reader, self.reader = self.reader, SnapshotReader(self.path)
+            if self._memory_backend is not None:
+                self._memory_backend.fallback = self.reader
+            if old_reader is not None:
+                old_reader.close()
+            self.last_written_at = time.time()
+            logger.info(f"Wrote cache snapshot {self.path} in {(time.perf_counter() - start) * 1000:.0f}ms: {counts}")
+            return counts
+        except Exception as e:
+            logger.error(f"Failed to write cache snapshot {self.path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        finally:
+            self._write_lock.release()
+
+    def stats(self) -> Dict:
+        return {'path': self.path, 'loaded_from_snapshot': self.reader.loaded if self.reader else 0,
+                'snapshot_written_at': self.reader.written_at if self.reader else None,
+                'index_restored': self.index_restored.is_set(), 'last_written_at': self.last_written_at}
@@ -0,0 +1,307 @@
+"""
+In-process spatial index over every place CityPulse has seen.
+
+Places returned by Nearby Search and Place Details are bucketed into a fixed
+lat/lng grid, and radius queries are answered with a vectorised NumPy
+haversine filter over the candidate buckets only. The index also remembers
+which (location, radius, keyword) Nearby Searches have already been run, so
+a repeated search can be answered locally instead of going back to Google.
+
+Nearby Search returns at most 60 results, ranked by prominence, so a large
+circle usually holds places Google never returned. A smaller circle inside
+it only counts as covered when the earlier search was complete: its last
+page was short and had no next_page_token. Otherwise only the same circle
+is answered locally.
+"""
+
+import itertools
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from records import PlaceRecord
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+GRID_CELL_DEGREES = 0.01  # Roughly 1.1km x 0.9km cells around Sydney
+COVERAGE_TTL_SECONDS = 60 * 60 * 6  # Trust a previous Nearby Search for 6 hours
+NEARBY_RESULT_LIMIT = 60  # Google never returns more than 3 pages of 20
+SAME_CIRCLE_TOLERANCE_M = 1.0  # Centre and radius differences that still count as the same search
+INITIAL_CAPACITY = 1024
+
+
+def normalize_keyword(keyword: Optional[str]) -> str:
+    """Normalise a Nearby Search keyword so equivalent queries share a key."""
+    if not keyword:
+        return ''
+    return ' '.join(keyword.lower().split())
+
+
+def haversine_m(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in metres from one point to arrays of points."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(lngs) - math.radians(lng)
+    a = np.sin(dlat / 2.0) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def place_location(place: Dict) -> Optional[Tuple[float, float]]:
+    """Extract (lat, lng) from a Google place dict, if present."""
+    try:
+        loc = place['geometry']['location']
+        return float(loc['lat']), float(loc['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _record_types(record: PlaceRecord) -> Tuple[str, ...]:
+    """Place types, from 'types' or the singular 'type' some callers use."""
+    if record.types is not None:
+        return record.types
+    types = (record.extra or {}).get('type')
+    if not types:
+        return ()
+    return tuple(types) if isinstance(types, list) else (str(types),)
+
+
+def _place_text(record: PlaceRecord) -> str:
+    """Lowercased searchable text for local keyword matching."""
+    parts = [record.name or '', record.vicinity or '', ' '.join(_record_types(record)).replace('_', ' ')]
+    return ' '.join(parts).lower()
+
+
+class PlaceSpatialIndex:
+    """Grid-bucketed spatial index with NumPy haversine filtering."""
+
+    def __init__(self, cell_degrees: float = GRID_CELL_DEGREES,
+                 coverage_ttl: int = COVERAGE_TTL_SECONDS,
+                 initial_capacity: int = INITIAL_CAPACITY):
+        self.cell_degrees = cell_degrees
+        self.coverage_ttl = coverage_ttl
+        self._lock = threading.RLock()
+        self._lats = np.empty(initial_capacity, dtype=np.float64)
+        self._lngs = np.empty(initial_capacity, dtype=np.float64)
+        self._places: List[PlaceRecord] = []  # Compact records, converted back to dicts on the way out
+        self._texts: List[str] = []
+        self._keywords: List[set] = []
+        self._cell_of_row: List[Tuple[int, int]] = []
+        self._rows: Dict[str, int] = {}
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        # Each coverage record is (lat, lng, radius, keyword, expires_at, complete)
+        self._coverage: List[Tuple[float, float, float, str, float, bool]] = []
+        self.local_hits = 0
+        self.local_misses = 0
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees)))
+
+    def _grow(self):
+        capacity = max(INITIAL_CAPACITY, len(self._lats) * 2)
+        self._lats = np.resize(self._lats, capacity)
+        self._lngs = np.resize(self._lngs, capacity)
+
+    def insert(self, place: Dict, keyword: Optional[str] = None, place_id: Optional[str] = None) -> bool:
+        """
+        Add or update a single place.
+
+        `keyword` tags the place as a result of a Nearby Search for that
+        keyword. `place_id` is needed for Place Details results, which do not
+        carry their own ID. Returns False if the place has no ID or location.
+        """
+        place_id = place_id or place.get('place_id')
+        location = place_location(place)
+        if not place_id or not location:
+            return False
+        lat, lng = location
+        cell = self._cell(lat, lng)
+        keyword = normalize_keyword(keyword)
+
+        with self._lock:
+            row = self._rows.get(place_id)
+            if row is None:
+                row = len(self._places)
+                if row >= len(self._lats):
+                    self._grow()
+                record = PlaceRecord.from_google(place)
+                record.place_id = place_id
+                self._places.append(record)
+                self._texts.append(_place_text(record))
+                self._keywords.append({keyword} if keyword else set())
+                self._cell_of_row.append(cell)
+                self._rows[place_id] = row
+                self._cells.setdefault(cell, []).append(row)
+            else:
+                # Merge so that details fetched later enrich the nearby result
+                record = self._places[row].merged(place)
+                record.place_id = place_id
+                self._places[row] = record
+                self._texts[row] = _place_text(record)
+                if keyword:
+                    self._keywords[row].add(keyword)
+                old_cell = self._cell_of_row[row]
+                if old_cell != cell:
+                    self._cells[old_cell].remove(row)
+                    self._cells.setdefault(cell, []).append(row)
+                    self._cell_of_row[row] = cell
+            self._lats[row] = lat
+            self._lngs[row] = lng
+        return True
+
+    def insert_many(self, places: Iterable[Dict], keyword: Optional[str] = None) -> int:
+        """Add a batch of places (e.g. one Nearby Search page). Returns the number indexed."""
+        with self._lock:
+            return sum(1 for place in places if self.insert(place, keyword=keyword))
+
+    def get(self, place_id: str) -> Optional[Dict]:
+        """Return a copy of the indexed record for a place ID."""
+        with self._lock:
+            row = self._rows.get(place_id)
+            return self._places[row].to_dict() if row is not None else None
+
+    def _candidate_rows(self, lat: float, lng: float, radius: float) -> np.ndarray:
+        """Rows from every grid cell overlapping the query circle's bounding box."""
+        dlat = radius / METERS_PER_DEGREE_LAT
+        dlng = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        lat_lo, lng_lo = self._cell(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = self._cell(lat + dlat, lng + dlng)
+        cells = self._cells
+        buckets = [cells[(i, j)]
+                   for i in range(lat_lo, lat_hi + 1)
+                   for j in range(lng_lo, lng_hi + 1)
+                   if (i, j) in cells]
+        return np.fromiter(itertools.chain.from_iterable(buckets), dtype=np.int64)
+
+    def query(self, location: Tuple[float, float], radius: float,
+              keyword: Optional[str] = None, place_type: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """
+        Return indexed places within `radius` metres of `location`, nearest first.
+
+        A keyword matches places previously returned by Google for that same
+        keyword, or whose name/types contain every keyword token.
+        """
+        lat, lng = location
+        keyword = normalize_keyword(keyword)
+        tokens = keyword.split()
+
+        with self._lock:
+            rows = self._candidate_rows(lat, lng, radius)
+            if rows.size == 0:
+                return []
+            distances = haversine_m(lat, lng, self._lats[rows], self._lngs[rows])
+            inside = distances <= radius
+            rows = rows[inside][np.argsort(distances[inside], kind='stable')]
+
+            results = []
+            for row in rows.tolist():
+                if keyword and keyword not in self._keywords[row]:
+                    text = self._texts[row]
+                    if not all(token in text for token in tokens):
+                        continue
+                record = self._places[row]
+                if place_type and place_type not in _record_types(record):
+                    continue
+                results.append(record.to_dict())
+                if limit and len(results) >= limit:
+                    break
+            return results
+
+    def record_coverage(self, location: Tuple[float, float], radius: float, keyword: Optional[str],
+                        complete: bool = False):
+        """
+        Remember that Google has been asked for `keyword` within this circle.
+
+        `complete` means Google returned every match in the circle, not just
+        its most prominent 60, so smaller circles inside it are covered too.
+        """
+        expires_at = time.time() + self.coverage_ttl
+        record = (location[0], location[1], float(radius), normalize_keyword(keyword), expires_at, bool(complete))
+        with self._lock:
+            now = time.time()
+            self._coverage = [c for c in self._coverage if c[4] > now]
+            self._coverage.append(record)
+
+    def covers(self, location: Tuple[float, float], radius: float, keyword: Optional[str]) -> bool:
+        """
+        True if a fresh Nearby Search for the same keyword answers this circle.
+
+        That is the same circle searched before, or a circle inside one whose
+        search returned complete results.
+        """
+        keyword = normalize_keyword(keyword)
+        now = time.time()
+        with self._lock:
+            records = [c for c in self._coverage if c[3] == keyword and c[4] > now]
+        if not records:
+            return False
+        centres = np.array([(c[0], c[1]) for c in records])
+        radii = np.array([c[2] for c in records])
+        complete = np.array([c[5] for c in records], dtype=bool)
+        distances = haversine_m(location[0], location[1], centres[:, 0], centres[:, 1])
+        same = (distances <= SAME_CIRCLE_TOLERANCE_M) & (np.abs(radii - radius) <= SAME_CIRCLE_TOLERANCE_M)
+        inside = complete & (distances + radius <= radii)
+        return bool(np.any(same | inside))
+
+    def answer_nearby(self, location: Tuple[float, float], radius: float,
+                      keyword: Optional[str]) -> Optional[List[Dict]]:
+        """
+        Answer a Nearby Search locally if a previous search covers it (see covers()).
+
+        Returns None when the index cannot answer and Google must be asked.
+        """
+        covered = self.covers(location, radius, keyword)
+        with self._lock:
+            if not covered:
+                self.local_misses += 1
+                return None
+            self.local_hits += 1
+        return self.query(location, radius, keyword=keyword, limit=NEARBY_RESULT_LIMIT)
+
+    def snapshot(self) -> Tuple[List[Tuple[Dict, List[str]]], List[Tuple[float, float, float, str, float, bool]]]:
+        """(place dict, keywords) for every place, and the unexpired coverage records."""
+        now = time.time()
+        with self._lock:
+            places = [(record.to_dict(), sorted(keywords)) for record, keywords in zip(self._places, self._keywords)]
+            coverage = [c for c in self._coverage if c[4] > now]
+        return places, coverage
+
+    def restore_places(self, entries: Iterable[Tuple[Dict, List[str]]]) -> int:
+        """Insert places saved by snapshot(), keeping their keyword tags. Returns the number indexed."""
+        restored = 0
+        with self._lock:
+            for place, keywords in entries:
+                if not self.insert(place, keyword=keywords[0] if keywords else None):
+                    continue
+                self._keywords[self._rows[place['place_id']]].update(keywords)
+                restored += 1
+        return restored
+
+    def restore_coverage(self, records: Iterable[Tuple[float, float, float, str, float, bool]]):
+        """
+        Add coverage records saved by snapshot(), dropping expired ones.
+
+        Restore the places first: coverage makes the index answer searches
+        locally, which is only right once the places are back.
+        """
+        now = time.time()
+        with self._lock:
+            self._coverage.extend((*c[:5], bool(c[5])) for c in records if c[4] > now)
+
+    def stats(self) -> Dict:
+        """Basic counters for logging and debugging."""
+        with self._lock:
+            return {
+                'places': len(self._places),
+                'cells': len(self._cells),
+                'coverage_records': len(self._coverage),
+                'local_hits': self.local_hits,
+                'local_misses': self.local_misses,
+            }
@@ -0,0 +1,287 @@
+"""
+Per-request span traces.
+
+Every request gets a Trace holding a tree of timed spans: classification,
+extraction, cache lookups, geocoding, each Nearby Search page, each details
+fetch, each LLM call (with token counts) and response building. The
+current span lives in a context variable, so spans opened in tasks and in
+executors started with run_in_executor_with_context() nest under the span
+that was current when the work was started.
+
+Spans are recorded for every request, because whether a trace is kept is
+only known at the end. It is kept if it was sampled (TRACE_SAMPLE_RATE),
+took longer than TRACE_SLOW_MS, or failed with a 5xx status. Kept traces go
+into a bounded in-memory ring buffer (TRACE_BUFFER_SIZE) and, when
+TRACE_EXPORT_PATH is set, are appended to that file as JSON lines by a
+background writer. The ring buffer is per worker process; the export file
+is the place to look when several workers are running.
+
+    with span('geocode', location=location_query) as s:
+        ...
+        s.set(cache='hit')
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', '2000'))
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '200'))
+MAX_SPANS_PER_TRACE = 1000  # Stops a runaway loop from growing a trace without bound
+REQUEST_ID_PATTERN = re.compile(r'^[\w.-]{1,64}$')
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('current_trace', default=None)
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation; times are milliseconds from the start of the trace."""
+
+    __slots__ = ('name', 'start_ms', 'duration_ms', 'attrs', 'children', '_trace')
+
+    def __init__(self, trace: 'Trace', name: str, attrs: Dict[str, Any]):
+        self._trace = trace
+        self.name = name
+        self.start_ms = trace.elapsed_ms()
+        self.duration_ms: Optional[float] = None
+        self.attrs = attrs
+        self.children: List['Span'] = []
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self):
+        if self.duration_ms is None:
+            self.duration_ms = round(self._trace.elapsed_ms() - self.start_ms, 2)
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'start_ms': round(self.start_ms, 2), 'duration_ms': self.duration_ms,
+                'attrs': self.attrs, 'children': [child.to_dict() for child in self.children]}
+
+
+class _NoopSpan:
+    """Stand-in yielded by span() outside a trace, so callers never need to check."""
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """The span tree for a single request."""
+
+    def __init__(self, request_id: str, name: str, sampled: bool, **attrs):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.closed = False
+        self.span_count = 0
+        self.llm_calls = 0
+        self.tokens = {'prompt': 0, 'completion': 0}
+        self._lock = threading.Lock()
+        self.root = Span(self, name, attrs)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def open_span(self, parent: Span, name: str, attrs: Dict[str, Any]) -> Optional[Span]:
+        with self._lock:
+            if self.closed or self.span_count >= MAX_SPANS_PER_TRACE:
+                return None
+            self.span_count += 1
+            span = Span(self, name, attrs)
+            parent.children.append(span)
+            return span
+
+    def add_llm_usage(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.llm_calls += 1
+            self.tokens['prompt'] += prompt_tokens
+            self.tokens['completion'] += completion_tokens
+
+    def to_dict(self) -> Dict:
+        return {'request_id': self.request_id, 'started_at': self.started_at, 'pid': os.getpid(),
+                'duration_ms': self.root.duration_ms, 'sampled': self.sampled, 'llm_calls': self.llm_calls,
+                'tokens': dict(self.tokens), 'root': self.root.to_dict()}
+
+
+class TraceStore:
+    """Ring buffer of kept traces plus the optional JSON-lines export."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE, export_path: Optional[str] = None):
+        self.size = size
+        self.export_path = export_path
+        self._traces: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._export_queue: Optional[queue.Queue] = None
+        self.kept = 0
+        self.discarded = 0
+
+    def add(self, trace: Dict):
+        with self._lock:
+            self._traces[trace['request_id']] = trace
+            self._traces.move_to_end(trace['request_id'])
+            while len(self._traces) > self.size:
+                self._traces.popitem(last=False)
+            self.kept += 1
+        if self.export_path:
+            try:
+                self._exporter().put_nowait(trace)
+            except queue.Full:
+                logger.warning(f"Trace export queue full, not exporting {trace['request_id']}")
+
+    def _exporter(self) -> queue.Queue:
+        """Start the export writer thread on first use."""
+        with self._lock:
+            if self._export_queue is None:
+                self._export_queue = queue.Queue(maxsize=1000)
+                threading.Thread(target=self._write_exports, name='trace-export', daemon=True).start()
+            return self._export_queue
+
+    def _write_exports(self):
+        while True:
+            trace = self._export_queue.get()
+            try:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace, default=str) + '\n')
+            except OSError as e:
+                logger.error(f"Failed to export trace {trace['request_id']}: {str(e)}")
+
+    def get(self, request_id: str) -> Optional[Dict]:
+        with self._lock:
+            trace = self._traces.get(request_id)
+        if trace is None and self.export_path and os.path.exists(self.export_path):
+            # Traces kept by other worker processes are only in the export file
+            with open(self.export_path, encoding='utf-8') as f:
+                for line in f:
+                    if request_id in line:
+                        candidate = json.loads(line)
+                        if candidate['request_id'] == request_id:
+                            trace = candidate
+        return trace
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """Summaries of the most recently kept traces, newest first."""
+        with self._lock:
+            traces = list(self._traces.values())[-limit:]
+        return [{'request_id': t['request_id'], 'name': t['root']['name'], 'started_at': t['started_at'],
+                 'duration_ms': t['duration_ms'], 'status': t['root']['attrs'].get('status'),
+                 'llm_calls': t['llm_calls']} for t in reversed(traces)]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'buffered': len(self._traces), 'kept': self.kept, 'discarded': self.discarded,
+                    'sample_rate': TRACE_SAMPLE_RATE, 'slow_ms': TRACE_SLOW_MS}
+
+
+trace_store = TraceStore(export_path=os.getenv('TRACE_EXPORT_PATH'))
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Use the caller's X-Request-ID when it is reasonable, otherwise make one up."""
+    if incoming and REQUEST_ID_PATTERN.match(incoming):
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+def start_trace(request_id: str, name: str, **attrs) -> Trace:
+    """Begin a trace for the current request."""
+    trace = Trace(request_id, name, random.random() < TRACE_SAMPLE_RATE, **attrs)
+    _current_trace.set(trace)
+    _current_span.set(trace.root)
+    return trace
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def finish_trace(**attrs) -> Optional[Trace]:
+    """End the current trace and keep it if sampled, slow or failed."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    _current_trace.set(None)
+    _current_span.set(None)
+    trace.root.set(**attrs)
+    trace.root.end()
+    with trace._lock:
+        trace.closed = True  # Spans from work that outlives the request (e.g. streaming) are ignored
+    status = attrs.get('status') or 0
+    if trace.sampled or trace.root.duration_ms >= TRACE_SLOW_MS or status >= 500:
+        trace_store.add(trace.to_dict())
+    else:
+        trace_store.discarded += 1
+    return trace
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a child of the current span. Yields the span so attributes can be added."""
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    current = trace.open_span(parent, name, attrs) if trace and parent else None
+    if current is None:
+        yield NOOP_SPAN
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+
+
+def annotate_span(**attrs):
+    """Add attributes to the innermost open span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def record_llm_usage(model: str, usage: Optional[Dict]):
+    """Attach an LLM call's model and token counts to the current span and the trace totals."""
+    usage = usage or {}
+    prompt_tokens = int(usage.get('prompt_tokens') or 0)
+    completion_tokens = int(usage.get('completion_tokens') or 0)
+    annotate_span(model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_llm_usage(prompt_tokens, completion_tokens)
+
+
+def waterfall_rows(trace: Dict) -> List[Dict]:
+    """Flatten a trace into rows for the waterfall view, with bar offsets as percentages."""
+    total = trace['duration_ms'] or 1
+    rows = []
+
+    def walk(node, depth):
+        duration = node['duration_ms'] if node['duration_ms'] is not None else total - node['start_ms']
+        rows.append({'name': node['name'], 'depth': depth, 'start_ms': node['start_ms'], 'duration_ms': duration,
+                     'offset_pct': round(node['start_ms'] / total * 100, 2),
+                     'width_pct': max(round(duration / total * 100, 2), 0.2), 'attrs': node['attrs']})
+        for child in sorted(node['children'], key=lambda c: c['start_ms']):
+            walk(child, depth + 1)
+
+    walk(trace['root'], 0)
+    return rows
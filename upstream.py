@@ -0,0 +1,188 @@
+"""
+Dedicated thread pools and HTTP connection pools per upstream API.
+
+Blocking Maps, geocoding and OpenAI calls all used to go through
+loop.run_in_executor(None, ...), the default executor that every other
+blocking task also shares and whose size has nothing to do with how many
+calls an upstream should see at once. A burst of Place Details lookups
+could occupy every thread and leave geocodes and LLM calls queued behind
+them, and each client opened connections with its own default settings.
+
+An UpstreamPool gives one upstream:
+
+- its own bounded ThreadPoolExecutor (max_workers), with at most max_queue
+  calls waiting for a thread. Beyond that run() raises UpstreamBusy at
+  once instead of growing an unbounded backlog;
+- a keep-alive connection pool holding one connection per worker thread,
+  on a requests.Session to hand to the upstream's client library.
+  new_session() gives a client that keeps a session per thread and closes
+  it (openai 0.28) a session of its own over the same pool;
+- queue depth, in-flight calls and queue wait times for /health. The wait
+  of each call is also recorded as an '<name>_wait' request stage.
+
+    maps_upstream = UpstreamPool('maps', max_workers=16)
+    gmaps = googlemaps.Client(key=..., requests_session=maps_upstream.session)
+    result = await maps_upstream.run(gmaps.place, place_id)
+
+    openai.requestssession = openai_upstream.new_session
+
+Executors, connection pools and sessions are built on first use and
+rebuilt in a forked worker, like the clients in clients.py. With a cassette (cassettes.py),
+the session records or replays the upstream's traffic.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from logging_setup import record_stage, run_in_executor_with_context
+
+DEFAULT_MAX_WORKERS = 8
+QUEUE_PER_WORKER = 4  # Default max_queue is this many waiting calls per thread
+POOL_HOSTS = 4  # Distinct hosts an upstream's session keeps connections to
+WAIT_SMOOTHING = 0.1  # Weight of the newest call in the average queue wait
+
+
+class UpstreamBusy(RuntimeError):
+    """Raised when an upstream's queue is full."""
+
+
+class PooledSession(requests.Session):
+    """
+    A session over an upstream's shared connection pool.
+
+    openai 0.28 closes its session every few minutes, which would drop every
+    other session's keep-alive connections, so close() leaves the pool
+    alone. UpstreamPool.shutdown() releases the connections.
+    """
+
+    def close(self):
+        pass
+
+
+class UpstreamPool:
+    """Bounded executor and keep-alive HTTP session for one upstream API."""
+
+    def __init__(self, name: str, max_workers: int = DEFAULT_MAX_WORKERS, max_queue: Optional[int] = None,
+                 cassette=None):
+        self.name = name
+        self.cassette = cassette  # cassettes.Cassette that records or replays this upstream's traffic
+        self.max_workers = max_workers
+        self.max_queue = max_queue if max_queue is not None else max_workers * QUEUE_PER_WORKER
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._adapter: Optional[HTTPAdapter] = None
+        self._session: Optional[PooledSession] = None
+        self.queued = 0
+        self.in_flight = 0
+        self.wait_time = 0.0  # Smoothed seconds a call waits for a thread
+        self.max_wait = 0.0
+        self.counters = {'calls': 0, 'rejected': 0, 'errors': 0}
+
+    def _check_fork(self):
+        """Drop the executor, pool and session of a parent process. Needs _lock."""
+        if self._pid != os.getpid():
+            self._executor = None
+            self._adapter = None
+            self._session = None
+            self.queued = self.in_flight = 0
+            self._pid = os.getpid()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            self._check_fork()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f'upstream-{self.name}')
+            return self._executor
+
+    def _pooled_session(self) -> PooledSession:
+        """A new session mounting the shared adapter. Needs _lock."""
+        self._check_fork()
+        if self._adapter is None:
+            if self.cassette is not None:
+                self._adapter = self.cassette.adapter(self.name, pool_connections=POOL_HOSTS,
+                                                      pool_maxsize=self.max_workers)
+            else:
+                self._adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=self.max_workers)
+        session = PooledSession()
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        return session
+
+    @property
+    def session(self) -> PooledSession:
+        """One session for every thread, for clients that never close it (googlemaps)."""
+        with self._lock:
+            self._check_fork()
+            if self._session is None:
+                self._session = self._pooled_session()
+            return self._session
+
+    def new_session(self) -> PooledSession:
+        """A session of the caller's own over the shared connection pool."""
+        with self._lock:
+            return self._pooled_session()
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a blocking call on this upstream's executor, keeping the request context."""
+        executor = self.executor
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.counters['rejected'] += 1
+                raise UpstreamBusy(f"{self.name} upstream has {self.queued} calls queued")
+            self.queued += 1
+            self.counters['calls'] += 1
+        state = {'started': False}
+        submitted = time.perf_counter()
+
+        def call():
+            wait = time.perf_counter() - submitted
+            with self._lock:
+                if state['started']:  # Cancelled while queued
+                    return None
+                state['started'] = True
+                self.queued -= 1
+                self.in_flight += 1
+                self.wait_time += WAIT_SMOOTHING * (wait - self.wait_time)
+                self.max_wait = max(self.max_wait, wait)
+            record_stage(f'{self.name}_wait', wait)
+            try:
+                return func(*args)
+            except Exception:
+                with self._lock:
+                    self.counters['errors'] += 1
+                raise
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        try:
+            return await run_in_executor_with_context(call, executor=executor)
+        finally:
+            with self._lock:
+                if not state['started']:
+                    state['started'] = True
+                    self.queued -= 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, adapter = self._executor, self._adapter
+            self._executor = self._adapter = self._session = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if adapter is not None:
+            adapter.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'max_workers': self.max_workers, 'max_queue': self.max_queue, 'in_flight': self.in_flight,
+                    'queued_now': self.queued, 'wait_ms': round(self.wait_time * 1000, 1),
+                    'max_wait_ms': round(self.max_wait * 1000, 1), **self.counters}